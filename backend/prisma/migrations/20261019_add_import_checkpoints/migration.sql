@@ -0,0 +1,20 @@
+-- Checkpoints das importações do parser Python (retomada após falha)
+CREATE TABLE "import_checkpoints" (
+    "id" TEXT NOT NULL,
+    "fileHash" TEXT NOT NULL,
+    "fileName" TEXT NOT NULL,
+    "optionsHash" TEXT NOT NULL,
+    "options" JSONB NOT NULL,
+    "lastRow" INTEGER NOT NULL DEFAULT 0,
+    "inserted" INTEGER NOT NULL DEFAULT 0,
+    "duplicates" INTEGER NOT NULL DEFAULT 0,
+    "failed" INTEGER NOT NULL DEFAULT 0,
+    "completed" BOOLEAN NOT NULL DEFAULT false,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "import_checkpoints_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "import_checkpoints_fileHash_fileName_optionsHash_key" ON "import_checkpoints"("fileHash", "fileName", "optionsHash");
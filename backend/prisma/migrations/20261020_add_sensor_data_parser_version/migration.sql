@@ -0,0 +1,2 @@
+-- Versão do parser Python que gerou cada leitura (reprocessamento com qtparser.backfill)
+ALTER TABLE "sensor_data" ADD COLUMN "parserVersion" TEXT;
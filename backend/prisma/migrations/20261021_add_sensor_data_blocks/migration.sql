@@ -0,0 +1,24 @@
+-- Leituras compactadas por sensor e dia (parser Python com --storage blocks)
+CREATE TABLE "sensor_data_blocks" (
+    "id" TEXT NOT NULL,
+    "sensorId" TEXT NOT NULL,
+    "day" DATE NOT NULL,
+    "count" INTEGER NOT NULL,
+    "firstTs" TIMESTAMP(3) NOT NULL,
+    "lastTs" TIMESTAMP(3) NOT NULL,
+    "scale" INTEGER NOT NULL DEFAULT 100,
+    "timestamps" BYTEA NOT NULL,
+    "temperature" BYTEA NOT NULL,
+    "humidity" BYTEA,
+    "parserVersion" TEXT,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "sensor_data_blocks_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "sensor_data_blocks_sensorId_day_key" ON "sensor_data_blocks"("sensorId", "day");
+
+-- AddForeignKey
+ALTER TABLE "sensor_data_blocks" ADD CONSTRAINT "sensor_data_blocks_sensorId_fkey" FOREIGN KEY ("sensorId") REFERENCES "sensors"("id") ON DELETE RESTRICT ON UPDATE CASCADE;
@@ -0,0 +1,16 @@
+"""Heuristic parser for temperature/humidity logger exports (XLS/XLSX).
+
+The library entry points are :func:`parse` and :func:`scan`. ``python -m qtparser``
+(and the ``fallback_parser.py`` wrapper used by ``pythonFallbackService``) is the
+command-line front end. Heavy dependencies (pandas, numpy, xlrd, openpyxl) are
+only imported when a workbook is actually read, so importing the package or
+printing the CLI help stays cheap.
+"""
+from .errors import ParseError
+from .options import ParseOptions
+from .api import parse, scan
+
+# Gravada em sensor_data.parserVersion: subir sempre que as linhas produzidas mudarem (qtparser.backfill)
+__version__ = '1.1.0'
+
+__all__ = ['ParseError', 'ParseOptions', 'parse', 'scan', '__version__']
@@ -0,0 +1,89 @@
+"""Function-level API. Heavy modules are imported inside the functions."""
+from dataclasses import replace
+from typing import Callable, Optional
+
+from .options import ParseOptions
+
+
+def parse(src, options: Optional[ParseOptions] = None, start: Optional[Callable] = None):
+    """Parse a logger workbook into batches of normalized rows.
+
+    ``src`` is a path, raw bytes or a binary file object. Each batch is a
+    :class:`~qtparser.batch.RowBatch` with ``timestamp`` (UTC), ``temperature``
+    and ``humidity`` arrays, plus ``channel`` when ``options.channels`` splits
+    a multi-probe sheet. Workbook reading and detection happen eagerly, so a
+    :class:`~qtparser.errors.ParseError` is raised by the call itself; the
+    per-chunk cleanup then runs on a worker thread ``options.prefetch``
+    batches ahead of the consumer. The returned
+    :class:`~qtparser.pipeline.BatchStream` carries the expected row count in
+    ``total`` (None when unknown). With ``options.skip_rows`` the first output
+    rows are not produced (nor cleaned) and ``total`` counts only the rest.
+
+    ``start(timestamps, readings)`` is called once the timestamps are known,
+    before any batch is cleaned, and returns how many leading rows to skip
+    (at least ``skip_rows`` are always skipped). ``timestamps`` is the
+    datetime64[ns] UTC array of every row and ``readings(idx)`` returns the
+    cleaned ``(temperature, humidity)`` of the rows ``idx``. It is not called
+    for multi-channel output. The stream's ``start`` is the first row produced.
+    With ``options.keep_source`` its ``source`` gives the cells of the decoded
+    sheet (see :mod:`qtparser.rejects`).
+
+    Small workbooks (or a known ``options.vendor``) in the plain logger layout
+    are decoded without pandas; anything else goes through the full pipeline.
+    With ``options.engine = 'polars'`` the sheets read by pandas are decoded
+    by :mod:`qtparser.polars_engine` when it can reproduce the pandas result.
+    """
+    from .lean import try_lean_decode
+    from .pipeline import BatchStream, prefetch
+    from .source import WorkbookSource
+
+    options = options or ParseOptions()
+    source = WorkbookSource(src)
+    decoded = try_lean_decode(source, options)
+    if decoded is not None:
+        return _whole_batch(*decoded, options, start)
+
+    from .engine import iter_batches, parse_sheet, sheet_channels
+    sheets = None
+    if options.engine == 'polars':
+        from .logs import stage
+        from .polars_engine import try_polars_decode
+        with stage('read'):
+            sheets = source.read_sheets(options.sheet_name)
+        decoded = try_polars_decode(sheets, options)
+        if decoded is not None:
+            return _whole_batch(*decoded, options, start)
+    choice = parse_sheet(source, options, sheets)
+    channels = sheet_channels(choice, options)
+    if start is not None and not channels:
+        from .engine import sheet_readings
+        first = start(choice.ts.to_numpy(dtype='datetime64[ns]'), lambda idx: sheet_readings(choice, idx))
+        options = replace(options, skip_rows=max(options.skip_rows, first))
+    total = None if channels else max(0, len(choice.df) - options.skip_rows)
+    stream = prefetch(iter_batches(choice, options, channels), options.prefetch)
+    rows = None
+    if options.keep_source and not channels:
+        from .rejects import SourceRows
+        df = choice.df
+        rows = SourceRows('full', choice.name, choice.raw_cols, lambda i: df.iloc[i].tolist(),
+                          rescue=bool(choice.ts.notna().any()))
+    return BatchStream(stream, total=total, start=options.skip_rows, source=rows)
+
+
+def _whole_batch(batch, rows, options: ParseOptions, start: Optional[Callable]):
+    """Stream for a batch decoded in one piece (lean / Polars)."""
+    from .pipeline import BatchStream
+    first = options.skip_rows
+    if start is not None and batch.channel is None:
+        first = max(first, start(batch.timestamp, lambda idx: (batch.temperature[idx], batch.humidity[idx])))
+    batch = batch.slice(first, len(batch))
+    return BatchStream(batch.split(options.batch_size), total=len(batch), start=first, source=rows)
+
+
+def scan(src, options: Optional[ParseOptions] = None) -> dict:
+    """Quick preview (sheet, columns, row count, time range, interval, first rows)."""
+    from .preview import scan_workbook
+    from .source import WorkbookSource
+
+    options = options or ParseOptions()
+    return scan_workbook(WorkbookSource(src), options)
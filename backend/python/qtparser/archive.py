@@ -0,0 +1,292 @@
+"""Parquet archive of readings for analytical reads: ``python -m qtparser.archive export|read``.
+
+Layout (hive partitioning, one directory per sensor and UTC month)::
+
+    <root>/sensorId=<id>/month=<YYYY-MM>/<part>.parquet
+
+Each part holds ``timestamp`` (ms, UTC), ``temperature`` and ``humidity``
+sorted by time, zstd-compressed, so the row-group statistics let a time-range
+filter skip row groups. Parts are immutable: a part is written to a
+temporary name and renamed into place, and an existing part is never
+rewritten. Parts come from two writers:
+
+* at import time (``--archive DIR`` on ``--sink postgres``, :mod:`qtparser.bulk`
+  and :mod:`qtparser.watch`): the accepted rows of the file, one part per
+  month named after the file's SHA-256, so importing the same file again
+  writes nothing;
+* the archive job (``export``): the rows of ``sensor_data`` of each closed
+  month (before the current one, or ``--before``), part ``db.parquet``;
+  months that already have it are skipped.
+
+A reading can therefore be in more than one part; :func:`read_archive` keeps
+one row per sensor and timestamp. Its ``sensor_ids``/``start``/``end`` filters
+are pushed down to the dataset scan: the sensor and month prune directories
+and the timestamp prunes row groups.
+
+pyarrow is optional; it is only imported when the archive is used.
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import sys
+import uuid
+from typing import Iterable, List, Optional
+from urllib.parse import quote
+
+import numpy as np
+
+from .batch import RowBatch
+from .errors import ParseError
+from .logs import debug
+
+DB_PART = 'db'
+ROW_GROUP_ROWS = 65_536
+NS_PER_MS = 1_000_000
+
+EXPORT_MONTHS = '''
+SELECT "sensorId", to_char(date_trunc('month', "timestamp"), 'YYYY-MM'), count(*) FROM sensor_data
+WHERE "timestamp" < %s {sensors}
+GROUP BY 1, 2 ORDER BY 1, 2
+'''
+EXPORT_ROWS = '''
+SELECT "timestamp", temperature, humidity FROM sensor_data
+WHERE "sensorId" = %s AND "timestamp" >= %s AND "timestamp" < %s
+ORDER BY "timestamp"
+'''
+
+
+def require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError:
+        raise ParseError('Parquet archive requires pyarrow', code=5)
+    return pa
+
+
+def month_of(ms: np.ndarray) -> np.ndarray:
+    """'YYYY-MM' of each epoch-millisecond timestamp."""
+    return np.datetime_as_string(ms.astype('datetime64[ms]').astype('datetime64[M]'), unit='M')
+
+
+def part_path(root: str, sensor_id: str, month: str, part: str) -> str:
+    return os.path.join(root, f'sensorId={quote(sensor_id, safe="")}', f'month={month}', f'{part}.parquet')
+
+
+def write_part(path: str, ms: np.ndarray, temperature: np.ndarray, humidity: np.ndarray) -> bool:
+    """Write one immutable part (rows sorted here); False when it already exists."""
+    if os.path.exists(path):
+        return False
+    pa = require_pyarrow()
+    order = np.argsort(ms, kind='stable')
+    table = pa.table({
+        'timestamp': pa.array(ms[order], type=pa.int64()).cast(pa.timestamp('ms', tz='UTC')),
+        'temperature': pa.array(temperature[order], type=pa.float64(), from_pandas=True),
+        'humidity': pa.array(humidity[order], type=pa.float64(), from_pandas=True),
+    })
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Prefixo '.': o leitor ignora a parte enquanto ela é gravada
+    tmp = os.path.join(os.path.dirname(path), f'.{os.path.basename(path)}.{uuid.uuid4().hex}.tmp')
+    try:
+        pa.parquet.write_table(table, tmp, compression='zstd', row_group_size=ROW_GROUP_ROWS)
+        os.replace(tmp, path)
+    except OSError as e:
+        raise ParseError(f'Archive write error: {e}', code=3)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return True
+
+
+def write_sensor(root: str, sensor_id: str, part: str, ms: np.ndarray, temperature: np.ndarray,
+                 humidity: np.ndarray) -> int:
+    """Split one sensor's readings by month into parts named ``part``; returns the parts written."""
+    if not len(ms):
+        return 0
+    months = month_of(ms)
+    written = 0
+    for month in np.unique(months).tolist():
+        sel = months == month
+        written += write_part(part_path(root, sensor_id, month, part), ms[sel], temperature[sel], humidity[sel])
+    return written
+
+
+class ArchiveTap:
+    """Pass the batches of a stream through, keeping the rows a sink accepts for :meth:`write`.
+
+    ``start`` and ``total`` are forwarded, so the tap can replace the stream
+    given to :func:`qtparser.pg_sink.load_rows`. Rows of channels without a
+    sensor are not kept.
+    """
+
+    def __init__(self, stream, target):
+        self._stream = stream
+        self._target = target
+        self._parts: dict = {}
+        self.start = getattr(stream, 'start', 0)
+        self.total = getattr(stream, 'total', None)
+
+    def __iter__(self):
+        from .pg_sink import accepted_rows
+        for batch in self._stream:
+            mask, _, _ = accepted_rows(batch)
+            idx = np.flatnonzero(mask)
+            ms = batch.timestamp.astype('datetime64[ns]', copy=False)[idx].view(np.int64) // NS_PER_MS
+            if batch.channel is None:
+                owners = {self._target.sensor_id: slice(None)}
+            else:
+                channels = batch.channel[idx]
+                owners = {self._target.channel_sensors.get(str(ch)) or self._target.sensor_id: channels == ch
+                          for ch in set(channels.tolist())}
+            for sensor, sel in owners.items():
+                if sensor:
+                    self._parts.setdefault(sensor, []).append(
+                        (ms[sel], batch.temperature[idx][sel], batch.humidity[idx][sel]))
+            yield batch
+
+    def write(self, root: str, part: str) -> int:
+        """Write the kept rows under ``root``; returns the parts written."""
+        written = 0
+        for sensor, chunks in self._parts.items():
+            ms, temp, hum = (np.concatenate(col) for col in zip(*chunks))
+            written += write_sensor(root, sensor, part, ms, temp, hum)
+        return written
+
+
+def export_months(conn, root: str, sensor_ids: Optional[List[str]] = None, before: Optional[str] = None) -> Iterable[dict]:
+    """Archive the months of ``sensor_data`` before ``before`` ('YYYY-MM', default: the current month).
+
+    Yields one result per sensor-month: ``written`` false when its part already existed.
+    """
+    require_pyarrow()
+    today = dt.datetime.now(dt.timezone.utc)
+    limit = dt.datetime.strptime(before, '%Y-%m') if before else dt.datetime(today.year, today.month, 1)
+    sensors = 'AND "sensorId" = ANY(%s)' if sensor_ids else ''
+    params = [limit] + ([sensor_ids] if sensor_ids else [])
+    months = conn.execute(EXPORT_MONTHS.format(sensors=sensors), params).fetchall()
+    for sensor, month, count in months:
+        path = part_path(root, sensor, month, DB_PART)
+        if os.path.exists(path):
+            yield {'sensorId': sensor, 'month': month, 'rows': count, 'written': False}
+            continue
+        lo = dt.datetime.strptime(month, '%Y-%m')
+        hi = dt.datetime(lo.year + lo.month // 12, lo.month % 12 + 1, 1)
+        rows = conn.execute(EXPORT_ROWS, (sensor, lo, hi)).fetchall()
+        ms = np.array([r[0] for r in rows], dtype='datetime64[ms]').astype(np.int64)
+        temp = np.array([r[1] for r in rows], dtype=float)
+        hum = np.array([np.nan if r[2] is None else r[2] for r in rows], dtype=float)
+        written = write_part(path, ms, temp, hum)
+        debug(f'Archived {sensor} {month}: {len(rows)} rows')
+        yield {'sensorId': sensor, 'month': month, 'rows': len(rows), 'written': written}
+
+
+def read_archive(root: str, sensor_ids: Optional[List[str]] = None, start=None, end=None):
+    """pyarrow Table (``sensorId``, ``timestamp``, ``temperature``, ``humidity``) with
+    ``start <= timestamp < end``, one row per sensor and timestamp, sorted.
+
+    Bounds are anything ``numpy.datetime64`` accepts (ISO strings, naive UTC datetimes).
+    """
+    pa = require_pyarrow()
+    ds = pa.dataset
+    fields = [('sensorId', pa.string()), ('month', pa.string())]
+    partitioning = ds.partitioning(pa.schema(fields), flavor='hive')
+    schema = pa.schema([('timestamp', pa.timestamp('ms', tz='UTC')), ('temperature', pa.float64()),
+                        ('humidity', pa.float64()), *fields])
+    if not os.path.isdir(root):
+        raise ParseError('Archive not found', code=2)
+    dataset = ds.dataset(root, format='parquet', partitioning=partitioning, schema=schema)
+    # O mês poda as pastas e o timestamp poda os row groups (estatísticas min/max)
+    conditions = []
+    if sensor_ids:
+        conditions.append(ds.field('sensorId').isin(sensor_ids))
+    if start is not None:
+        lo = np.datetime64(start, 'ms')
+        conditions.append(ds.field('month') >= str(lo.astype('datetime64[M]')))
+        conditions.append(ds.field('timestamp') >= _timestamp(pa, lo))
+    if end is not None:
+        hi = np.datetime64(end, 'ms')
+        conditions.append(ds.field('month') <= str((hi - 1).astype('datetime64[M]')))
+        conditions.append(ds.field('timestamp') < _timestamp(pa, hi))
+    expr = None
+    for condition in conditions:
+        expr = condition if expr is None else expr & condition
+    table = dataset.to_table(filter=expr, columns=['sensorId', 'timestamp', 'temperature', 'humidity'])
+    table = table.sort_by([('sensorId', 'ascending'), ('timestamp', 'ascending')])
+    if table.num_rows > 1:
+        ts = table['timestamp'].cast(pa.int64()).to_numpy()
+        ids = table['sensorId'].to_numpy(zero_copy_only=False)
+        keep = np.ones(table.num_rows, dtype=bool)
+        keep[1:] = (ts[1:] != ts[:-1]) | (ids[1:] != ids[:-1])
+        if not keep.all():
+            table = table.filter(pa.array(keep))
+    return table
+
+
+def _timestamp(pa, value: np.datetime64):
+    return pa.scalar(int(value.astype(np.int64)), type=pa.int64()).cast(pa.timestamp('ms', tz='UTC'))
+
+
+def to_row_batch(table) -> RowBatch:
+    ms = table['timestamp'].cast('int64').to_numpy()
+    return RowBatch(
+        ms.astype('datetime64[ms]').astype('datetime64[ns]'),
+        table['temperature'].to_numpy(zero_copy_only=False).astype(float),
+        table['humidity'].to_numpy(zero_copy_only=False).astype(float),
+    )
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog='python -m qtparser.archive', description='Parquet archive of sensor readings.')
+    sub = p.add_subparsers(dest='command', required=True)
+    e = sub.add_parser('export', help='archive the closed months of sensor_data')
+    e.add_argument('root', help='archive directory')
+    e.add_argument('--sensor-id', action='append', default=None, help='only this sensor (repeatable)')
+    e.add_argument('--before', default=None, help='archive months before YYYY-MM (default: the current month)')
+    e.add_argument('--dsn', default=None, help='connection URL (default: $DATABASE_URL)')
+    r = sub.add_parser('read', help='print archived readings as NDJSON')
+    r.add_argument('root', help='archive directory')
+    r.add_argument('--sensor-id', action='append', default=None, help='only this sensor (repeatable)')
+    r.add_argument('--from', dest='start', default=None, help='first timestamp (UTC, ISO 8601)')
+    r.add_argument('--to', dest='end', default=None, help='end timestamp, exclusive (UTC, ISO 8601)')
+    args = p.parse_args(argv)
+    try:
+        if args.command == 'export':
+            dsn = args.dsn or os.environ.get('DATABASE_URL')
+            if not dsn:
+                p.error('--dsn or DATABASE_URL is required')
+            if args.before:
+                try:
+                    dt.datetime.strptime(args.before, '%Y-%m')
+                except ValueError:
+                    p.error('--before must be YYYY-MM')
+            from .pg_sink import connect, require_psycopg
+            psycopg = require_psycopg()
+            with connect(dsn) as conn:
+                try:
+                    for result in export_months(conn, args.root, args.sensor_id, args.before):
+                        print(json.dumps(result, ensure_ascii=False), flush=True)
+                except psycopg.Error as e:
+                    raise ParseError(f'Database error: {e}', code=7)
+        else:
+            from .emit import write_ndjson
+            try:
+                bounds = [None if v is None else np.datetime64(v.rstrip('Z'), 'ms') for v in (args.start, args.end)]
+            except ValueError as e:
+                raise ParseError(f'Invalid date: {e}', code=1)
+            table = read_archive(args.root, args.sensor_id, *bounds)
+            batch = to_row_batch(table)
+            ids = table['sensorId'].to_numpy(zero_copy_only=False)
+            # Tabela ordenada por sensor: cada sensor é um trecho contínuo
+            for sensor in dict.fromkeys(ids.tolist()):
+                sel = np.flatnonzero(ids == sensor)
+                write_ndjson(batch.slice(sel[0], sel[-1] + 1), sys.stdout, {'sensorId': sensor})
+    except ParseError as e:
+        print(json.dumps({'error': str(e)}))
+        return e.code
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Arrow IPC output: record batches instead of one JSON object per row.
+
+Schema (little-endian, uncompressed, no dictionaries):
+
+- ``timestamp_ms``: int64 epoch milliseconds, UTC (null = missing)
+- ``temperature``, ``humidity``: float64 (null = missing)
+- ``channel``: utf8, only with ``--channels``
+
+The schema metadata carries ``total`` (expected rows, empty when unknown).
+pyarrow is optional; it is only imported when this format is requested.
+"""
+import numpy as np
+
+from .batch import RowBatch
+from .errors import ParseError
+
+NS_PER_MS = 1_000_000
+
+
+def require_pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ParseError('Arrow output requires pyarrow', code=5)
+    return pa
+
+
+def output_schema(pa, channels: bool, total):
+    fields = [
+        pa.field('timestamp_ms', pa.int64()),
+        pa.field('temperature', pa.float64()),
+        pa.field('humidity', pa.float64()),
+    ]
+    if channels:
+        fields.append(pa.field('channel', pa.string()))
+    return pa.schema(fields, metadata={'total': '' if total is None else str(total)})
+
+
+def to_record_batch(pa, batch: RowBatch, schema):
+    ts = batch.timestamp.astype('datetime64[ns]', copy=False)
+    nat = np.isnat(ts)
+    # Divisão inteira (floor) mantém instantes anteriores a 1970 no milissegundo certo
+    ms = ts.view(np.int64) // NS_PER_MS
+    arrays = [
+        pa.array(ms, type=pa.int64(), mask=nat),
+        pa.array(batch.temperature, type=pa.float64(), from_pandas=True),
+        pa.array(batch.humidity, type=pa.float64(), from_pandas=True),
+    ]
+    if 'channel' in schema.names:
+        channel = batch.channel if batch.channel is not None else np.full(len(batch), None, dtype=object)
+        arrays.append(pa.array(channel, type=pa.string()))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_arrow(stream, sink, channels: bool, file_format: bool = False) -> int:
+    """Write every batch of ``stream`` to ``sink``; returns the row count.
+
+    ``file_format`` writes the random-access Arrow file layout (suitable for
+    memory-mapping) instead of the streaming one.
+    """
+    pa = require_pyarrow()
+    schema = output_schema(pa, channels, stream.total)
+    opener = pa.ipc.new_file if file_format else pa.ipc.new_stream
+    rows = 0
+    with opener(sink, schema) as writer:
+        for batch in stream:
+            if len(batch) == 0:
+                continue
+            writer.write_batch(to_record_batch(pa, batch, schema))
+            rows += len(batch)
+    return rows
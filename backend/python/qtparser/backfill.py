@@ -0,0 +1,328 @@
+"""Re-parse already imported files with the current parser: ``python -m qtparser.backfill <dir|glob|file>...``.
+
+Parser fixes only reach new uploads; the rows of older imports stay as the
+parser of the time produced them. Each file given here (directories are
+searched like :mod:`qtparser.bulk`) is matched to its stored rows by
+``fileName`` (the file's base name), parsed again, and compared with the rows
+of that file in ``sensor_data`` by timestamp, once per sensor it was imported
+for:
+
+* ``missing``: rows the stored import lacks; they are inserted,
+* ``changed``: rows whose temperature or humidity differ; they are updated,
+* ``storedOnly``: stored rows the current parser does not produce; left alone.
+
+A file stored for several sensors is parsed with ``channels``: each sensor is
+compared with the channel whose readings it holds (most matching timestamp and
+temperature pairs), or with every row when the file has a single probe (the
+same export imported for each sensor). ``--sensor-id`` limits the run to one
+sensor. Inserted and updated rows get ``parserVersion`` =
+:data:`qtparser.__version__`.
+The comparison runs in the database (COPY into the staging table of
+:mod:`qtparser.pg_sink`, then one set-based update and one anti-join insert),
+one transaction per file. Each (file, sensor) pair is backfilled once per
+parser version: the run is recorded in ``import_checkpoints`` and the next run
+skips it (status ``current``); the file is parsed only when some pair is due.
+
+Load on production is capped by ``--jobs`` (default 1), ``--rows-per-sec``
+(each worker pauses after every parsed batch until it is within its share of
+the rate)
+and ``--budget-seconds`` (no file is started after that; the rest are
+reported as ``deferred`` for the next run). ``--dry-run`` only reports the
+counts.
+
+Output is one JSON line per file and sensor (``status``: ``backfilled``,
+``dryRun``, ``current``, ``notImported``, ``deferred`` or ``failed``; ``rows``
+and ``failed`` count the whole file) and a final
+``{"total": {...}}`` line. The exit status is 1 when any file failed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import replace
+from typing import List, Optional
+
+from . import bulk
+from .errors import ParseError
+from .options import ParseOptions
+
+# Diferença mínima para uma leitura contar como alterada (os loggers gravam até 2 casas)
+TOLERANCE = 1e-6
+
+STORED = '''
+SELECT "sensorId", "validationId", count(*) FROM sensor_data
+WHERE "fileName" = %s GROUP BY 1, 2 ORDER BY 3 DESC
+'''
+# Multicanal: o staging guarda o canal em "sensorId"; cada sensor fica com o canal de mais leituras iguais
+CHANNELS = '''
+SELECT d."sensorId", s."sensorId", count(*) FROM sensor_data d
+JOIN qtparser_stage s ON s."timestamp" = d."timestamp" AND abs(s.temperature - d.temperature) <= %(tolerance)s
+WHERE d."fileName" = %(file_name)s AND d."sensorId" = ANY(%(sensors)s)
+GROUP BY 1, 2 ORDER BY 3 DESC, 1, 2
+'''
+# Uma linha por timestamp do arquivo (a primeira) e do canal do sensor, como a chave de comparação
+STAGED = '''
+WITH staged AS (
+    SELECT DISTINCT ON ("timestamp") * FROM qtparser_stage
+    WHERE %(channel)s::text IS NULL OR "sensorId" = %(channel)s
+    ORDER BY "timestamp", "rowNumber"
+), stored AS (
+    SELECT "timestamp", temperature, humidity FROM sensor_data
+    WHERE "sensorId" = %(sensor_id)s AND "fileName" = %(file_name)s
+)
+'''
+CHANGED = '''(abs(d.temperature - s.temperature) > %(tolerance)s
+     OR (d.humidity IS NULL) <> (s.humidity IS NULL)
+     OR abs(d.humidity - s.humidity) > %(tolerance)s)'''
+DIFF = STAGED + f'''
+SELECT
+    (SELECT count(*) FROM staged),
+    (SELECT count(*) FROM staged s WHERE NOT EXISTS (SELECT 1 FROM stored d WHERE d."timestamp" = s."timestamp")),
+    (SELECT count(DISTINCT s."timestamp") FROM staged s JOIN stored d ON d."timestamp" = s."timestamp" WHERE {CHANGED}),
+    (SELECT count(*) FROM stored d WHERE NOT EXISTS (SELECT 1 FROM staged s WHERE s."timestamp" = d."timestamp"))
+'''
+UPDATE = STAGED + f'''
+UPDATE sensor_data d
+SET temperature = s.temperature, humidity = s.humidity, "parserVersion" = %(parser_version)s
+FROM staged s
+WHERE d."sensorId" = %(sensor_id)s AND d."fileName" = %(file_name)s AND d."timestamp" = s."timestamp"
+  AND {CHANGED}
+'''
+INSERT = STAGED + '''
+INSERT INTO sensor_data
+    (id, "sensorId", "timestamp", temperature, humidity, "fileName", "rowNumber", "createdAt", "validationId",
+     "parserVersion")
+SELECT 'c' || substr(md5(random()::text || clock_timestamp()::text || s."rowNumber"::text), 1, 24),
+       %(sensor_id)s, s."timestamp", s.temperature, s.humidity, %(file_name)s, s."rowNumber",
+       now() AT TIME ZONE 'UTC', %(validation_id)s, %(parser_version)s
+FROM staged s
+WHERE NOT EXISTS (SELECT 1 FROM stored d WHERE d."timestamp" = s."timestamp")
+ON CONFLICT DO NOTHING
+'''
+
+
+def stored_targets(conn, file_name: str) -> List[tuple]:
+    """(sensor id, validation id, stored rows) of each sensor a file was imported for."""
+    targets: dict = {}
+    for sensor, validation, count in conn.execute(STORED, (file_name,)).fetchall():
+        # Linhas novas vão para a validação que já tem a maior parte do arquivo
+        _, best, rows = targets.get(sensor, (sensor, validation, 0))
+        targets[sensor] = (sensor, best, rows + count)
+    return list(targets.values())
+
+
+def match_channels(cur, file_name: str, sensors: List[str]) -> dict:
+    """{sensor: channel} from the staged channels and the stored rows of ``sensors``."""
+    cur.execute(CHANNELS, {'file_name': file_name, 'sensors': sensors, 'tolerance': TOLERANCE})
+    matched: dict = {}
+    for sensor, channel, _ in cur.fetchall():
+        if sensor not in matched and channel not in matched.values():
+            matched[sensor] = channel
+    return matched
+
+
+def throttle(rows: int, rows_per_sec: float, t0: float) -> None:
+    """Sleep until ``rows`` parsed since ``t0`` are within ``rows_per_sec``."""
+    if rows_per_sec > 0:
+        ahead = rows / rows_per_sec - (time.monotonic() - t0)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+def backfill_file(path: str, sensor_id: Optional[str], base: ParseOptions, dry_run: bool = False,
+                  rows_per_sec: float = 0) -> List[dict]:
+    """Compare one file with the stored rows of each of its sensors and apply the difference.
+
+    Returns one result per (file, sensor) pair; runs inside a pool worker.
+    """
+    from . import __version__
+    from .pg_sink import Checkpoint, SinkTarget, checkpoint_options, file_sha256, require_psycopg
+    psycopg = require_psycopg()
+    t0 = time.monotonic()
+    name = os.path.basename(path)
+    try:
+        conn = bulk.worker_connection()
+        stored = stored_targets(conn, name)
+        # Vários sensores: arquivo multicanal (um canal por sensor) ou o mesmo arquivo importado para cada um
+        options = replace(base, channels=len(stored) > 1)
+        if sensor_id:
+            stored = [t for t in stored if t[0] == sensor_id]
+        if not stored:
+            return [{'status': 'notImported', 'ms': int((time.monotonic() - t0) * 1000)}]
+        file_hash = file_sha256(path)
+        results, due = [], []
+        for sensor, validation, stored_rows in stored:
+            target = SinkTarget(dsn=bulk.worker_dsn(), file_name=name, sensor_id=sensor, validation_id=validation)
+            checkpoint = Checkpoint(file_hash, name,
+                                    {'backfill': __version__, **checkpoint_options(options, target)}).load(conn)
+            result = {'sensorId': sensor, 'stored': stored_rows}
+            if checkpoint.completed:
+                results.append({**result, 'status': 'current', 'rows': checkpoint.last_row, **checkpoint.totals})
+            else:
+                due.append((target, checkpoint, result))
+        if due:
+            results += _apply(conn, psycopg, path, options, due, dry_run, rows_per_sec, t0)
+    except ParseError as e:
+        return [{'status': 'failed', 'error': str(e), 'code': e.code, 'ms': int((time.monotonic() - t0) * 1000)}]
+    except psycopg.Error as e:
+        return [{'status': 'failed', 'error': f'Database error: {e}', 'code': 7,
+                 'ms': int((time.monotonic() - t0) * 1000)}]
+    ms = int((time.monotonic() - t0) * 1000)
+    return [{**r, 'ms': ms} for r in results]
+
+
+def _apply(conn, psycopg, path: str, options: ParseOptions, due: list, dry_run: bool, rows_per_sec: float,
+           t0: float) -> List[dict]:
+    """Stage the parsed file once and diff/apply it for each due (target, checkpoint, result)."""
+    from . import __version__, api
+    from .pg_sink import STAGE_COPY, STAGE_DDL, SinkTarget, accepted_rows, copy_lines, copy_text
+    name = os.path.basename(path)
+    stream = api.parse(path, options)
+    # Sem canal, todas as linhas vão para o mesmo marcador no staging
+    stage_target = SinkTarget(dsn='', file_name=name)
+    rows = failed = 0
+    results = []
+    with conn.transaction(), conn.cursor() as cur:
+        cur.execute(STAGE_DDL)
+        channels: dict = {}
+        with cur.copy(STAGE_COPY) as copy:
+            for batch in stream:
+                mask, no_ts, bad_temp = accepted_rows(batch)
+                if batch.channel is not None:
+                    for ch in set(batch.channel.tolist()):
+                        channels.setdefault(ch, copy_text(str(ch)))
+                copy.write(copy_lines(batch, mask, rows + 1, stage_target, channels))
+                rows += len(batch)
+                failed += no_ts + bad_temp
+                # Limite de carga por lote: o worker não passa da sua cota de linhas/s
+                throttle(rows, rows_per_sec, t0)
+        cur.execute('ANALYZE qtparser_stage')
+        multi = len(channels) > 1
+        matched = match_channels(cur, name, [t.sensor_id for t, _, _ in due]) if multi else {}
+        for target, checkpoint, result in due:
+            result.update(rows=rows, failed=failed)
+            if multi and target.sensor_id not in matched:
+                results.append({**result, 'status': 'failed', 'error': 'No channel matches the stored rows', 'code': 1})
+                continue
+            params = {'sensor_id': target.sensor_id, 'file_name': name, 'validation_id': target.validation_id,
+                      'parser_version': __version__, 'tolerance': TOLERANCE, 'channel': matched.get(target.sensor_id)}
+            if multi:
+                result['channel'] = params['channel']
+            cur.execute(DIFF, params)
+            staged, missing, changed, stored_only = cur.fetchone()
+            result.update(missing=missing, changed=changed, storedOnly=stored_only)
+            results.append(result)
+            if dry_run:
+                result['status'] = 'dryRun'
+                continue
+            cur.execute(UPDATE, params)
+            result['updated'] = cur.rowcount
+            cur.execute(INSERT, params)
+            result['inserted'] = cur.rowcount
+            result['status'] = 'backfilled'
+            # duplicates = leituras aceitas que o sensor já tinha (iguais ou corrigidas)
+            checkpoint.save(cur, rows, {'inserted': result['inserted'], 'duplicates': staged - missing,
+                                        'failed': failed}, True)
+        if dry_run:
+            raise psycopg.Rollback()
+    return results
+
+
+def run_backfill(files: List[str], base: ParseOptions, dsn: str, out, jobs: int = 1,
+                 sensor_id: Optional[str] = None, dry_run: bool = False, rows_per_sec: float = 0,
+                 budget_seconds: float = 0) -> dict:
+    """Backfill ``files`` and write one JSON line per file plus the total to ``out``; returns the total."""
+    t0 = time.monotonic()
+    total = {'files': len(files), 'failed': 0, 'deferred': 0, 'rows': 0, 'missing': 0, 'changed': 0,
+             'inserted': 0, 'updated': 0}
+
+    def report(path: str, results: List[dict]) -> None:
+        parsed = False
+        for result in results:
+            if result['status'] == 'failed':
+                total['failed'] += 1
+            elif result['status'] == 'deferred':
+                total['deferred'] += 1
+            if result['status'] in ('backfilled', 'dryRun'):
+                # rows é do arquivo inteiro: conta uma vez, mesmo com vários sensores
+                total['rows'] += 0 if parsed else result.get('rows', 0)
+                parsed = True
+                for key in ('missing', 'changed', 'inserted', 'updated'):
+                    total[key] += result.get(key, 0)
+            out.write(json.dumps({'file': path, **result}, ensure_ascii=False) + '\n')
+        out.flush()
+
+    sizes = {f: os.path.getsize(f) for f in files}
+    todo = sorted(files, key=lambda f: -sizes[f])
+    workers = max(1, min(len(todo), jobs))
+    # Um núcleo por arquivo: o backfill disputa a máquina com a produção
+    options = replace(base, prefetch=0, sheet_workers=1, shard_workers=1)
+    share = rows_per_sec / workers if rows_per_sec > 0 else 0
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers, initializer=bulk.init_worker, initargs=(dsn,)) as pool:
+            running = {}
+            while todo or running:
+                over = budget_seconds > 0 and time.monotonic() - t0 >= budget_seconds
+                while todo and len(running) < workers and not over:
+                    path = todo.pop(0)
+                    running[pool.submit(backfill_file, path, sensor_id, options, dry_run, share)] = path
+                if over:
+                    for path in todo:
+                        report(path, [{'status': 'deferred'}])
+                    todo = []
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    path = running.pop(fut)
+                    try:
+                        results = fut.result()
+                    except Exception as e:
+                        # Worker morto (ex.: sem memória): só este arquivo falha
+                        results = [{'status': 'failed', 'error': f'{type(e).__name__}: {e}', 'code': 1}]
+                    report(path, results)
+
+    total.update(workers=workers, ms=int((time.monotonic() - t0) * 1000))
+    out.write(json.dumps({'total': total}) + '\n')
+    out.flush()
+    return total
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog='python -m qtparser.backfill', description='Re-parse imported files with the current parser and apply missing or changed rows.')
+    p.add_argument('inputs', nargs='+', help='directories, globs or files (matched to sensor_data by file name)')
+    p.add_argument('--dsn', default=None, help='connection URL (default: $DATABASE_URL)')
+    p.add_argument('--jobs', type=int, default=1, help='worker processes and database connections (default: 1)')
+    p.add_argument('--sensor-id', default=None, help='only the rows of this sensor (default: every sensor the file was imported for)')
+    p.add_argument('--vendor', default=None, help='logger vendor hint (elitech, novus, instrutemp, testo)')
+    p.add_argument('--engine', choices=['pandas', 'polars'], default='pandas', help='engine of the full pipeline')
+    p.add_argument('--rows-per-sec', type=float, default=0, help='cap on parsed rows per second over all workers (0 = no cap)')
+    p.add_argument('--budget-seconds', type=float, default=0, help='start no file after this long; the rest are deferred (0 = no limit)')
+    p.add_argument('--dry-run', action='store_true', help='only report missing/changed rows, write nothing')
+    args = p.parse_args(argv)
+    dsn = args.dsn or os.environ.get('DATABASE_URL')
+    if not dsn:
+        p.error('--dsn or DATABASE_URL is required')
+    if args.jobs < 1:
+        p.error('--jobs must be >= 1')
+
+    from .pg_sink import connect
+    try:
+        files = bulk.find_files(args.inputs)
+        if not files:
+            raise ParseError('No .xls/.xlsx files found', code=2)
+        # Falhar já na partida se o banco ou o psycopg não estiverem disponíveis
+        connect(dsn).close()
+    except ParseError as e:
+        print(json.dumps({'error': str(e)}))
+        return e.code
+    base = ParseOptions(vendor=args.vendor, engine=args.engine)
+    total = run_backfill(files, base, dsn, sys.stdout, args.jobs, args.sensor_id, args.dry_run,
+                         args.rows_per_sec, args.budget_seconds)
+    return 1 if total['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
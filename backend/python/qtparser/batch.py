@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+import numpy as np
+
+
+@dataclass
+class RowBatch:
+    """A block of normalized rows, one numpy array per column.
+
+    ``timestamp`` is datetime64[ns] in UTC (NaT = missing); ``temperature`` and
+    ``humidity`` are float64 (NaN = missing); ``channel`` holds the probe id of
+    each row in multi-channel mode and is None otherwise.
+    """
+    timestamp: np.ndarray
+    temperature: np.ndarray
+    humidity: np.ndarray
+    channel: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def slice(self, start: int, stop: int) -> 'RowBatch':
+        return RowBatch(
+            self.timestamp[start:stop],
+            self.temperature[start:stop],
+            self.humidity[start:stop],
+            self.channel[start:stop] if self.channel is not None else None,
+        )
+
+    def take(self, idx: np.ndarray) -> 'RowBatch':
+        """Rows at ``idx`` (indices or a boolean mask)."""
+        return RowBatch(
+            self.timestamp[idx],
+            self.temperature[idx],
+            self.humidity[idx],
+            self.channel[idx] if self.channel is not None else None,
+        )
+
+    def split(self, batch_size: int) -> Iterator['RowBatch']:
+        step = max(1, batch_size)
+        for start in range(0, len(self), step):
+            yield self.slice(start, start + step)
+
+    @classmethod
+    def from_frame(cls, frame) -> 'RowBatch':
+        """Build from the engine's frame (tz-aware UTC ``timestamp`` column)."""
+        ts = frame['timestamp']
+        if getattr(ts.dt, 'tz', None) is not None:
+            ts = ts.dt.tz_convert('UTC').dt.tz_localize(None)
+        return cls(
+            ts.to_numpy(dtype='datetime64[ns]'),
+            frame['temperature'].to_numpy(dtype=float),
+            frame['humidity'].to_numpy(dtype=float),
+            frame['channel'].to_numpy(dtype=object) if 'channel' in frame.columns else None,
+        )
+
+    def to_frame(self):
+        import pandas as pd
+        frame = pd.DataFrame({
+            'timestamp': pd.to_datetime(self.timestamp).tz_localize('UTC'),
+            'temperature': self.temperature,
+            'humidity': self.humidity,
+        })
+        if self.channel is not None:
+            frame['channel'] = self.channel
+        return frame
@@ -0,0 +1,315 @@
+"""Compact storage of readings: one row per sensor and UTC day in ``sensor_data_blocks``.
+
+A ``sensor_data`` row per reading (cuid, repeated ``fileName``, six indexes)
+is heavy for year-long minute-level studies. With ``--storage blocks`` the
+PostgreSQL sink writes one block per sensor and day instead, each column a
+zlib-compressed little-endian int32 array:
+
+* ``timestamps``: milliseconds since the previous reading (the first since ``firstTs``),
+* ``temperature``: value x ``scale``, rounded, as deltas from the previous reading,
+* ``humidity``: value x ``scale``, rounded, ``NO_VALUE`` where missing (NULL when the day has none).
+
+Values are kept to 1/``scale`` (0.01). Rows get the same validation as the
+rows mode (see :func:`qtparser.pg_sink.accepted_rows`); readings whose scaled
+values (and their deltas) would not fit in int32 are refused as well. A day is
+written as soon as the stream moves past it, and with a checkpoint every
+``checkpoint.every`` rows are committed with it, like the rows mode. Importing into a day
+that already has a block merges the two: readings at a timestamp the block
+already holds count as duplicates and the stored ones win, like the rows
+mode. Blocks of one sensor are rewritten under a transaction-level advisory
+lock, so concurrent imports of the same sensor do not lose readings.
+
+:func:`read_range` expands the blocks of a time range back into a
+:class:`~qtparser.batch.RowBatch`; ``python -m qtparser.blocks <sensor-id>...
+--from ... --to ...`` prints them as NDJSON (one ``sensorId`` per row).
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import sys
+import time
+import zlib
+from typing import Iterable, Optional
+
+import numpy as np
+
+from . import __version__
+from .batch import RowBatch
+from .errors import ParseError
+from .logs import event
+
+SCALE = 100
+NO_VALUE = np.iinfo(np.int32).min
+# Maior valor escalado aceito: a diferença entre duas leituras também cabe em int32
+MAX_SCALED = np.iinfo(np.int32).max // 2
+MS_PER_DAY = 86_400_000
+EPOCH = dt.datetime(1970, 1, 1)
+_I32 = np.dtype('<i4')
+
+LOAD_BLOCKS = '''
+SELECT day, "firstTs", scale, timestamps, temperature, humidity FROM sensor_data_blocks
+WHERE "sensorId" = %s AND day = ANY(%s)
+'''
+SAVE_BLOCK = '''
+INSERT INTO sensor_data_blocks
+    (id, "sensorId", day, count, "firstTs", "lastTs", scale, timestamps, temperature, humidity, "parserVersion", "updatedAt")
+VALUES ('c' || substr(md5(random()::text || clock_timestamp()::text), 1, 24), %(sensor_id)s, %(day)s, %(count)s,
+        %(first_ts)s, %(last_ts)s, %(scale)s, %(timestamps)s, %(temperature)s, %(humidity)s, %(parser_version)s,
+        now() AT TIME ZONE 'UTC')
+ON CONFLICT ("sensorId", day) DO UPDATE SET
+    count = EXCLUDED.count, "firstTs" = EXCLUDED."firstTs", "lastTs" = EXCLUDED."lastTs", scale = EXCLUDED.scale,
+    timestamps = EXCLUDED.timestamps, temperature = EXCLUDED.temperature, humidity = EXCLUDED.humidity,
+    "parserVersion" = EXCLUDED."parserVersion", "updatedAt" = EXCLUDED."updatedAt"
+'''
+
+
+def _pack(values: np.ndarray) -> bytes:
+    return zlib.compress(values.astype(_I32, copy=False).tobytes())
+
+
+def _unpack(data: bytes) -> np.ndarray:
+    return np.frombuffer(zlib.decompress(data), dtype=_I32).astype(np.int64)
+
+
+def _ms(value) -> int:
+    return int(np.datetime64(value, 'ms').astype(np.int64))
+
+
+def representable(temperature: np.ndarray, humidity: np.ndarray, scale: int = SCALE) -> np.ndarray:
+    """Mask of the readings a block can hold (missing humidity is fine)."""
+    with np.errstate(invalid='ignore'):
+        ok = np.abs(np.rint(temperature * scale)) <= MAX_SCALED
+        return ok & ~(np.abs(np.rint(humidity * scale)) > MAX_SCALED)
+
+
+def encode_block(ms: np.ndarray, temperature: np.ndarray, humidity: np.ndarray, scale: int = SCALE) -> dict:
+    """Columns of one block; ``ms`` (epoch milliseconds) must be sorted and within one day."""
+    if not representable(temperature, humidity, scale).all():
+        raise ParseError(f'Reading out of the block range (|value| > {MAX_SCALED / scale:g})', code=1)
+    temp = np.rint(temperature * scale).astype(np.int64)
+    has_hum = np.isfinite(humidity)
+    hum = np.rint(np.where(has_hum, humidity, 0) * scale).astype(np.int64)
+    return {
+        'count': len(ms),
+        'first_ts': EPOCH + dt.timedelta(milliseconds=int(ms[0])),
+        'last_ts': EPOCH + dt.timedelta(milliseconds=int(ms[-1])),
+        'scale': scale,
+        'timestamps': _pack(np.diff(ms, prepend=ms[0])),
+        'temperature': _pack(np.diff(temp, prepend=0)),
+        'humidity': _pack(np.where(has_hum, hum, NO_VALUE)) if has_hum.any() else None,
+    }
+
+
+def decode_block(first_ts, scale: int, timestamps: bytes, temperature: bytes, humidity: Optional[bytes]) -> tuple:
+    """(epoch ms, temperature, humidity) arrays of a stored block."""
+    ms = _ms(first_ts) + np.cumsum(_unpack(timestamps))
+    temp = np.cumsum(_unpack(temperature)) / scale
+    if humidity is None:
+        hum = np.full(len(ms), np.nan)
+    else:
+        raw = _unpack(humidity)
+        hum = np.where(raw == NO_VALUE, np.nan, raw / scale)
+    return ms, temp, hum
+
+
+def _owners(batch: RowBatch, idx: np.ndarray, target) -> np.ndarray:
+    if batch.channel is None:
+        return np.full(len(idx), target.default_sensor(), dtype=object)
+    lookup = {}
+    for ch in set(batch.channel[idx].tolist()):
+        lookup[ch] = target.channel_sensors.get(str(ch)) or target.default_sensor()
+    return np.array([lookup[ch] for ch in batch.channel[idx].tolist()], dtype=object)
+
+
+def merge_sensor(cur, sensor_id: str, ms: np.ndarray, temp: np.ndarray, hum: np.ndarray) -> tuple:
+    """Merge one sensor's new readings into its day blocks; (inserted, duplicates, blocks written)."""
+    # Leituras repetidas no próprio arquivo: vale a primeira
+    order = np.argsort(ms, kind='stable')
+    ms, temp, hum = ms[order], temp[order], hum[order]
+    keep = np.ones(len(ms), dtype=bool)
+    keep[1:] = ms[1:] != ms[:-1]
+    duplicates = int((~keep).sum())
+    ms, temp, hum = ms[keep], temp[keep], hum[keep]
+    days = ms // MS_PER_DAY
+    wanted = [EPOCH.date() + dt.timedelta(days=int(d)) for d in np.unique(days)]
+    cur.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', (f'sensor_data_blocks:{sensor_id}',))
+    cur.execute(LOAD_BLOCKS, (sensor_id, wanted))
+    stored = {row[0]: decode_block(*row[1:]) for row in cur.fetchall()}
+    inserted = blocks = 0
+    bounds = np.flatnonzero(np.diff(days)) + 1
+    for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(ms)]):
+        day = EPOCH.date() + dt.timedelta(days=int(days[lo]))
+        d_ms, d_temp, d_hum = ms[lo:hi], temp[lo:hi], hum[lo:hi]
+        if day in stored:
+            old_ms, old_temp, old_hum = stored[day]
+            new = ~np.isin(d_ms, old_ms)
+            duplicates += int((~new).sum())
+            if not new.any():
+                continue
+            d_ms = np.concatenate([old_ms, d_ms[new]])
+            d_temp = np.concatenate([old_temp, d_temp[new]])
+            d_hum = np.concatenate([old_hum, d_hum[new]])
+            order = np.argsort(d_ms, kind='stable')
+            d_ms, d_temp, d_hum = d_ms[order], d_temp[order], d_hum[order]
+            inserted += int(new.sum())
+        else:
+            inserted += int(hi - lo)
+        cur.execute(SAVE_BLOCK, {'sensor_id': sensor_id, 'day': day, 'parser_version': __version__,
+                                 **encode_block(d_ms, d_temp, d_hum)})
+        blocks += 1
+    return inserted, duplicates, blocks
+
+
+def load_blocks(conn, stream: Iterable[RowBatch], target, progress=None, checkpoint=None) -> dict:
+    """Write the accepted rows of ``stream`` as day blocks on ``conn``; returns the summary.
+
+    Same summary and transactions as :func:`qtparser.pg_sink.load_rows`, plus
+    ``blocks`` (block writes): without ``checkpoint`` everything is one
+    transaction; with it, every ``checkpoint.every`` rows the buffered days are
+    written and committed with the checkpoint. Within a transaction a sensor's
+    day is written as soon as a reading of a later day arrives, so only the
+    open day of each sensor stays in memory.
+    """
+    from .pg_sink import NS_PER_MS, accepted_rows, require_psycopg
+    psycopg = require_psycopg()
+    t0 = time.monotonic()
+    resumed = checkpoint.last_row if checkpoint else 0
+    first = getattr(stream, 'start', 0)
+    summary = {'rows': first, **(checkpoint.totals if checkpoint else {'inserted': 0, 'duplicates': 0, 'failed': 0}),
+               'noTimestamp': 0, 'badTemperature': 0, 'unknownSensor': 0, 'blocks': 0}
+    if resumed:
+        summary['resumedFrom'] = resumed
+    if first > resumed:
+        summary['appendSkipped'] = first - resumed
+    # Leituras aceitas ainda não gravadas, por sensor: (ms, temperatura, umidade)
+    pending: dict = {}
+    known: dict = {}
+
+    def flush(cur, final: bool) -> None:
+        """Merge the buffered days; the newest day of each sensor waits unless ``final``."""
+        new = [sensor for sensor in pending if sensor not in known]
+        if new:
+            cur.execute('SELECT id FROM sensors WHERE id = ANY(%s)', (new,))
+            found = {row[0] for row in cur.fetchall()}
+            known.update((sensor, sensor in found) for sensor in new)
+        for sensor in sorted(pending):
+            ms, temp, hum = (np.concatenate(col) for col in zip(*pending.pop(sensor)))
+            if not known[sensor]:
+                summary['unknownSensor'] += len(ms)
+                summary['failed'] += len(ms)
+                continue
+            days = ms // MS_PER_DAY
+            done = np.ones(len(ms), dtype=bool) if final else days != days[-1]
+            if not done.all():
+                pending[sensor] = [(ms[~done], temp[~done], hum[~done])]
+            if done.any():
+                inserted, duplicates, blocks = merge_sensor(cur, sensor, ms[done], temp[done], hum[done])
+                summary['inserted'] += inserted
+                summary['duplicates'] += duplicates
+                summary['blocks'] += blocks
+
+    batches = iter(stream)
+    exhausted = False
+    try:
+        while not exhausted:
+            with conn.transaction(), conn.cursor() as cur:
+                chunk_start = summary['rows']
+                for batch in batches:
+                    mask, no_ts, bad_temp = accepted_rows(batch)
+                    out_of_range = mask & ~representable(batch.temperature, batch.humidity)
+                    idx = np.flatnonzero(mask & ~out_of_range)
+                    ms = batch.timestamp.astype('datetime64[ns]', copy=False)[idx].view(np.int64) // NS_PER_MS
+                    owners = _owners(batch, idx, target)
+                    for sensor in set(owners.tolist()):
+                        sel = owners == sensor
+                        pending.setdefault(sensor, []).append(
+                            (ms[sel], batch.temperature[idx][sel], batch.humidity[idx][sel]))
+                    summary['rows'] += len(batch)
+                    summary['noTimestamp'] += no_ts
+                    summary['badTemperature'] += bad_temp
+                    summary['failed'] += no_ts + bad_temp + int(out_of_range.sum())
+                    if progress:
+                        progress(summary['rows'])
+                    flush(cur, final=False)
+                    if checkpoint and summary['rows'] - chunk_start >= checkpoint.every:
+                        break
+                else:
+                    exhausted = True
+                # Fim do trecho: o checkpoint só vale com todas as linhas até aqui gravadas
+                flush(cur, final=True)
+                if checkpoint:
+                    totals = {k: summary[k] for k in ('inserted', 'duplicates', 'failed')}
+                    checkpoint.save(cur, summary['rows'], totals, exhausted)
+            if checkpoint:
+                event('checkpoint', last_row=summary['rows'], completed=exhausted)
+        event('counts', blocks=summary['blocks'])
+    except psycopg.Error as e:
+        raise ParseError(f'Database error: {e}', code=7)
+    summary['ms'] = int((time.monotonic() - t0) * 1000)
+    return summary
+
+
+def read_range(conn, sensor_id: str, start=None, end=None) -> RowBatch:
+    """Readings of ``sensor_id`` with ``start <= timestamp < end`` (either bound optional), in time order.
+
+    Bounds are anything ``numpy.datetime64`` accepts (ISO strings, naive UTC datetimes).
+    """
+    where, params = ['"sensorId" = %s'], [sensor_id]
+    lo = hi = None
+    if start is not None:
+        lo = _ms(start)
+        where.append('day >= %s')
+        params.append(EPOCH.date() + dt.timedelta(days=lo // MS_PER_DAY))
+    if end is not None:
+        hi = _ms(end)
+        where.append('day <= %s')
+        params.append(EPOCH.date() + dt.timedelta(days=(hi - 1) // MS_PER_DAY))
+    rows = conn.execute(
+        'SELECT "firstTs", scale, timestamps, temperature, humidity FROM sensor_data_blocks '
+        f'WHERE {" AND ".join(where)} ORDER BY day', params,
+    ).fetchall()
+    if not rows:
+        empty = np.array([], dtype=float)
+        return RowBatch(np.array([], dtype='datetime64[ns]'), empty, empty.copy())
+    ms, temp, hum = (np.concatenate(col) for col in zip(*(decode_block(*row) for row in rows)))
+    keep = np.ones(len(ms), dtype=bool)
+    if lo is not None:
+        keep &= ms >= lo
+    if hi is not None:
+        keep &= ms < hi
+    return RowBatch(ms[keep].astype('datetime64[ms]').astype('datetime64[ns]'), temp[keep], hum[keep])
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog='python -m qtparser.blocks', description='Print the readings stored as day blocks as NDJSON.')
+    p.add_argument('sensors', nargs='+', help='sensor ids')
+    p.add_argument('--from', dest='start', default=None, help='first timestamp (UTC, ISO 8601)')
+    p.add_argument('--to', dest='end', default=None, help='end timestamp, exclusive (UTC, ISO 8601)')
+    p.add_argument('--dsn', default=None, help='connection URL (default: $DATABASE_URL)')
+    args = p.parse_args(argv)
+    dsn = args.dsn or os.environ.get('DATABASE_URL')
+    if not dsn:
+        p.error('--dsn or DATABASE_URL is required')
+    from .emit import write_ndjson
+    from .pg_sink import connect, require_psycopg
+    psycopg = require_psycopg()
+    try:
+        try:
+            bounds = [None if v is None else np.datetime64(v.rstrip('Z'), 'ms') for v in (args.start, args.end)]
+        except ValueError as e:
+            raise ParseError(f'Invalid date: {e}', code=1)
+        with connect(dsn) as conn:
+            for sensor in args.sensors:
+                try:
+                    write_ndjson(read_range(conn, sensor, *bounds), sys.stdout, {'sensorId': sensor})
+                except psycopg.Error as e:
+                    raise ParseError(f'Database error: {e}', code=7)
+    except ParseError as e:
+        print(json.dumps({'error': str(e)}))
+        return e.code
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""Bulk import of logger exports into PostgreSQL: ``python -m qtparser.bulk <dir|glob|file>...``.
+
+Directories are searched recursively for .xls/.xlsx files. Files are parsed
+on a process pool (largest first) and every worker keeps one open database
+connection, so the pool of workers is also the connection pool; each file is
+loaded with the COPY sink of :mod:`qtparser.pg_sink`, checkpointed, so running
+the same command again after a failure resumes every file where it stopped
+and skips the files already completed.
+
+The sensor of a file comes from ``--sensor-id``, from ``--sensor-map`` (a JSON
+object keyed by file name or file stem) or, by default, from the sensor whose
+``serialNumber`` equals the file stem (loggers name their exports by serial).
+Files without a sensor are reported and skipped.
+
+Output is one JSON line per file (``rows``, ``inserted``, ``rowsPerSec``, or
+``error``/``code``) in completion order and a final ``{"total": {...}}`` line.
+The exit status is 1 when any file failed.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import replace
+from typing import List, Optional
+
+from .errors import ParseError
+from .options import ParseOptions
+from .pg_sink import CHECKPOINT_ROWS
+from .pipeline import available_cpus
+
+EXTENSIONS = ('.xls', '.xlsx')
+
+# Conexão do processo worker, aberta uma vez e reaproveitada entre arquivos
+_conn = None
+_dsn: Optional[str] = None
+
+
+def find_files(inputs: List[str]) -> List[str]:
+    """Workbooks under the given directories, globs or paths (sorted, no duplicates)."""
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                found.update(os.path.join(root, n) for n in names if n.lower().endswith(EXTENSIONS))
+        elif os.path.isfile(item):
+            found.add(item)
+        else:
+            found.update(p for p in glob.glob(item, recursive=True) if p.lower().endswith(EXTENSIONS) and os.path.isfile(p))
+    return sorted(os.path.abspath(p) for p in found)
+
+
+def resolve_sensors(conn, files: List[str], sensor_id: Optional[str], sensor_map: dict) -> dict:
+    """{path: sensor id or None}."""
+    if sensor_id:
+        return {f: sensor_id for f in files}
+    with conn.cursor() as cur:
+        cur.execute('SELECT "serialNumber", id FROM sensors')
+        by_serial = dict(cur.fetchall())
+    out = {}
+    for f in files:
+        name = os.path.basename(f)
+        stem = os.path.splitext(name)[0]
+        out[f] = sensor_map.get(name) or sensor_map.get(stem) or by_serial.get(stem)
+    return out
+
+
+def init_worker(dsn: str) -> None:
+    """Pool initializer: the database this worker process connects to."""
+    global _dsn
+    _dsn = dsn
+
+
+def worker_dsn() -> Optional[str]:
+    """DATABASE_URL given to :func:`init_worker`."""
+    return _dsn
+
+
+def worker_connection():
+    """This worker's connection: opened on first use, reopened when broken."""
+    global _conn
+    from .pg_sink import connect
+    if _conn is None or _conn.closed or _conn.broken:
+        _conn = connect(_dsn)
+    return _conn
+
+
+def import_file(path: str, sensor_id: str, base: ParseOptions, validation_id: Optional[str] = None,
+                checkpoint_rows: int = CHECKPOINT_ROWS, append: bool = False, storage: str = 'rows',
+                archive: Optional[str] = None) -> dict:
+    """Parse one file and load it on this worker's connection; runs inside a pool worker."""
+    from .pg_sink import SinkTarget, import_path
+    t0 = time.monotonic()
+    target = SinkTarget(dsn=_dsn, file_name=os.path.basename(path), sensor_id=sensor_id,
+                        validation_id=validation_id, append=append, storage=storage, archive=archive)
+    try:
+        summary = import_path(worker_connection(), path, base, target, checkpoint_rows=checkpoint_rows)
+    except ParseError as e:
+        return {'error': str(e), 'code': e.code, 'ms': int((time.monotonic() - t0) * 1000)}
+    summary['ms'] = int((time.monotonic() - t0) * 1000)
+    return summary
+
+
+def run_bulk(files: List[str], sensors: dict, base: ParseOptions, dsn: str, out, jobs: Optional[int] = None,
+             validation_id: Optional[str] = None, checkpoint_rows: int = CHECKPOINT_ROWS,
+             append: bool = False, storage: str = 'rows', archive: Optional[str] = None) -> dict:
+    """Import ``files`` and write one JSON line per file plus the total to ``out``; returns the total."""
+    t0 = time.monotonic()
+    sizes = {f: os.path.getsize(f) for f in files}
+    total = {'files': len(files), 'failed': 0, 'rows': 0, 'inserted': 0, 'duplicates': 0, 'bytes': 0}
+
+    def report(path: str, result: dict) -> None:
+        line = {'file': path, 'sensorId': sensors.get(path), **result}
+        if 'error' in result:
+            total['failed'] += 1
+        else:
+            secs = max(result['ms'], 1) / 1000
+            line['rowsPerSec'] = int(result['rows'] / secs)
+            line['mbPerSec'] = round(sizes[path] / secs / 1e6, 2)
+            for key in ('rows', 'inserted', 'duplicates'):
+                total[key] += result[key]
+            total['bytes'] += sizes[path]
+        out.write(json.dumps(line, ensure_ascii=False) + '\n')
+        out.flush()
+
+    todo = []
+    for f in sorted(files, key=lambda f: -sizes[f]):
+        if sensors.get(f):
+            todo.append(f)
+        else:
+            report(f, {'error': 'No sensor for file (use --sensor-id or --sensor-map)', 'code': 2})
+    workers = max(1, min(len(todo), jobs or available_cpus()))
+    # Os núcleos já estão ocupados por outros arquivos: sem threads extras por arquivo
+    options = replace(base, prefetch=0, sheet_workers=1, shard_workers=1)
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(dsn,)) as pool:
+            futures = {pool.submit(import_file, f, sensors[f], options, validation_id, checkpoint_rows, append,
+                                   storage, archive): f for f in todo}
+            for fut in as_completed(futures):
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    # Worker morto (ex.: sem memória): só este arquivo falha
+                    result = {'error': f'{type(e).__name__}: {e}', 'code': 1}
+                report(futures[fut], result)
+
+    secs = max(time.monotonic() - t0, 1e-3)
+    total.update(workers=workers, ms=int(secs * 1000), rowsPerSec=int(total['rows'] / secs),
+                 mbPerSec=round(total['bytes'] / secs / 1e6, 2))
+    out.write(json.dumps({'total': total}) + '\n')
+    out.flush()
+    return total
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog='python -m qtparser.bulk', description='Import directories of logger exports into sensor_data.')
+    p.add_argument('inputs', nargs='+', help='directories, globs or files')
+    p.add_argument('--dsn', default=None, help='connection URL (default: $DATABASE_URL)')
+    p.add_argument('--jobs', type=int, default=None, help='worker processes and database connections (default: available cores)')
+    p.add_argument('--sensor-id', default=None, help='sensor for every file')
+    p.add_argument('--sensor-map', default=None, help='JSON file mapping file names (or stems) to sensor ids')
+    p.add_argument('--validation-id', default=None, help='validation the rows belong to')
+    p.add_argument('--vendor', default=None, help='logger vendor hint (elitech, novus, instrutemp, testo)')
+    p.add_argument('--checkpoint-rows', type=int, default=CHECKPOINT_ROWS, help='rows per committed chunk; a rerun resumes each file after its last one (0 = off)')
+    p.add_argument('--append', action='store_true', help="skip the leading rows each file's sensor already has (re-downloaded exports)")
+    p.add_argument('--storage', choices=['rows', 'blocks'], default='rows', help='sensor_data rows, or compressed per-sensor-day blocks (see qtparser.blocks)')
+    p.add_argument('--archive', default=None, help='also write the rows to this Parquet archive directory (see qtparser.archive)')
+    p.add_argument('--engine', choices=['pandas', 'polars'], default='pandas', help='engine of the full pipeline')
+    args = p.parse_args(argv)
+    dsn = args.dsn or os.environ.get('DATABASE_URL')
+    if not dsn:
+        p.error('--dsn or DATABASE_URL is required')
+    if args.jobs is not None and args.jobs < 1:
+        p.error('--jobs must be >= 1')
+    if args.storage == 'blocks' and args.append:
+        p.error('--storage blocks does not support --append')
+
+    from .pg_sink import connect
+    try:
+        sensor_map = {}
+        if args.sensor_map:
+            try:
+                with open(args.sensor_map, encoding='utf-8') as f:
+                    sensor_map = json.load(f)
+            except (OSError, ValueError) as e:
+                raise ParseError(f'Invalid sensor map: {e}', code=6)
+        files = find_files(args.inputs)
+        if not files:
+            raise ParseError('No .xls/.xlsx files found', code=2)
+        with connect(dsn) as conn:
+            sensors = resolve_sensors(conn, files, args.sensor_id, sensor_map)
+    except ParseError as e:
+        print(json.dumps({'error': str(e)}))
+        return e.code
+    base = ParseOptions(vendor=args.vendor, engine=args.engine)
+    total = run_bulk(files, sensors, base, dsn, sys.stdout, args.jobs, args.validation_id, args.checkpoint_rows,
+                     args.append, args.storage, args.archive)
+    return 1 if total['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""Command-line front end: ``python -m qtparser <file> [sheet] [--channels] [--scan]``.
+
+Emits one JSON line per normalized row: {"timestamp": ISO8601, "temperature": float, "humidity": float|null}
+(plus "channel" with --channels). With --progress a {"progress": {"rows": n, "total": m|null}}
+line follows every batch. --format arrow writes an Arrow IPC stream instead (see
+qtparser.arrow_ipc), or an Arrow file with --output. --framed wraps NDJSON batches in
+acknowledged frames (see qtparser.framing). With --scan a single {"scan": {...}} object is
+printed instead. --manifest parses a list of files in parallel (see qtparser.manifest). --engine polars
+decodes plain sheets with Polars; column classification and the timestamp rescue stay in pandas
+(see qtparser.polars_engine). --sink postgres COPYs the
+rows into sensor_data and prints one {"sink": {...}} summary (see qtparser.pg_sink). --validate
+drops invalid rows and ends with a {"validation": {...}} summary (see qtparser.validity). --rejects
+writes the rejected rows to a sidecar file in the same pass (see qtparser.rejects). Failures print {"error": "..."} and exit with the ParseError code.
+"""
+import argparse
+import json
+import os
+import sys
+import traceback
+
+from .errors import ParseError
+from .logs import debug, disable_events, enable_events, event, stage, warning
+from .options import REJECTS_LIMIT, ParseOptions
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog='fallback_parser.py', description='Parse temperature/humidity logger exports (XLS/XLSX) into NDJSON.')
+    p.add_argument('file', nargs='?', default=None, help='workbook to parse')
+    p.add_argument('sheet', nargs='?', default=None, help='sheet name (default: pick the best sheet)')
+    p.add_argument('--channels', action='store_true', help='emit multi-probe sheets as one stream tagged by "channel"')
+    p.add_argument('--scan', action='store_true', help='only preview the workbook from a small sample')
+    p.add_argument('--vendor', default=None, help='logger vendor hint (elitech, novus, instrutemp, testo)')
+    p.add_argument('--no-lean', dest='lean', action='store_false', help='always use the full pandas pipeline')
+    p.add_argument('--engine', choices=['pandas', 'polars'], default='pandas', help='polars: fast path for plain sheets only (one timestamp column in an explicit format, no rows to rescue); classification by content, format inference and the timestamp rescue always run in pandas, as does everything when polars is not installed')
+    p.add_argument('--progress', action='store_true', help='emit a progress record after each batch')
+    p.add_argument('--format', choices=['ndjson', 'arrow'], default='ndjson', help='output format (arrow needs pyarrow)')
+    p.add_argument('--output', default=None, help='with --format arrow: write an Arrow file here instead of a stream on stdout')
+    p.add_argument('--framed', action='store_true', help='length-prefixed frames acknowledged on stdin (ACK <seq>)')
+    p.add_argument('--window', type=int, default=4, help='with --framed: frames in flight before waiting for an ACK (>= 1)')
+    p.add_argument('--events', action='store_true', help='JSON-lines events on stderr (stages, strategy, warnings, heartbeats) instead of DEBUG lines')
+    p.add_argument('--heartbeat', type=float, default=2.0, help='with --events: seconds between heartbeat events (0 = off)')
+    p.add_argument('--manifest', default=None, help='JSON list of files to parse in parallel (- = stdin) instead of a single file')
+    p.add_argument('--jobs', type=int, default=None, help='with --manifest: worker processes (default: available cores)')
+    p.add_argument('--sink', choices=['postgres'], default=None, help='write the rows to PostgreSQL (needs psycopg) and print only a summary')
+    p.add_argument('--dsn', default=None, help='with --sink: connection URL (default: $DATABASE_URL)')
+    p.add_argument('--file-name', default=None, help='with --sink: sensor_data.fileName (default: the file name)')
+    p.add_argument('--sensor-id', default=None, help='with --sink: sensor of the rows (default: unknown)')
+    p.add_argument('--validation-id', default=None, help='with --sink: validation the rows belong to')
+    p.add_argument('--channel-sensors', default=None, help='with --sink --channels: JSON object mapping channel ids to sensor ids')
+    p.add_argument('--append', action='store_true', help='with --sink and --sensor-id: skip the leading rows the sensor already has (re-downloaded logger file)')
+    p.add_argument('--storage', choices=['rows', 'blocks'], default='rows', help='with --sink: sensor_data rows, or compressed per-sensor-day blocks (see qtparser.blocks)')
+    p.add_argument('--archive', default=None, help='with --sink: also write the rows to this Parquet archive directory (see qtparser.archive)')
+    p.add_argument('--checkpoint-rows', type=int, default=None, help='with --sink: rows per committed chunk; a retry resumes after the last one (0 = one transaction, no resume)')
+    p.add_argument('--validate', action='store_true', help='emit only valid rows ({"skip": n} in place of rejected ones) and a final {"validation": ...} summary')
+    p.add_argument('--limits', default=None, help='with --validate: SensorType.dataConfig JSON with temperatureRange/humidityRange (default: -80..120 C, any humidity)')
+    p.add_argument('--rejects', default=None, help='write the rejected rows (rowNumber, source row, raw cells, decoder, reason) to this NDJSON file, or Parquet if it ends in .parquet')
+    p.add_argument('--rejects-limit', type=int, default=REJECTS_LIMIT, help='with --rejects: at most this many rows in the sidecar')
+    p.add_argument('--batch-size', type=int, default=ParseOptions.batch_size, help='rows per output batch')
+    return p
+
+
+def main(argv=None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if args.window < 1:
+        parser.error('--window must be >= 1')
+    if args.manifest:
+        if args.file or args.scan or args.framed or args.format != 'ndjson':
+            parser.error('--manifest takes no file and only supports NDJSON output')
+    elif not args.file:
+        parser.error('a file (or --manifest) is required')
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('--jobs must be >= 1')
+    if args.sink:
+        if args.manifest or args.scan or args.framed or args.format != 'ndjson':
+            parser.error('--sink works on a single file without --scan, --framed or --format')
+        if not (args.dsn or os.environ.get('DATABASE_URL')):
+            parser.error('--sink needs --dsn or DATABASE_URL')
+    if args.append and not (args.sink and args.sensor_id):
+        parser.error('--append needs --sink and --sensor-id')
+    if args.archive and not args.sink:
+        parser.error('--archive needs --sink')
+    if args.storage == 'blocks' and (not args.sink or args.append):
+        parser.error('--storage blocks needs --sink and does not support --append')
+    if args.validate and (args.manifest or args.scan or args.sink or args.format != 'ndjson'):
+        parser.error('--validate only supports NDJSON output of a single file (the sink validates on its own)')
+    if args.limits and not (args.validate or args.rejects):
+        parser.error('--limits needs --validate or --rejects')
+    if args.rejects and (args.manifest or args.scan):
+        parser.error('--rejects works on a single file without --scan')
+    if args.rejects_limit < 1:
+        parser.error('--rejects-limit must be >= 1')
+    options = ParseOptions(
+        sheet_name=args.sheet, channels=args.channels, batch_size=args.batch_size,
+        vendor=args.vendor, lean=args.lean, engine=args.engine, keep_source=bool(args.rejects),
+    )
+
+    if args.events:
+        enable_events(heartbeat=args.heartbeat)
+    from . import api
+    try:
+        if args.manifest:
+            return _run_manifest(args, options)
+        if args.scan:
+            with stage('scan'):
+                result = api.scan(args.file, options)
+            print(json.dumps({'scan': result}, ensure_ascii=False, default=str))
+            return 0
+        if args.sink:
+            return _write_postgres(args, options)
+        if args.format == 'arrow':
+            return _write_arrow(api, args, options)
+        if args.framed:
+            return _write_framed(api, args, options)
+        return _write_lines(api, args, options)
+    except ParseError as e:
+        event('error', message=str(e), code=e.code)
+        print(json.dumps({"error": str(e)}))
+        return e.code
+    finally:
+        disable_events()
+
+
+def _validator(args):
+    """(Tally, writer of a batch's NDJSON text) for --validate, (None, plain writer) otherwise."""
+    from .emit import ndjson_lines
+    if not args.validate:
+        return None, lambda batch: ''.join(ndjson_lines(batch))
+    from .validity import Limits, Tally, check, valid_lines
+    limits = Limits.from_config(args.limits)
+    tally = Tally()
+
+    def lines(batch):
+        codes = check(batch, limits)
+        tally.add(batch, codes)
+        return valid_lines(batch, codes)
+    return tally, lines
+
+
+def _with_rejects(args, stream):
+    """(stream, RejectsWriter) with the --rejects tap around ``stream``, (stream, None) without it."""
+    if not args.rejects:
+        return stream, None
+    from .rejects import RejectsTap, RejectsWriter
+    from .validity import Limits
+    writer = RejectsWriter(args.rejects, stream.source, args.rejects_limit)
+    return RejectsTap(stream, writer, Limits.from_config(args.limits)), writer
+
+
+def _close_rejects(writer) -> None:
+    if writer is not None:
+        summary = writer.close()
+        debug(f"Rejected rows: {summary['rejected']} ({summary['rows']} in {summary['path']})")
+        event('rejects', **summary)
+
+
+def _write_lines(api, args, options) -> int:
+    from .emit import write_progress
+    tally, lines = _validator(args)
+    stream, rejects = _with_rejects(args, api.parse(args.file, options))
+    done = 0
+    with stage('write'):
+        for batch in stream:
+            sys.stdout.write(lines(batch))
+            done += len(batch)
+            if args.progress:
+                write_progress(done, stream.total, sys.stdout)
+            # Entregar cada lote ao leitor assim que fica pronto
+            sys.stdout.flush()
+    if args.progress and stream.total is None:
+        write_progress(done, done, sys.stdout)
+    _close_rejects(rejects)
+    if tally:
+        print(json.dumps({'validation': tally.summary()}))
+        event('counts', rows=done, rejected=tally.summary()['rejected'])
+    else:
+        event('counts', rows=done)
+    return 0
+
+
+def _run_manifest(args, options) -> int:
+    from .manifest import load_manifest, run_manifest
+    entries = load_manifest(args.manifest)
+    # Falhas de um arquivo vão no registro "done" dele; o processo só falha se o manifesto for inválido
+    run_manifest(entries, options, sys.stdout.buffer, jobs=args.jobs, events=args.events)
+    return 0
+
+
+def _write_postgres(args, options) -> int:
+    from .emit import write_progress
+    from .pg_sink import CHECKPOINT_ROWS, SinkTarget, require_psycopg, write_postgres
+    require_psycopg()
+    try:
+        channel_sensors = json.loads(args.channel_sensors) if args.channel_sensors else {}
+    except ValueError:
+        raise ParseError('Invalid --channel-sensors JSON', code=1)
+    target = SinkTarget(
+        dsn=args.dsn or os.environ['DATABASE_URL'],
+        file_name=args.file_name or os.path.basename(args.file),
+        sensor_id=args.sensor_id,
+        validation_id=args.validation_id,
+        channel_sensors=channel_sensors,
+        append=args.append,
+        storage=args.storage,
+        archive=args.archive,
+        rejects=args.rejects,
+        rejects_limit=args.rejects_limit,
+    )
+
+    def progress(rows, total):
+        if args.progress:
+            write_progress(rows, total, sys.stdout)
+            sys.stdout.flush()
+
+    checkpoint_rows = CHECKPOINT_ROWS if args.checkpoint_rows is None else args.checkpoint_rows
+    with stage('write'):
+        summary = write_postgres(args.file, options, target, progress, checkpoint_rows)
+    print(json.dumps({'sink': summary}))
+    event('counts', rows=summary['rows'], inserted=summary['inserted'])
+    return 0
+
+
+def _write_arrow(api, args, options) -> int:
+    from .arrow_ipc import require_pyarrow, write_arrow
+    # Falhar antes de consumir a planilha se o pyarrow não estiver instalado
+    require_pyarrow()
+    stream, rejects = _with_rejects(args, api.parse(args.file, options))
+    with stage('write'):
+        if args.output:
+            with open(args.output, 'wb') as f:
+                rows = write_arrow(stream, f, options.channels, file_format=True)
+            _close_rejects(rejects)
+            print(json.dumps({'output': args.output, 'rows': rows}))
+        else:
+            rows = write_arrow(stream, sys.stdout.buffer, options.channels)
+            sys.stdout.buffer.flush()
+            _close_rejects(rejects)
+    event('counts', rows=rows)
+    return 0
+
+
+def _write_framed(api, args, options) -> int:
+    from .framing import KIND_END, KIND_ERROR, KIND_ROWS, KIND_START, AckWindow, FramedWriter
+    acks = AckWindow(sys.stdin, args.window)
+    writer = FramedWriter(sys.stdout.buffer, acks)
+    done = 0
+    try:
+        tally, lines = _validator(args)
+        stream, rejects = _with_rejects(args, api.parse(args.file, options))
+        with stage('write'):
+            writer.send_json(KIND_START, {'total': stream.total})
+            for batch in stream:
+                writer.send(KIND_ROWS, lines(batch).encode('utf-8'))
+                done += len(batch)
+            _close_rejects(rejects)
+            if tally:
+                writer.send(KIND_ROWS, (json.dumps({'validation': tally.summary()}) + '\n').encode('utf-8'))
+            last = writer.send_json(KIND_END, {'rows': done})
+    except BrokenPipeError:
+        warning(f"Consumer went away after {done} rows")
+        return 1
+    except Exception as e:
+        # O stdout é binário: qualquer falha vai num frame de erro, nunca como texto solto
+        if isinstance(e, ParseError):
+            message, code = str(e), e.code
+        else:
+            traceback.print_exc(file=sys.stderr)
+            message, code = f'{type(e).__name__}: {e}', 1
+        event('error', message=message, code=code)
+        try:
+            writer.send_json(KIND_ERROR, {'error': message})
+        except BrokenPipeError:
+            warning(f"Consumer went away after {done} rows")
+        return code
+    event('counts', rows=done)
+    # Só encerrar depois que o consumidor confirmou tudo (ou fechou o canal)
+    acks.wait_all(last)
+    return 0
@@ -0,0 +1,94 @@
+"""Header/column heuristics that need no pandas (shared with the lean decoder)."""
+import re
+from typing import Optional
+
+CLEAN_INV_RX = re.compile(r'[\x00-\x1f\x7f\u00A0\u200e\u200f\u202a-\u202e\ufeff]')
+# Padrões para colunas inteiras (Series.str: kernels RE2 do Arrow ou re do Python), com dígitos
+# ASCII e caracteres literais porque o RE2 não entende \u nem o \s Unicode do re. BLANK_RUN_PATTERN
+# junta CLEAN_INV_RX e o \s do re: trocar cada trecho por um espaço equivale a normalize_str
+ISO_TS_PATTERN = r'^[0-9]{4}-[0-9]{2}-[0-9]{2}[ T][0-9]{2}:[0-9]{2}:[0-9]{2}(?:\.[0-9]+)?$'
+BLANK_RUN_PATTERN = '[\x00-\x20\x7f\x85\xa0\u1680\u2000-\u200a\u200e\u200f\u2028-\u202f\u205f\u3000\ufeff]+'
+HEADER_TOKENS = ['temper', 'umid', 'humid', 'data', 'date', 'hora', 'time', 'tempo']
+
+
+def normalize_str(s) -> str:
+    try:
+        if s is None:
+            return ''
+        # strip common invisible/control characters
+        out = CLEAN_INV_RX.sub(' ', str(s))
+        # normalize common Unicode minus/fullwidth punctuation to ASCII
+        out = out.replace('\u2212', '-')
+        out = out.replace('\uFF0E', '.')
+        out = out.replace('\uFF1A', ':')
+        out = re.sub(r'\s+', ' ', out).strip()
+        return out
+    except Exception:
+        try:
+            return str(s).strip()
+        except Exception:
+            return ''
+
+
+def build_rename_map(columns):
+    rename_map = {}
+    for col in columns:
+        low = str(col).strip().lower()
+        if 'temper' in low:
+            rename_map[col] = 'temperature'
+        elif 'umid' in low or 'humid' in low:
+            rename_map[col] = 'humidity'
+        elif ('data' in low or 'date' in low) and ('hora' in low or 'time' in low or 'tempo' in low):
+            rename_map[col] = 'datetime'
+        elif 'data' in low and ('hora' not in low and 'time' not in low and 'tempo' not in low):
+            rename_map[col] = 'date'
+        elif ('hora' in low) or ('time' in low) or ('tempo' in low):
+            rename_map[col] = 'time'
+    return rename_map
+
+
+def find_header_row(rows) -> Optional[int]:
+    # Procurar linha de cabeçalho provável (procurar um pouco mais para arquivos legados)
+    best_idx = None
+    best_score = -1
+    for i, row in enumerate(rows):
+        row_vals = [str(v).strip().lower() for v in row]
+        score = sum(any(tok in val for tok in HEADER_TOKENS) for val in row_vals)
+        if score > best_score:
+            best_score = score
+            best_idx = i
+    if best_idx is None or best_score <= 0:
+        return None
+    return best_idx
+
+
+def channel_key(raw_label) -> Optional[str]:
+    # Remover sufixo de duplicidade do pandas ("Temperatura.1") antes de buscar o número do canal
+    label = re.sub(r'\.\d+$', '', str(raw_label).strip())
+    m = re.search(r'\d+', label)
+    return m.group(0) if m else None
+
+
+def detect_channels(renamed_cols, raw_cols):
+    """Pair temperature/humidity columns by channel.
+
+    Returns a list of (channel_id, temp_pos, hum_pos) where positions index the
+    columns of the sheet. Channel ids come from the number in the header
+    ("Temperatura 2" -> "2") when every temperature column carries a distinct
+    one; otherwise channels are numbered by order of appearance.
+    """
+    temp_pos = [i for i, c in enumerate(renamed_cols) if c == 'temperature']
+    hum_pos = [i for i, c in enumerate(renamed_cols) if c == 'humidity']
+    temp_keys = [channel_key(raw_cols[i]) for i in temp_pos]
+    hum_keys = [channel_key(raw_cols[i]) for i in hum_pos]
+    explicit = all(k is not None for k in temp_keys) and len(set(temp_keys)) == len(temp_keys)
+    channels = []
+    for n, tp in enumerate(temp_pos):
+        cid = temp_keys[n] if explicit else str(n + 1)
+        hp = None
+        if explicit and cid in hum_keys:
+            hp = hum_pos[hum_keys.index(cid)]
+        elif not explicit and n < len(hum_pos):
+            hp = hum_pos[n]
+        channels.append((cid, tp, hp))
+    return channels
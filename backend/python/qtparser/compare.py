@@ -0,0 +1,69 @@
+"""Check the Polars engine against the pandas engine: ``python -m qtparser.compare <files...>``.
+
+Each workbook is parsed by both engines (full pipeline, lean decoder off) and
+the NDJSON output is compared byte for byte. Prints one JSON line per file
+(``engine`` tells whether Polars decoded it or fell back to pandas, ``fallback``
+why) and exits
+with 1 when any file differs.
+"""
+import argparse
+import io
+import json
+import sys
+import time
+from dataclasses import replace
+
+from .errors import ParseError
+from .options import ParseOptions
+
+
+def render(path: str, options: ParseOptions) -> tuple:
+    """(NDJSON text or error, seconds) for one engine."""
+    from . import api
+    from .emit import write_ndjson
+    t0 = time.monotonic()
+    buf = io.StringIO()
+    try:
+        for batch in api.parse(path, options):
+            write_ndjson(batch, buf)
+    except ParseError as e:
+        return json.dumps({'error': str(e), 'code': e.code}), time.monotonic() - t0
+    return buf.getvalue(), time.monotonic() - t0
+
+
+def compare_file(path: str, base: ParseOptions) -> dict:
+    from .polars_engine import fallback_reason
+    from .source import WorkbookSource
+    reference, t_pandas = render(path, replace(base, engine='pandas'))
+    candidate, t_polars = render(path, replace(base, engine='polars'))
+    try:
+        reason = fallback_reason(WorkbookSource(path).read_sheets(base.sheet_name))
+    except ParseError as e:
+        reason = str(e)
+    return {
+        'file': path,
+        'same': reference == candidate,
+        'engine': 'pandas' if reason else 'polars',
+        # Motivo da volta ao pandas (escopo do motor Polars, ver qtparser.polars_engine)
+        'fallback': reason,
+        'pandasMs': int(t_pandas * 1000),
+        'polarsMs': int(t_polars * 1000),
+    }
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog='python -m qtparser.compare', description='Compare the Polars engine output with the pandas engine.')
+    p.add_argument('files', nargs='+', help='workbooks to parse with both engines')
+    p.add_argument('--sheet', default=None, help='sheet name (default: pick the best sheet)')
+    args = p.parse_args(argv)
+    base = ParseOptions(sheet_name=args.sheet, lean=False)
+    failed = 0
+    for path in args.files:
+        result = compare_file(path, base)
+        failed += not result['same']
+        print(json.dumps(result, ensure_ascii=False))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
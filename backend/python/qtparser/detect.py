@@ -0,0 +1,319 @@
+"""Column heuristics shared by the full parse and the scan preview."""
+import importlib.util
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .columns import BLANK_RUN_PATTERN, ISO_TS_PATTERN, find_header_row
+
+# Padrões de data/hora (dd/mm/aaaa, aaaa-mm-dd, dd-mm-aaaa, hh:mm) numa única expressão
+DATE_ANY_RX = r"\d{1,2}/\d{1,2}/\d{2,4}|\d{4}-\d{2}-\d{2}|\d{1,2}-\d{1,2}-\d{2,4}|\d{1,2}:\d{2}"
+
+# Colunas de texto em Arrow quando o pyarrow está instalado (opcional): strip/replace/
+# extract/match rodam nos kernels do Arrow em vez de criar um str Python por célula.
+TEXT_DTYPE: Optional[str] = 'string[pyarrow]' if importlib.util.find_spec('pyarrow') else None
+
+
+def as_text(s: pd.Series) -> pd.Series:
+    """Stripped text view of a column (missing cells stay <NA> on the Arrow backend)."""
+    if TEXT_DTYPE is None:
+        return s.astype(str).str.strip()
+    return s.astype(TEXT_DTYPE).str.strip()
+
+
+def detect_dayfirst(series: pd.Series) -> bool:
+    # Helper: auto-detect dayfirst for ambiguous date strings
+    try:
+        s = as_text(series.dropna())
+        if s.empty:
+            return True
+        sample = s.head(500)
+        t_true = pd.to_datetime(sample, dayfirst=True, errors='coerce')
+        t_false = pd.to_datetime(sample, dayfirst=False, errors='coerce')
+
+        def score(ts):
+            if ts.empty:
+                return 0
+            valid = ts.notna()
+            # Prefer parses that yield plausible years (2000-2100)
+            yrs = ts.dt.year.where(valid)
+            plausible = ((yrs >= 2000) & (yrs <= 2100)).sum()
+            return int(plausible)
+        return True if score(t_true) >= score(t_false) else False
+    except Exception:
+        return True
+
+
+def parse_with_formats(values: pd.Series, formats, sharder=None) -> Optional[pd.Series]:
+    """Try explicit formats first (ISO-like) to avoid ambiguous day/month inference."""
+    if sharder is not None and sharder.applies(len(values)):
+        return sharder.parse_with_formats(values, formats)
+    best_ts = None
+    best_count = 0
+    for fmt in formats:
+        try:
+            candidate = pd.to_datetime(values, format=fmt, errors='coerce')
+            cnt = int(candidate.notna().sum())
+            if cnt > best_count:
+                best_count = cnt
+                best_ts = candidate
+        except Exception:
+            continue
+    return best_ts
+
+
+def nat_series(n: int) -> pd.Series:
+    return pd.Series([pd.NaT] * n)
+
+
+def parse_datetime_columns(dfx: pd.DataFrame, sharder=None) -> pd.Series:
+    """Timestamps from the mapped date/time columns (NaT where nothing parsed).
+
+    ``sharder`` (a :class:`qtparser.shard.Sharder`) spreads the explicit-format
+    attempts of big columns over worker processes.
+    """
+    # Caso 1: coluna única 'datetime'
+    if 'datetime' in dfx.columns:
+        s = dfx['datetime']
+        # Se for numérico (serial do Excel)
+        if pd.api.types.is_numeric_dtype(s):
+            return pd.to_datetime(s, unit='d', origin='1899-12-30', errors='coerce')
+        df_sample = as_text(s)
+        ts = parse_with_formats(df_sample, [
+            '%Y-%m-%d %H:%M:%S',
+            '%Y-%m-%d %H:%M',
+            '%d/%m/%Y %H:%M:%S',
+            '%d/%m/%Y %H:%M',
+            '%m/%d/%Y %H:%M:%S',
+            '%m/%d/%Y %H:%M'
+        ], sharder)
+        if ts is None:
+            ts = pd.to_datetime(df_sample, dayfirst=detect_dayfirst(df_sample), errors='coerce')
+        return ts
+
+    # Novo Caso 1.5: somente 'time' contendo data+hora inteira
+    # Alguns arquivos (ex.: Elitech) rotulam a coluna como "Time" mas os valores trazem data e hora.
+    if 'time' in dfx.columns and 'date' not in dfx.columns:
+        st = dfx['time']
+        if pd.api.types.is_numeric_dtype(st):
+            # Numeric pode ser serial Excel (dias desde 1899-12-30) ou fração de dia.
+            # Tentar primeiro como serial de data completa; se a maioria virar NaT, cair para to_timedelta.
+            ts_try = pd.to_datetime(st, unit='d', origin='1899-12-30', errors='coerce')
+            non_null_ratio = (ts_try.notna().sum() / max(len(ts_try), 1))
+            if non_null_ratio > 0.7:
+                return ts_try
+            # Caso contrário tratar como tempo do dia (fração) e não temos data -> manter NaT
+            # (evita gerar timestamps errados sem a parte da data)
+            return nat_series(len(dfx))
+        st_str = as_text(st)
+        ts = parse_with_formats(st_str, ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M'], sharder)
+        if ts is None:
+            # Fallback to heuristic dayfirst detection
+            ts = pd.to_datetime(st_str, dayfirst=detect_dayfirst(st_str), errors='coerce')
+        # Se ainda assim der tudo NaT e parecer só horário HH:MM[:SS], manter NaT (sem data)
+        looks_like_time_only = st_str.str.fullmatch(r"\d{1,2}:\d{2}(:\d{2})?").fillna(False)
+        if ts.notna().any() and (~looks_like_time_only).any():
+            return ts
+        return nat_series(len(dfx))
+
+    # Caso 2: 'date' (+ opcional 'time')
+    date_ts = None
+    if 'date' in dfx.columns:
+        sd = dfx['date']
+        if pd.api.types.is_numeric_dtype(sd):
+            date_ts = pd.to_datetime(sd, unit='d', origin='1899-12-30', errors='coerce')
+        else:
+            date_str = as_text(sd)
+            date_ts = pd.to_datetime(date_str, dayfirst=detect_dayfirst(date_str), errors='coerce')
+
+    if date_ts is not None and 'time' in dfx.columns:
+        st = dfx['time']
+        if pd.api.types.is_numeric_dtype(st):
+            # Tempo em fração de dia (Excel)
+            time_delta = pd.to_timedelta(st, unit='d')
+        else:
+            # Normalizar vírgula para ponto e remover espaços
+            st_str = as_text(st).str.replace(',', '.')
+            # Tentar HH:MM[:SS]
+            time_delta = pd.to_timedelta(st_str, errors='coerce')
+            # Se falhar, tentar parsear como datetime e extrair componente de tempo
+            bad = time_delta.isna()
+            if bad.any():
+                aux = pd.to_datetime('1970-01-01 ' + st_str, errors='coerce')
+                td2 = pd.to_timedelta(aux.dt.hour, unit='h') + pd.to_timedelta(aux.dt.minute, unit='m') + pd.to_timedelta(aux.dt.second, unit='s')
+                time_delta = time_delta.mask(bad, td2)
+        return date_ts + time_delta.fillna(pd.Timedelta(0))
+
+    # Caso 3: somente 'date'
+    if date_ts is not None:
+        return date_ts
+
+    # Fallback vazio
+    return nat_series(len(dfx))
+
+
+def strict_iso_parse(s: pd.Series, non_empty: int) -> pd.Series:
+    """Parse normalized strings with the strict ISO formats, falling back to inference.
+
+    Tries without microseconds first (covers most legacy exports), then with
+    microseconds, then pandas inference, each only while less than half of the
+    non-empty values parsed.
+    """
+    values = s.where(s != '')
+    parsed = pd.to_datetime(values, format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    if int(parsed.notna().sum()) < max(1, int(0.5 * non_empty)):
+        parsed = parsed.combine_first(pd.to_datetime(values, format='%Y-%m-%d %H:%M:%S.%f', errors='coerce'))
+    if int(parsed.notna().sum()) < max(1, int(0.5 * non_empty)):
+        parsed = parsed.combine_first(pd.to_datetime(values, dayfirst=False, errors='coerce'))
+    return parsed
+
+
+def normalized_column(col: pd.Series) -> pd.Series:
+    """Column as text with the cleanup of ``normalize_str``, a whole column at a time.
+
+    Missing cells become ''. Datetime (and other non-numeric, non-text) columns
+    are boxed first so each cell is written as ``str(value)`` would, not with
+    the column-wide format of ``astype(str)``.
+    """
+    if not (pd.api.types.is_numeric_dtype(col) or col.dtype == object or isinstance(col.dtype, pd.StringDtype)):
+        col = col.astype(object)
+    if TEXT_DTYPE is None:
+        text = col.astype(object).where(col.notna(), '').astype(str)
+    else:
+        text = col.astype(TEXT_DTYPE).fillna('')
+    return (text.str.replace(BLANK_RUN_PATTERN, ' ', regex=True)
+                .str.replace('\u2212', '-', regex=False)
+                .str.replace('\uFF0E', '.', regex=False)
+                .str.replace('\uFF1A', ':', regex=False)
+                .str.strip())
+
+
+def iso_fraction(s: pd.Series):
+    """Return (non_empty, iso_matches) for a normalized string column."""
+    non_empty = int((s != '').sum())
+    matches = int(s.str.match(ISO_TS_PATTERN).sum()) if non_empty > 0 else 0
+    return non_empty, matches
+
+
+def try_strict_iso_on_df(df: pd.DataFrame, current_ts: Optional[pd.Series]) -> Optional[pd.Series]:
+    """Fast-path for columns holding strict ISO-like timestamps (YYYY-MM-DD HH:MM:SS).
+
+    Intentionally conservative: a column is only considered when >=30% of its
+    non-empty values match, and the result is only returned when it parses more
+    rows than the current heuristics did.
+    """
+    try:
+        best = None
+        best_count = int(current_ts.notna().sum()) if current_ts is not None else 0
+        for pos in range(df.shape[1]):
+            try:
+                s = normalized_column(df.iloc[:, pos])
+            except Exception:
+                continue
+            non_empty, matches = iso_fraction(s)
+            if non_empty == 0:
+                continue
+            if (matches / non_empty) >= 0.3:
+                parsed = strict_iso_parse(s, non_empty)
+                parsed_count = int(parsed.notna().sum())
+                # Accept if we improved over best_count
+                if parsed_count > best_count:
+                    best = parsed
+                    best_count = parsed_count
+        return best
+    except Exception:
+        return None
+
+
+def unify_same_named_columns(dfx: pd.DataFrame, name: str):
+    if name not in dfx.columns:
+        return None
+    try:
+        sub = dfx.loc[:, dfx.columns == name]
+    except Exception:
+        # fallback simples
+        return dfx[name]
+    # Se já for Series
+    if isinstance(sub, pd.Series):
+        return sub
+    # Se apenas uma coluna com esse nome
+    if getattr(sub, 'shape', (0, 0))[1] <= 1:
+        return sub.iloc[:, 0] if getattr(sub, 'shape', (0, 0))[1] == 1 else None
+    # Várias colunas com o mesmo nome: pegar o primeiro não-nulo por linha
+    unified = sub.bfill(axis=1).iloc[:, 0]
+    return unified
+
+
+def to_numeric_clean(col: pd.Series, sharder=None) -> pd.Series:
+    if not pd.api.types.is_numeric_dtype(col) and sharder is not None and sharder.applies(len(col)):
+        return sharder.to_numeric_clean(col)
+    if not pd.api.types.is_numeric_dtype(col):
+        col = as_text(col).str.replace(',', '.').str.extract(r'([-+]?[0-9]*\.?[0-9]+)')[0]
+    num = pd.to_numeric(col, errors='coerce')
+    # Resultado sempre float64/NaN, independente do backend de texto
+    return pd.Series(num.to_numpy(dtype=float, na_value=np.nan), index=col.index)
+
+
+def numeric_counts(dfx: pd.DataFrame, sharder=None):
+    """Count valid temperature/humidity readings in a renamed frame."""
+    counts = []
+    for numcol in ['temperature', 'humidity']:
+        col = unify_same_named_columns(dfx, numcol)
+        counts.append(int(to_numeric_clean(col, sharder).notna().sum()) if col is not None else 0)
+    return tuple(counts)
+
+
+def apply_header_row(dfh: pd.DataFrame, max_rows: int = 200) -> Optional[pd.DataFrame]:
+    """Promote the most header-like row of a ``header=None`` frame to column names."""
+    best_idx = find_header_row([list(dfh.iloc[i].values) for i in range(min(len(dfh), max_rows))])
+    if best_idx is None:
+        return None
+    # Definir cabeçalho e dados
+    new_cols = [str(v).strip() for v in list(dfh.iloc[best_idx].values)]
+    dfd = dfh.iloc[best_idx + 1:].reset_index(drop=True)
+    dfd.columns = new_cols
+    return dfd
+
+
+def find_potential_datetime_cols(df0: pd.DataFrame):
+    """Return positions of columns that look like date/time columns based on value patterns."""
+    candidates = []
+    # examinar mais linhas para detectar padrões em arquivos grandes
+    max_rows = min(len(df0), 2000)
+    for pos in range(df0.shape[1]):
+        try:
+            sample = as_text(df0.iloc[:max_rows, pos])
+            if sample.empty:
+                continue
+            matches = int(sample.str.contains(DATE_ANY_RX).fillna(False).sum())
+            # aceitar colunas com sinal fraco de datas (20% das amostras)
+            if (matches / max(1, len(sample))) > 0.2:
+                candidates.append(pos)
+        except Exception:
+            continue
+    return candidates
+
+
+def melt_channels(dfx: pd.DataFrame, ts: pd.Series, channels) -> pd.DataFrame:
+    """Turn a wide multi-probe sheet into one long frame tagged by channel.
+
+    Rows are grouped by channel (each probe's readings stay contiguous) and
+    rows where the probe has neither temperature nor humidity are dropped.
+    """
+    n_rows = len(dfx)
+    nan_col = np.full(n_rows, np.nan)
+    temps = np.column_stack([to_numeric_clean(dfx.iloc[:, tp]).to_numpy(dtype=float) for _, tp, _ in channels])
+    hums = np.column_stack([
+        to_numeric_clean(dfx.iloc[:, hp]).to_numpy(dtype=float) if hp is not None else nan_col
+        for _, _, hp in channels
+    ])
+    ts_vals = pd.Series(ts).reset_index(drop=True).reindex(range(n_rows))
+    long_df = pd.DataFrame({
+        'timestamp': ts_vals.iloc[np.tile(np.arange(n_rows), len(channels))].reset_index(drop=True),
+        'temperature': temps.T.ravel(),
+        'humidity': hums.T.ravel(),
+        'channel': np.repeat([cid for cid, _, _ in channels], n_rows),
+    })
+    keep = long_df['temperature'].notna() | long_df['humidity'].notna()
+    return long_df[keep].reset_index(drop=True)
@@ -0,0 +1,95 @@
+"""NDJSON output of parsed batches (the format pythonFallbackService reads).
+
+Kept free of pandas so the lean decode path never has to import it.
+"""
+import json
+import sys
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+
+from .batch import RowBatch
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def iso_z(ns: int) -> str:
+    """Format UTC epoch nanoseconds like ``pd.Timestamp.isoformat()`` with a Z suffix."""
+    secs, rem = divmod(int(ns), 1_000_000_000)
+    micros, nanos = divmod(rem, 1000)
+    iso = (EPOCH + timedelta(seconds=secs, microseconds=micros)).isoformat()
+    if nanos:
+        iso = (iso if micros else iso + '.000000') + f'{nanos:03d}'
+    return iso + 'Z'
+
+
+def iso_z_tokens(ts: np.ndarray) -> list:
+    """JSON tokens for a datetime64[ns] UTC column: quoted ``iso_z`` strings, ``null`` for NaT.
+
+    Formats whole columns with ``np.datetime_as_string``; the fraction is
+    printed only when present (6 digits for micros, 9 for nanos), matching
+    ``iso_z``.
+    """
+    ts = ts.astype('datetime64[ns]', copy=False)
+    nat = np.isnat(ts)
+    text = np.datetime_as_string(ts, unit='s').astype(object)
+    frac = ts.view(np.int64) % 1_000_000_000
+    micro = ~nat & (frac != 0) & (frac % 1000 == 0)
+    if micro.any():
+        text[micro] = np.datetime_as_string(ts[micro], unit='us')
+    nano = ~nat & (frac % 1000 != 0)
+    if nano.any():
+        text[nano] = np.datetime_as_string(ts[nano], unit='ns')
+    return ['null' if n else f'"{t}Z"' for t, n in zip(text.tolist(), nat.tolist())]
+
+
+def float_tokens(values: np.ndarray) -> list:
+    """JSON tokens for a float column (``null`` for NaN), same text as json.dumps."""
+    values = np.asarray(values, dtype=float)
+    tokens = [repr(v) for v in values.tolist()]
+    nan = np.isnan(values)
+    if nan.any():
+        for i in np.flatnonzero(nan).tolist():
+            tokens[i] = 'null'
+    inf = np.isinf(values)
+    if inf.any():
+        for i in np.flatnonzero(inf).tolist():
+            tokens[i] = 'Infinity' if values[i] > 0 else '-Infinity'
+    return tokens
+
+
+def ndjson_lines(batch: RowBatch, tag: Optional[dict] = None) -> list:
+    """One NDJSON line per row (same bytes as one json.dumps per row).
+
+    ``tag`` adds the same extra fields to every row (e.g. ``{"file": id}`` in
+    manifest mode).
+    """
+    extra = ''.join(f', {json.dumps(k)}: {json.dumps(v, ensure_ascii=False)}' for k, v in (tag or {}).items())
+    ts = iso_z_tokens(batch.timestamp)
+    temp = float_tokens(batch.temperature)
+    hum = float_tokens(batch.humidity)
+    if batch.channel is None:
+        return [
+            f'{{"timestamp": {a}, "temperature": {b}, "humidity": {c}{extra}}}\n'
+            for a, b, c in zip(ts, temp, hum)
+        ]
+    # Poucos canais distintos: serializar cada id uma única vez
+    names = {ch: json.dumps(ch, ensure_ascii=False) for ch in set(batch.channel.tolist())}
+    return [
+        f'{{"timestamp": {a}, "temperature": {b}, "humidity": {c}, "channel": {names[d]}{extra}}}\n'
+        for a, b, c, d in zip(ts, temp, hum, batch.channel.tolist())
+    ]
+
+
+def write_ndjson(batch: RowBatch, out=None, tag: Optional[dict] = None) -> None:
+    """Write a batch as NDJSON in one block (see :func:`ndjson_lines`)."""
+    out = out or sys.stdout
+    if len(batch) == 0:
+        return
+    out.write(''.join(ndjson_lines(batch, tag)))
+
+
+def write_progress(rows: int, total: Optional[int], out=None) -> None:
+    out = out or sys.stdout
+    out.write(json.dumps({'progress': {'rows': rows, 'total': total}}) + '\n')
@@ -0,0 +1,429 @@
+"""Sheet selection, timestamp fast paths and row rescue for the full parse."""
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from .batch import RowBatch
+from .columns import build_rename_map, detect_channels, normalize_str
+from .detect import (
+    apply_header_row,
+    find_potential_datetime_cols,
+    iso_fraction,
+    melt_channels,
+    normalized_column,
+    numeric_counts,
+    parse_datetime_columns,
+    strict_iso_parse,
+    to_numeric_clean,
+    try_strict_iso_on_df,
+    unify_same_named_columns,
+)
+from .errors import ParseError
+from .logs import debug, event, stage, warning
+from .options import ParseOptions
+from .pipeline import available_cpus
+from .shard import Sharder
+from .source import WorkbookSource
+
+TIME_ONLY_RX = re.compile(r"^\s*\d{1,2}:\d{2}(:\d{2})?\s*$")
+ISO_LOOSE_RX = re.compile(r'^\d{4}-\d{2}-\d{2}\s+\d{1,2}:\d{2}(:\d{2})?(\.\d+)?$')
+DATE_LIKE_RX = re.compile(r'\d{1,4}[/-]\d{1,2}[/-]\d{1,4}')
+
+
+@dataclass
+class SheetChoice:
+    name: str
+    df: pd.DataFrame
+    ts: pd.Series
+    # Rótulos originais das colunas, na mesma ordem de df (antes do rename)
+    raw_cols: list
+    temp_count: int
+    ts_count: int
+
+
+def sharder_for(options: ParseOptions) -> Sharder:
+    return Sharder(options.shard_workers, options.shard_min_rows)
+
+
+def to_utc(ts: pd.Series) -> pd.Series:
+    # If naive, treat as UTC (do not guess local timezone)
+    return pd.to_datetime(ts, utc=True, errors='coerce')
+
+
+def evaluate_sheet(source: WorkbookSource, name: str, df0: pd.DataFrame,
+                   beaten: Optional[Callable[[], bool]] = None, sharder: Optional[Sharder] = None) -> Optional[SheetChoice]:
+    """Score one sheet. Returns None when ``beaten()`` reports mid-way that the
+    sheet can no longer win (see :func:`choose_sheet`)."""
+    debug(f"Inspecting sheet: {name}")
+    debug(f"Columns found: {list(df0.columns)}")
+    if len(df0) > 0:
+        debug(f"First row: {df0.iloc[0].to_dict()}")
+    else:
+        debug("First row: empty")
+
+    # 1) Renomear com heurística
+    rename_map = build_rename_map(df0.columns)
+    debug(f"Rename map: {rename_map}")
+    df1 = df0.rename(columns=rename_map) if rename_map else df0.copy()
+    raw_cols = list(df0.columns)
+    debug(f"Columns after rename: {list(df1.columns)}")
+
+    # 2) Tentar parse, com fast-path para colunas ISO estritas
+    ts = parse_datetime_columns(df1, sharder)
+    iso_fast = try_strict_iso_on_df(df1, ts)
+    if iso_fast is not None:
+        ts = iso_fast
+    non_null = int(ts.notna().sum())
+    debug(f"Parsed datetime non-null count: {non_null} / {len(ts)}")
+
+    # 2.1) Estimar contagem de temperatura/umidade válidas
+    temp_count, hum_count = numeric_counts(df1, sharder)
+    debug(f"Numeric counts -> temperature: {temp_count}, humidity: {hum_count}")
+
+    # 3) Se nenhum datetime encontrado, tentar detecção de cabeçalho automática
+    if non_null == 0 and beaten is not None and beaten():
+        debug(f"Sheet {name} abandoned: another sheet already has more readings than it has rows")
+        return None
+    if non_null == 0:
+        dfh = source.read_raw(name)
+        df_auto = apply_header_row(dfh) if dfh is not None else None
+        if df_auto is not None:
+            debug(f"Header autodetect applied on sheet {name}")
+            rename_map2 = build_rename_map(df_auto.columns)
+            df2 = df_auto.rename(columns=rename_map2) if rename_map2 else df_auto
+            debug(f"Columns after autodetect+rename: {list(df2.columns)}")
+            ts2 = parse_datetime_columns(df2, sharder)
+            non_null2 = int(ts2.notna().sum())
+            debug(f"Parsed datetime after autodetect: {non_null2} / {len(ts2)}")
+            temp_count2, hum_count2 = numeric_counts(df2, sharder)
+            if (temp_count2 > temp_count) or (temp_count2 == temp_count and non_null2 > non_null):
+                df1, ts, non_null = df2, ts2, non_null2
+                temp_count, hum_count = temp_count2, hum_count2
+                raw_cols = list(df_auto.columns)
+        else:
+            # Try scanning columns for date-like values and coerce
+            for pos in find_potential_datetime_cols(df0):
+                try:
+                    df_try = df0.copy()
+                    cols = list(df_try.columns)
+                    cols[pos] = 'datetime'
+                    df_try.columns = cols
+                    rename_map_try = build_rename_map(df_try.columns)
+                    if rename_map_try:
+                        df_try = df_try.rename(columns=rename_map_try)
+                    ts_try = parse_datetime_columns(df_try, sharder)
+                    non_null_try = int(ts_try.notna().sum())
+                    if non_null_try > non_null:
+                        df1, ts, non_null = df_try, ts_try, non_null_try
+                        temp_count, hum_count = numeric_counts(df1, sharder)
+                        break
+                except Exception:
+                    continue
+
+    return SheetChoice(name, df1, ts, raw_cols, temp_count, non_null)
+
+
+class _BestSoFar:
+    """Highest temperature count seen by any scoring thread."""
+
+    def __init__(self):
+        self.temp_count = -1
+        self._lock = threading.Lock()
+
+    def offer(self, temp_count: int) -> None:
+        with self._lock:
+            self.temp_count = max(self.temp_count, temp_count)
+
+
+def choose_sheet(source: WorkbookSource, sheets: dict, workers: int = 1,
+                 sharder: Optional[Sharder] = None) -> Optional[SheetChoice]:
+    """Score every sheet and keep the best one.
+
+    Sheets are scored largest first, on up to ``workers`` threads (0 = the
+    available cores, at most 4). A sheet
+    can hold at most ``len(df) + 1`` readings (header autodetect may turn the
+    header row into data), so once another sheet has more valid temperatures
+    than that it is skipped, or abandoned before the expensive header
+    autodetect. The choice is the same as scoring every sheet in order.
+    """
+    items = list(sheets.items())
+    best = _BestSoFar()
+
+    def score(i: int) -> Optional[SheetChoice]:
+        name, df0 = items[i]
+        bound = len(df0) + 1
+
+        def beaten() -> bool:
+            return best.temp_count > bound
+
+        if beaten():
+            debug(f"Skipping sheet {name}: another sheet already has more readings than it has rows")
+            return None
+        cand = evaluate_sheet(source, name, df0, beaten, sharder)
+        if cand is not None:
+            best.offer(cand.temp_count)
+        return cand
+
+    order = sorted(range(len(items)), key=lambda i: -len(items[i][1]))
+    workers = max(1, min(workers or min(4, available_cpus()), len(items)))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='qtparser-sheet') as pool:
+            scored = dict(zip(order, pool.map(score, order)))
+    else:
+        scored = {i: score(i) for i in order}
+
+    chosen = None
+    # Comparar na ordem original do arquivo: em empate total vence a primeira planilha
+    for i in range(len(items)):
+        cand = scored[i]
+        if cand is None:
+            continue
+        # 4) Escolher a melhor: priorizar planilha com mais temperaturas válidas; em empate, maior ts_count
+        if (
+            chosen is None
+            or cand.temp_count > chosen.temp_count
+            or (cand.temp_count == chosen.temp_count and cand.ts_count > chosen.ts_count)
+        ):
+            chosen = cand
+    return chosen
+
+
+def apply_lista_fastpaths(choice: SheetChoice) -> None:
+    """Column-level ISO fast paths for the chosen sheet (updates ``choice.ts``).
+
+    For many legacy files (eg. 'Lista') the time column already holds strict
+    ISO-like datetimes. The mapped 'time' column is re-parsed strictly when the
+    sheet is 'Lista' or at least 10% of its values look ISO-like; 'Lista' sheets
+    additionally get a forced strict pass as last resort. Results are only
+    accepted when they parse more rows (or, for the forced pass, at least half
+    of the non-empty values).
+    """
+    df = choice.df
+    is_lista = str(choice.name).lower() == 'lista'
+
+    def current_count():
+        return int(choice.ts.notna().sum() if choice.ts is not None else 0)
+
+    try:
+        performed_fastpath = False
+        if 'time' in df.columns:
+            scol = normalized_column(df['time'])
+            non_empty, iso_matches = iso_fraction(scol)
+            iso_frac = (iso_matches / non_empty) if non_empty > 0 else 0.0
+            pre_fast_ts_count = current_count()
+            if is_lista or iso_frac >= 0.10:
+                try:
+                    parsed_col = strict_iso_parse(scol, non_empty)
+                    parsed_count = int(parsed_col.notna().sum())
+                    debug(f"Lista fastpath iso_frac={iso_frac:.3f} non_empty={non_empty} iso_matches={iso_matches} parsed_count={parsed_count}")
+                    if parsed_count > pre_fast_ts_count:
+                        choice.ts = parsed_col
+                        choice.ts_count = parsed_count
+                        performed_fastpath = True
+                        debug(f"Fastpath fixed {max(0, parsed_count - pre_fast_ts_count)} rows (pre={pre_fast_ts_count} post={parsed_count})")
+                except Exception:
+                    pass
+        # If we didn't find a time column, but the sheet is 'Lista', try scanning columns
+        if (not performed_fastpath) and is_lista:
+            for pos in range(df.shape[1]):
+                try:
+                    scol = normalized_column(df.iloc[:, pos])
+                    non_empty, iso_matches = iso_fraction(scol)
+                    if non_empty == 0:
+                        continue
+                    if (iso_matches / non_empty) >= 0.15:
+                        parsed_col = pd.to_datetime(scol.where(scol != ''), dayfirst=False, errors='coerce')
+                        if parsed_col.notna().sum() > current_count():
+                            choice.ts = parsed_col
+                            choice.ts_count = int(parsed_col.notna().sum())
+                            break
+                except Exception:
+                    continue
+    except Exception:
+        pass
+
+    # Lista-scoped forced fallback (last resort): strict '%Y-%m-%d %H:%M:%S' on the
+    # mapped 'time' column (or any column with many ISO-like values).
+    try:
+        if not is_lista:
+            return
+        pre_count = current_count()
+        if 'time' in df.columns:
+            scol = normalized_column(df['time'])
+            non_empty = int((scol != '').sum())
+            parsed = pd.to_datetime(scol.where(scol != ''), format='%Y-%m-%d %H:%M:%S', errors='coerce')
+            parsed_count = int(parsed.notna().sum())
+            # Accept if we improved OR if strict parse covers a large fraction (>=50%)
+            if (parsed_count > pre_count) or (non_empty > 0 and parsed_count >= max(1, int(0.5 * non_empty))):
+                choice.ts = parsed
+                choice.ts_count = parsed_count
+                debug(f"Lista forced-strict parsed_count={parsed_count} pre={pre_count} post={parsed_count}")
+                return
+        for pos in range(df.shape[1]):
+            try:
+                scol = normalized_column(df.iloc[:, pos])
+                non_empty, iso_matches = iso_fraction(scol)
+                # require at least a modest fraction of ISO-like values to try
+                if non_empty == 0 or (iso_matches / non_empty) < 0.10:
+                    continue
+                parsed = pd.to_datetime(scol.where(scol != ''), format='%Y-%m-%d %H:%M:%S', errors='coerce')
+                parsed_count = int(parsed.notna().sum())
+                if (parsed_count > pre_count) or (parsed_count >= max(1, int(0.5 * non_empty))):
+                    choice.ts = parsed
+                    choice.ts_count = parsed_count
+                    debug(f"Lista forced-strict column={df.columns[pos]} parsed_count={parsed_count} pre={pre_count} post={parsed_count}")
+                    break
+            except Exception:
+                continue
+    except Exception:
+        pass
+
+
+def _parse_one(value: str, **kwargs):
+    t = pd.to_datetime(value, errors='coerce', **kwargs)
+    return t if pd.notna(t) else None
+
+
+def rescue_row(values, nearby_date) -> Optional[pd.Timestamp]:
+    """Stricter per-row fallbacks for a row whose timestamp is still NaT.
+
+    Only values that look like dates or times are considered, so counters or
+    readings are never mistaken for timestamps.
+    """
+    cells = ['' if v is None or (isinstance(v, float) and np.isnan(v)) else normalize_str(v) for v in values]
+    # 1) Datas e horas em colunas adjacentes
+    for a, b in zip(cells, cells[1:]):
+        if DATE_LIKE_RX.search(a) and TIME_ONLY_RX.match(b):
+            t = _parse_one(f"{a} {b}", dayfirst=True) or _parse_one(f"{a} {b}", dayfirst=False)
+            if t is not None:
+                return t
+    # 2) Coluna só com horário combinada com a data de uma linha vizinha
+    for v in cells:
+        if TIME_ONLY_RX.match(v):
+            nearby = nearby_date()
+            if nearby is not None:
+                t = _parse_one(f"{nearby.date().isoformat()} {v}")
+                if t is not None:
+                    return t
+    # 3) Formatos explícitos ISO e, por fim, inferência do pandas
+    for v in cells:
+        if ISO_LOOSE_RX.match(v):
+            for fmt in ('%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M'):
+                t = _parse_one(v, format=fmt)
+                if t is not None:
+                    return t
+        if DATE_LIKE_RX.search(v):
+            t = _parse_one(v, dayfirst=False) or _parse_one(v, dayfirst=True)
+            if t is not None:
+                return t
+    return None
+
+
+def rescue_missing_timestamps(df: pd.DataFrame, ts: pd.Series, window: int = 10) -> pd.Series:
+    """Fill NaT timestamps row by row; ``ts`` must already be UTC."""
+    missing = np.flatnonzero(ts.isna().to_numpy())
+    valid = np.flatnonzero(ts.notna().to_numpy())
+    # Sem nenhum timestamp válido a planilha não é uma série temporal a resgatar
+    if len(missing) == 0 or len(valid) == 0:
+        return ts
+    ts = ts.copy()
+    rescued = 0
+    for i in missing:
+        def nearby_date(i=i):
+            k = np.searchsorted(valid, i)
+            near = [valid[j] for j in (k - 1, k) if 0 <= j < len(valid) and abs(valid[j] - i) <= window]
+            if not near:
+                return None
+            return ts.iloc[min(near, key=lambda j: abs(j - i))].normalize()
+        try:
+            t = rescue_row(list(df.iloc[i].values), nearby_date)
+        except Exception:
+            t = None
+        if t is not None:
+            t = pd.Timestamp(t)
+            ts.iloc[i] = t.tz_localize('UTC') if t.tz is None else t.tz_convert('UTC')
+            rescued += 1
+    if rescued:
+        debug(f"Row rescue filled {rescued} of {len(missing)} missing timestamps")
+    return ts
+
+
+def parse_sheet(source: WorkbookSource, options: ParseOptions, sheets: Optional[dict] = None) -> SheetChoice:
+    """Read the workbook (unless ``sheets`` were already read), choose the sheet
+    and settle its timestamps (UTC)."""
+    if sheets is None:
+        with stage('read'):
+            sheets = source.read_sheets(options.sheet_name)
+    with stage('detect'):
+        choice = choose_sheet(source, sheets, options.sheet_workers, sharder_for(options))
+        if choice is None:
+            raise ParseError('No sheets found', code=4)
+        debug(f"Chosen sheet: {choice.name} (temp_count={choice.temp_count}, ts_count={choice.ts_count})")
+        event('sheet', sheet=choice.name, sheets=len(sheets), rows=len(choice.df),
+              temp_count=choice.temp_count, ts_count=choice.ts_count)
+        apply_lista_fastpaths(choice)
+    with stage('rescue'):
+        # O resgate olha as linhas vizinhas, então roda uma vez sobre a planilha inteira
+        choice.df = choice.df.reset_index(drop=True)
+        ts = to_utc(choice.ts).reset_index(drop=True).reindex(range(len(choice.df)))
+        missing = int(ts.isna().sum())
+        choice.ts = rescue_missing_timestamps(choice.df, ts)
+        left = int(choice.ts.isna().sum())
+        event('counts', missing_timestamps=missing, rescued=missing - left)
+        if left:
+            warning(f"{left} rows still without timestamp after rescue")
+    return choice
+
+
+def sheet_channels(choice: SheetChoice, options: ParseOptions) -> list:
+    """Probes to melt in multi-channel mode (empty when the sheet is single-probe)."""
+    if not options.channels:
+        return []
+    # Detectar as sondas antes da unificação, que manteria apenas a primeira
+    channels = detect_channels(list(choice.df.columns), choice.raw_cols)
+    if len(channels) < 2:
+        return []
+    debug(f"Channels detected: {[(cid, str(choice.raw_cols[tp])) for cid, tp, _ in channels]}")
+    return channels
+
+
+def sheet_readings(choice: SheetChoice, idx) -> tuple:
+    """Cleaned (temperature, humidity) arrays of the rows ``idx`` only."""
+    out = []
+    for name in ['temperature', 'humidity']:
+        col = unify_same_named_columns(choice.df, name)
+        out.append(to_numeric_clean(col.iloc[idx]).to_numpy(dtype=float) if col is not None else np.full(len(idx), np.nan))
+    return tuple(out)
+
+
+def iter_batches(choice: SheetChoice, options: ParseOptions, channels=()) -> Iterator[RowBatch]:
+    """Clean the numeric columns chunk by chunk (``options.batch_size`` rows each).
+
+    Everything left after :func:`parse_sheet` is row-local, so each batch can
+    be handed to the writer as soon as it is ready. ``channels`` comes from
+    :func:`sheet_channels`. The first ``options.skip_rows`` output rows are skipped.
+    """
+    if channels:
+        # O formato longo agrupa por canal sobre a planilha inteira
+        melted = RowBatch.from_frame(melt_channels(choice.df, choice.ts, channels))
+        yield from melted.slice(options.skip_rows, len(melted)).split(options.batch_size)
+        return
+    numeric = {name: unify_same_named_columns(choice.df, name) for name in ['temperature', 'humidity']}
+    sharder = sharder_for(options)
+    if sharder.applies(len(choice.df)):
+        # Planilha enorme: limpar as colunas inteiras em paralelo e só fatiar nos lotes
+        numeric = {name: to_numeric_clean(col, sharder) if col is not None else None for name, col in numeric.items()}
+    step = max(1, options.batch_size)
+    for start in range(options.skip_rows, len(choice.df), step):
+        stop = start + step
+        # Clean numeric columns (temperatura/umidade)
+        out = pd.DataFrame({'timestamp': choice.ts.iloc[start:stop].reset_index(drop=True)})
+        for numcol, col in numeric.items():
+            out[numcol] = to_numeric_clean(col.iloc[start:stop]).reset_index(drop=True) if col is not None else np.nan
+        yield RowBatch.from_frame(out)
+
@@ -0,0 +1,12 @@
+class ParseError(Exception):
+    """Raised when a workbook cannot be parsed.
+
+    ``code`` is the process exit status the CLI uses for this failure
+    (2 = file not found, 3 = read error, 4 = no usable sheet,
+    5 = optional dependency missing, 6 = invalid manifest,
+    7 = database error in the PostgreSQL sink).
+    """
+
+    def __init__(self, message: str, code: int = 1):
+        super().__init__(message)
+        self.code = code
@@ -0,0 +1,80 @@
+"""Framed output with acknowledgements (``--framed``).
+
+Each frame is a 9-byte header followed by the payload::
+
+    kind: 1 byte   b'S' start ({"total": n|null}), b'R' rows (NDJSON block),
+                   b'E' end ({"rows": n}), b'X' error ({"error": "..."})
+    seq:  uint32 LE, 1, 2, 3, ...
+    len:  uint32 LE payload length
+
+The consumer acknowledges on the parser's stdin with ``ACK <seq>\\n`` lines
+(cumulative: everything up to ``seq`` was handled). At most ``window`` frames
+are sent without an acknowledgement, so a slow consumer throttles the parser
+instead of piling rows up in the pipe or in memory.
+"""
+import json
+import struct
+import threading
+from typing import BinaryIO, Optional, TextIO
+
+FRAME_HEADER = struct.Struct('<cII')
+KIND_START = b'S'
+KIND_ROWS = b'R'
+KIND_END = b'E'
+KIND_ERROR = b'X'
+
+
+class AckWindow:
+    """Tracks ``ACK <seq>`` lines read from the consumer on a background thread."""
+
+    def __init__(self, acks: TextIO, window: int):
+        self.window = window
+        self.acked = 0
+        self.closed = False
+        self._cond = threading.Condition()
+        threading.Thread(target=self._read, args=(acks,), name='qtparser-acks', daemon=True).start()
+
+    def _read(self, acks: TextIO) -> None:
+        try:
+            for line in acks:
+                parts = line.split()
+                if len(parts) == 2 and parts[0] == 'ACK' and parts[1].isdigit():
+                    with self._cond:
+                        self.acked = max(self.acked, int(parts[1]))
+                        self._cond.notify_all()
+        finally:
+            with self._cond:
+                self.closed = True
+                self._cond.notify_all()
+
+    def wait_to_send(self, seq: int) -> None:
+        """Block until ``seq`` fits in the window; BrokenPipeError if the consumer left."""
+        with self._cond:
+            while seq - self.acked > self.window:
+                if self.closed:
+                    raise BrokenPipeError('consumer closed the acknowledgement channel')
+                self._cond.wait()
+
+    def wait_all(self, seq: int, timeout: Optional[float] = None) -> bool:
+        """Wait until every frame up to ``seq`` is acknowledged."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.acked >= seq or self.closed, timeout)
+
+
+class FramedWriter:
+    def __init__(self, out: BinaryIO, acks: Optional[AckWindow] = None):
+        self.out = out
+        self.acks = acks
+        self.seq = 0
+
+    def send(self, kind: bytes, payload: bytes) -> int:
+        self.seq += 1
+        if self.acks is not None:
+            self.acks.wait_to_send(self.seq)
+        self.out.write(FRAME_HEADER.pack(kind, self.seq, len(payload)))
+        self.out.write(payload)
+        self.out.flush()
+        return self.seq
+
+    def send_json(self, kind: bytes, obj) -> int:
+        return self.send(kind, json.dumps(obj, ensure_ascii=False).encode('utf-8'))
@@ -0,0 +1,272 @@
+"""Lean decoder: small or well-known workbooks straight into numpy, no pandas.
+
+Covers the common logger layout: header in the first row, a single timestamp
+column ('datetime', or 'time' carrying date and time) and a single temperature column with
+an optional humidity column. Every rule below mirrors what the pandas pipeline
+would do with the same cells; whenever a file falls outside what can be
+reproduced exactly, :class:`LeanUnsupported` is raised and the caller falls
+back to the full pipeline.
+"""
+import re
+from datetime import datetime, time
+from itertools import islice
+from typing import Optional
+
+import numpy as np
+
+from .batch import RowBatch
+from .columns import build_rename_map
+from .logs import debug, event, stage, warning
+from .options import ParseOptions
+from .source import WorkbookSource, xlsx_rows
+
+# Layouts conhecidos (mesma tabela de pythonFallbackService): fabricante -> planilha
+VENDOR_SHEETS = {'elitech': 'Lista', 'novus': 'Dados', 'instrutemp': 'Dados', 'testo': 'Data'}
+
+# (formato, regex estrita) na mesma ordem de parse_datetime_columns
+DATETIME_FORMATS = [
+    ('%Y-%m-%d %H:%M:%S', re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}')),
+    ('%Y-%m-%d %H:%M', re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}')),
+    ('%d/%m/%Y %H:%M:%S', re.compile(r'\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}')),
+    ('%d/%m/%Y %H:%M', re.compile(r'\d{2}/\d{2}/\d{4} \d{2}:\d{2}')),
+    ('%m/%d/%Y %H:%M:%S', re.compile(r'\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}')),
+    ('%m/%d/%Y %H:%M', re.compile(r'\d{2}/\d{2}/\d{4} \d{2}:\d{2}')),
+]
+# A coluna 'time' sozinha não tenta o formato mês/dia
+TIME_COL_FORMATS = DATETIME_FORMATS[:4]
+NUM_RX = re.compile(r'[-+]?[0-9]*\.?[0-9]+')
+# Valores que o read_excel trata como ausentes (na_values padrão do pandas)
+NA_STRINGS = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+}
+HEADER_SCAN_ROWS = 200
+# read_rows(full=ALL_SHEETS): todas as planilhas até o fim ('*' não é permitido em nomes de planilha)
+ALL_SHEETS = '*'
+
+
+class LeanUnsupported(Exception):
+    """The workbook needs the full pandas pipeline."""
+
+
+def is_na(v) -> bool:
+    if v is None:
+        return True
+    if isinstance(v, float):
+        return v != v
+    return isinstance(v, str) and v in NA_STRINGS
+
+
+def read_rows(source: WorkbookSource, full: Optional[str] = None) -> tuple:
+    """(cell values per sheet, row count per sheet), values converted the way
+    pandas' readers convert them.
+
+    Only the sheet named ``full`` (every sheet with ``ALL_SHEETS``) is kept to
+    the end; the others keep HEADER_SCAN_ROWS rows. XLSX sheets are streamed
+    to the end either way to count their rows, since their declared dimension
+    is not trusted.
+    """
+    sheets = {}
+    sizes = {}
+    if source.legacy:
+        import xlrd
+        if source.path is not None:
+            book = xlrd.open_workbook(source.path, on_demand=True)
+        else:
+            book = xlrd.open_workbook(file_contents=source.data, on_demand=True)
+        try:
+            for nm in book.sheet_names():
+                sh = book.sheet_by_name(nm)
+                n = sh.nrows if full in (nm, ALL_SHEETS) else min(sh.nrows, HEADER_SCAN_ROWS)
+                sizes[nm] = sh.nrows
+                rows = []
+                for i in range(n):
+                    out = []
+                    for c in sh.row(i):
+                        if c.ctype == xlrd.XL_CELL_DATE:
+                            dt = xlrd.xldate_as_datetime(c.value, book.datemode)
+                            if dt.timetuple()[0:3] in ((1899, 12, 31), (1904, 1, 1)):
+                                dt = dt.time()
+                            out.append(dt)
+                        elif c.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+                            out.append(None)
+                        elif c.ctype == xlrd.XL_CELL_BOOLEAN:
+                            raise LeanUnsupported('boolean cells')
+                        else:
+                            out.append(c.value)
+                    rows.append(out)
+                sheets[nm] = rows
+                book.unload_sheet(nm)
+        finally:
+            book.release_resources()
+    else:
+        with source.xlsx_workbook() as wb:
+            for nm in wb.sheetnames:
+                it = xlsx_rows(wb[nm])
+                if full in (nm, ALL_SHEETS):
+                    sheets[nm] = [list(r) for r in it]
+                    sizes[nm] = len(sheets[nm])
+                else:
+                    sheets[nm] = [list(r) for r in islice(it, HEADER_SCAN_ROWS)]
+                    sizes[nm] = len(sheets[nm]) + sum(1 for _ in it)
+    return sheets, sizes
+
+
+def header_mapping(rows):
+    """{canonical name: [positions]} for the first row, or None if it is not a header."""
+    if not rows or all(is_na(v) for v in rows[0]):
+        return None
+    labels = [f'Unnamed: {i}' if is_na(v) else v for i, v in enumerate(rows[0])]
+    mapping = {}
+    for pos, label in enumerate(labels):
+        canon = build_rename_map([label]).get(label)
+        if canon:
+            mapping.setdefault(canon, []).append(pos)
+    return mapping
+
+
+def has_time_source(mapping) -> bool:
+    return 'datetime' in mapping or 'time' in mapping
+
+
+def mentions_temperature(rows) -> bool:
+    return any('temper' in str(v).strip().lower() for r in rows for v in r if not is_na(v))
+
+
+def cell(row, pos):
+    return row[pos] if pos < len(row) else None
+
+
+def as_text(v) -> str:
+    # Equivalente a astype(str).str.strip() sobre a célula
+    return str(v).strip()
+
+
+def parse_with_formats(values, formats):
+    """Datetimes for all non-NA values using the first format that parses all of them."""
+    texts = [as_text(v) for v in values if not is_na(v)]
+    for fmt, rx in formats:
+        if all(rx.fullmatch(t) for t in texts):
+            try:
+                parsed = {t: datetime.strptime(t, fmt) for t in set(texts)}
+            except ValueError:
+                continue
+            return [None if is_na(v) else parsed[as_text(v)] for v in values]
+    raise LeanUnsupported('timestamps need inference')
+
+
+def decode_timestamps(data, mapping):
+    def single(name):
+        positions = mapping[name]
+        if len(positions) > 1:
+            raise LeanUnsupported(f'duplicated {name} columns')
+        return [cell(r, positions[0]) for r in data]
+
+    if 'datetime' in mapping:
+        values = single('datetime')
+        if all(isinstance(v, (int, float)) for v in values if not is_na(v)):
+            raise LeanUnsupported('Excel serial timestamps')
+        return parse_with_formats(values, DATETIME_FORMATS)
+    if 'time' in mapping and 'date' not in mapping:
+        values = single('time')
+        if all(isinstance(v, (int, float)) for v in values if not is_na(v)):
+            raise LeanUnsupported('Excel serial timestamps')
+        return parse_with_formats(values, TIME_COL_FORMATS)
+    # 'date' (+ 'time') passa pela inferência dayfirst do pandas
+    raise LeanUnsupported('date column needs dayfirst inference')
+
+
+def decode_numeric(values) -> np.ndarray:
+    """Same result as detect.to_numeric_clean on the column pandas would build."""
+    if any(isinstance(v, (bool, datetime, time)) for v in values):
+        raise LeanUnsupported('unexpected cell type in numeric column')
+    textual = any(isinstance(v, str) and not is_na(v) for v in values)
+    out = np.full(len(values), np.nan)
+    for i, v in enumerate(values):
+        if is_na(v):
+            continue
+        if not textual:
+            out[i] = float(v)
+            continue
+        m = NUM_RX.search(str(v).replace(',', '.'))
+        if m:
+            out[i] = float(m.group(0))
+    return out
+
+
+def try_lean_decode(source: WorkbookSource, options: ParseOptions) -> Optional[tuple]:
+    """Decode without pandas: ``(batch, rows)`` or None when the full pipeline
+    is needed. ``rows`` is the :class:`~qtparser.rejects.SourceRows` of the
+    sheet with ``options.keep_source``, None otherwise."""
+    vendor_known = (options.vendor or '').lower() in VENDOR_SHEETS
+    if not options.lean or not (vendor_known or source.size <= options.lean_max_bytes):
+        return None
+    try:
+        with stage('lean'):
+            batch, sheet, rows = _decode(source, options)
+    except LeanUnsupported as e:
+        debug(f"Lean decoder skipped: {e}")
+        event('strategy', decoder='full', reason=str(e))
+        return None
+    except Exception as e:
+        warning(f"Lean decoder failed, using full pipeline: {e}")
+        event('strategy', decoder='full', reason='lean decoder error')
+        return None
+    debug(f"Lean decoder used: sheet={sheet} rows={len(batch)}")
+    event('strategy', decoder='lean', sheet=sheet, rows=len(batch))
+    return batch, rows
+
+
+def _decode(source: WorkbookSource, options: ParseOptions):
+    # XLS: primeiro só o topo de cada planilha para achar a candidata. XLSX é lido
+    # até o fim de qualquer forma (ver read_rows), então uma passada só guarda tudo
+    heads, sizes = read_rows(source, None if source.legacy else ALL_SHEETS)
+    if options.sheet_name is not None:
+        if options.sheet_name not in heads:
+            raise LeanUnsupported(f'sheet {options.sheet_name!r} not found')
+        heads = {options.sheet_name: heads[options.sheet_name]}
+    candidates = []
+    for nm, rows in heads.items():
+        mapping = header_mapping(rows)
+        if mapping and 'temperature' in mapping and has_time_source(mapping):
+            candidates.append((nm, mapping))
+    if len(candidates) != 1:
+        raise LeanUnsupported(f'{len(candidates)} candidate sheets')
+    sheet, mapping = candidates[0]
+    if len(mapping['temperature']) > 1 or len(mapping.get('humidity', [])) > 1:
+        raise LeanUnsupported('multi-probe sheet')
+
+    rows = heads[sheet] if len(heads[sheet]) == sizes[sheet] else read_rows(source, full=sheet)[0][sheet]
+    data = rows[1:]
+    # O read_excel descarta linhas vazias no fim da planilha
+    while data and all(is_na(v) for v in data[-1]):
+        data.pop()
+    if not data:
+        raise LeanUnsupported('no data rows')
+
+    stamps = decode_timestamps(data, mapping)
+    for r, ts in zip(data, stamps):
+        # Linhas sem timestamp mas com conteúdo passariam pelo resgate linha a linha
+        if ts is None and not all(is_na(v) for v in r):
+            raise LeanUnsupported('rows without timestamp')
+    temperature = decode_numeric([cell(r, mapping['temperature'][0]) for r in data])
+    readings = int(np.isfinite(temperature).sum())
+    if not readings:
+        raise LeanUnsupported('no temperature values')
+    # Outra planilha com temperatura só vence a escolha do pandas se tiver linhas
+    # suficientes (até len + 1 leituras, com a detecção automática de cabeçalho)
+    for nm, other in heads.items():
+        if nm != sheet and sizes[nm] + 1 >= readings and mentions_temperature(other):
+            raise LeanUnsupported(f'sheet {nm!r} may compete')
+    if 'humidity' in mapping:
+        humidity = decode_numeric([cell(r, mapping['humidity'][0]) for r in data])
+    else:
+        humidity = np.full(len(data), np.nan)
+    timestamp = np.array(stamps, dtype='datetime64[ns]')
+    kept = None
+    if options.keep_source:
+        from .rejects import SourceRows
+        header = [f'Unnamed: {i}' if is_na(v) else v for i, v in enumerate(rows[0])]
+        kept = SourceRows('lean', sheet, header, lambda i: data[i])
+    return RowBatch(timestamp, temperature, humidity), sheet, kept
+
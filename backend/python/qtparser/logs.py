@@ -0,0 +1,114 @@
+"""Diagnostics on stderr: free-form DEBUG / WARNING lines, or JSON-lines events with ``--events``.
+
+Event records (one JSON object per line, ``t`` = ms since start)::
+
+    {"event": "stage", "stage": "read", "status": "start"|"end"|"error", "ms": ...}
+    {"event": "strategy", "decoder": "lean"|"full", ...}
+    {"event": "sheet", "sheet": ..., "temp_count": ..., "ts_count": ...}
+    {"event": "counts", ...}
+    {"event": "warning", "message": ...}
+    {"event": "checkpoint", "last_row": ..., "completed": ...}       (--sink)
+    {"event": "append", "first_new": ..., "matched": ...}             (--sink --append)
+    {"event": "heartbeat", "stage": <current stage>, "rows": <rows handed to the output>}
+
+A heartbeat is only sent while the process is alive, not while it makes
+progress: the consumer must watch ``stage`` and ``rows`` to tell a slow parse
+from a stuck one. In event mode the DEBUG and WARNING lines are not printed.
+"""
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+_lock = threading.Lock()
+_events = None
+_started = time.monotonic()
+_stages: list = []
+# Linhas já entregues à saída (ver advance); vão em cada heartbeat
+_rows = 0
+_heartbeat_stop: Optional[threading.Event] = None
+# Campos acrescentados a todo evento (ex.: o arquivo de um worker no modo manifesto)
+_context: dict = {}
+
+
+def _elapsed_ms() -> int:
+    return int((time.monotonic() - _started) * 1000)
+
+
+def debug(msg: str) -> None:
+    if _events is not None:
+        return
+    # pythonFallbackService repassa ao logger as linhas de stderr que contêm DEBUG
+    print(f"DEBUG: {msg}", file=sys.stderr)
+
+
+def event(kind: str, **fields) -> None:
+    """Write one structured event (no-op unless events are enabled)."""
+    if _events is None:
+        return
+    line = json.dumps({'event': kind, 't': _elapsed_ms(), **_context, **fields}, ensure_ascii=False, default=str)
+    with _lock:
+        _events.write(line + '\n')
+        _events.flush()
+
+
+def warning(msg: str) -> None:
+    if _events is not None:
+        event('warning', message=msg)
+    else:
+        # Registrada pelo pythonFallbackService com logger.warn
+        print(f"WARNING: {msg}", file=sys.stderr)
+
+
+def advance(rows: int) -> None:
+    """Count ``rows`` handed to the output; heartbeats report the running total."""
+    global _rows
+    _rows += rows
+
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage; heartbeats report the innermost running stage."""
+    t0 = time.monotonic()
+    event('stage', stage=name, status='start')
+    _stages.append(name)
+    try:
+        yield
+    except BaseException:
+        event('stage', stage=name, status='error', ms=int((time.monotonic() - t0) * 1000))
+        raise
+    finally:
+        _stages.pop()
+    event('stage', stage=name, status='end', ms=int((time.monotonic() - t0) * 1000))
+
+
+def set_context(**fields) -> None:
+    """Tag every following event with ``fields``."""
+    _context.clear()
+    _context.update(fields)
+
+
+def enable_events(out=None, heartbeat: float = 2.0) -> None:
+    """Switch to JSON-lines events on ``out`` (stderr) with a heartbeat every ``heartbeat`` s."""
+    global _events, _heartbeat_stop, _rows
+    _events = out or sys.stderr
+    _rows = 0
+    if heartbeat > 0 and _heartbeat_stop is None:
+        _heartbeat_stop = threading.Event()
+
+        def beat(stop=_heartbeat_stop):
+            while not stop.wait(heartbeat):
+                current = _stages[-1:]
+                event('heartbeat', stage=current[0] if current else None, rows=_rows)
+
+        threading.Thread(target=beat, name='qtparser-heartbeat', daemon=True).start()
+
+
+def disable_events() -> None:
+    global _events, _heartbeat_stop
+    if _heartbeat_stop is not None:
+        _heartbeat_stop.set()
+        _heartbeat_stop = None
+    _events = None
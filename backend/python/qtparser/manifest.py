@@ -0,0 +1,173 @@
+"""Manifest mode: parse many workbooks in one invocation (``--manifest``).
+
+The manifest is a JSON array (or ``{"files": [...]}``) of entries::
+
+    {"file": "EF7217100050.xls", "id": "s1", "sheet": null, "vendor": "elitech",
+     "sensorId": "...", "channels": false}
+
+Only ``file`` is required; relative paths are resolved against the manifest's
+directory and ``id`` defaults to the entry's position. Files are parsed in
+parallel on a process pool, largest first, so a suitcase finishes in about the
+time of its largest file. Output is NDJSON on stdout, one file at a time in
+completion order: the file's rows tagged with ``"file": id``, then a
+``{"done": {"file": id, "rows": n, ...}}`` record (``"error"``/``"code"``
+instead of ``rows`` when that file failed), and a final
+``{"manifest": {"files": n, "failed": k, "rows": r, ...}}`` summary.
+"""
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, replace
+from typing import List, Optional
+
+from .errors import ParseError
+from .logs import enable_events, event, set_context, stage
+from .options import ParseOptions
+from .pipeline import available_cpus
+
+
+@dataclass
+class ManifestEntry:
+    file: str
+    id: str
+    sheet: Optional[str] = None
+    vendor: Optional[str] = None
+    sensor_id: Optional[str] = None
+    channels: bool = False
+
+
+def load_manifest(src: str) -> List[ManifestEntry]:
+    """Read a manifest from a path (``-`` = stdin)."""
+    base_dir = ''
+    try:
+        if src == '-':
+            data = json.load(sys.stdin)
+        else:
+            base_dir = os.path.dirname(os.path.abspath(src))
+            with open(src, encoding='utf-8') as f:
+                data = json.load(f)
+    except FileNotFoundError:
+        raise ParseError('Manifest not found', code=2)
+    except (OSError, ValueError) as e:
+        raise ParseError(f'Invalid manifest: {e}', code=6)
+
+    items = data.get('files') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise ParseError('Invalid manifest: expected a non-empty list of files', code=6)
+    entries = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('file'), str):
+            raise ParseError(f'Invalid manifest: entry {i} has no "file"', code=6)
+        path = item['file'] if os.path.isabs(item['file']) else os.path.join(base_dir, item['file'])
+        entries.append(ManifestEntry(
+            file=path,
+            id=str(item.get('id', i)),
+            sheet=item.get('sheet'),
+            vendor=item.get('vendor'),
+            sensor_id=item.get('sensorId'),
+            channels=bool(item.get('channels', False)),
+        ))
+    ids = [e.id for e in entries]
+    if len(set(ids)) != len(ids):
+        raise ParseError('Invalid manifest: duplicate ids', code=6)
+    return entries
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def parse_entry(entry: ManifestEntry, out_path: str, base: ParseOptions, events: bool = False) -> dict:
+    """Parse one manifest entry into ``out_path`` (NDJSON); runs inside a pool worker."""
+    from . import api
+    from .emit import write_ndjson
+
+    if events:
+        # O processo pai emite os heartbeats; aqui só os eventos do arquivo
+        enable_events(heartbeat=0)
+        set_context(file=entry.id)
+    t0 = time.monotonic()
+    options = replace(
+        base,
+        sheet_name=entry.sheet,
+        vendor=entry.vendor or base.vendor,
+        channels=entry.channels or base.channels,
+        # Os núcleos já estão ocupados por outros arquivos: sem threads extras
+        prefetch=0,
+        sheet_workers=1,
+        shard_workers=1,
+    )
+    tag = {'file': entry.id}
+    rows = 0
+    try:
+        stream = api.parse(entry.file, options)
+        with open(out_path, 'w', encoding='utf-8') as out, stage('write'):
+            for batch in stream:
+                write_ndjson(batch, out, tag)
+                rows += len(batch)
+    except ParseError as e:
+        event('error', message=str(e), code=e.code)
+        return {'error': str(e), 'code': e.code}
+    return {'rows': rows, 'ms': int((time.monotonic() - t0) * 1000), 'output': out_path}
+
+
+def run_manifest(entries: List[ManifestEntry], base: ParseOptions, out, jobs: Optional[int] = None,
+                 events: bool = False) -> dict:
+    """Parse every entry and write tagged NDJSON to the binary stream ``out``; returns the summary."""
+    t0 = time.monotonic()
+    workers = max(1, min(len(entries), jobs or available_cpus()))
+    # Maiores primeiro: o último arquivo a terminar não começa atrasado
+    order = sorted(range(len(entries)), key=lambda i: -_file_size(entries[i].file))
+    summary = {'files': len(entries), 'failed': 0, 'rows': 0, 'workers': workers}
+
+    def finish(entry: ManifestEntry, result: dict) -> None:
+        set_context()
+        output = result.pop('output', None)
+        if output:
+            with open(output, 'rb') as f:
+                shutil.copyfileobj(f, out)
+            os.remove(output)
+        done = {'file': entry.id, 'path': entry.file, 'sensorId': entry.sensor_id, **result}
+        out.write((json.dumps({'done': done}, ensure_ascii=False) + '\n').encode('utf-8'))
+        out.flush()
+        if 'error' in result:
+            summary['failed'] += 1
+        else:
+            summary['rows'] += result['rows']
+        event('file', **done)
+
+    with tempfile.TemporaryDirectory(prefix='qtparser-manifest-') as tmpdir, stage('manifest'):
+        paths = {i: os.path.join(tmpdir, f'{i}.ndjson') for i in order}
+        if workers == 1:
+            for i in order:
+                try:
+                    result = parse_entry(entries[i], paths[i], base, events)
+                except Exception as e:
+                    # Mesmo tratamento do pool: só este arquivo falha
+                    result = {'error': f'{type(e).__name__}: {e}', 'code': 1}
+                finish(entries[i], result)
+        else:
+            # spawn: com --events o pai tem a thread de heartbeat, que segura logs._lock; um fork
+            # nesse instante deixaria o lock preso no filho, travado no primeiro event()
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = {pool.submit(parse_entry, entries[i], paths[i], base, events): i for i in order}
+                for fut in as_completed(futures):
+                    try:
+                        result = fut.result()
+                    except Exception as e:
+                        # Erro inesperado ou worker morto (ex.: sem memória): só este arquivo falha
+                        result = {'error': f'{type(e).__name__}: {e}', 'code': 1}
+                    finish(entries[futures[fut]], result)
+
+    summary['ms'] = int((time.monotonic() - t0) * 1000)
+    out.write((json.dumps({'manifest': summary}) + '\n').encode('utf-8'))
+    out.flush()
+    return summary
@@ -0,0 +1,36 @@
+from dataclasses import dataclass
+from typing import Optional
+
+# Linhas recusadas gravadas no sidecar por arquivo (--rejects-limit, ver qtparser.rejects)
+REJECTS_LIMIT = 1000
+
+
+@dataclass
+class ParseOptions:
+    # Planilha a usar; None = avaliar todas e escolher a melhor
+    sheet_name: Optional[str] = None
+    # Emitir sondas de loggers multicanal como fluxo longo com coluna 'channel'
+    channels: bool = False
+    # Número máximo de linhas por lote produzido por parse()
+    batch_size: int = 5000
+    # Linhas de saída já entregues antes (retomada de importação): não são produzidas de novo
+    skip_rows: int = 0
+    # Threads para pontuar as planilhas candidatas quando sheet_name é None
+    # (0 = núcleos disponíveis, até 4; 1 = sequencial)
+    sheet_workers: int = 0
+    # Processos para converter por faixas de linhas as planilhas com pelo menos
+    # shard_min_rows linhas (0 = núcleos disponíveis; 1 = desligado)
+    shard_workers: int = 0
+    shard_min_rows: int = 200_000
+    # Lotes preparados à frente do consumidor pela thread de parse (0 = sem thread)
+    prefetch: int = 2
+    # Fabricante sugerido pelo Node (elitech, novus, instrutemp, testo)
+    vendor: Optional[str] = None
+    # Tentar o decodificador enxuto (sem pandas) antes do pipeline completo
+    lean: bool = True
+    # Motor do pipeline completo: 'pandas' ou 'polars' (opcional; ver qtparser.polars_engine)
+    engine: str = 'pandas'
+    # Arquivos até este tamanho tentam o decodificador enxuto mesmo sem fabricante conhecido
+    lean_max_bytes: int = 2 * 1024 * 1024
+    # Manter acesso às células da planilha no stream (sidecar de linhas recusadas, ver qtparser.rejects)
+    keep_source: bool = False
@@ -0,0 +1,439 @@
+"""PostgreSQL sink: write parsed rows straight into ``sensor_data`` (``--sink postgres``).
+
+Rows get the same validation and numbering as pythonFallbackService (``rowNumber``
+counts every parsed row from 1; rows without a timestamp or with a temperature
+outside [-80, 120] are counted as failed) and are streamed with one
+``COPY ... FROM STDIN`` into a temporary staging table. A single set-based
+``INSERT ... SELECT`` then merges the staging table into ``sensor_data``,
+skipping rows whose ``(sensorId, timestamp, rowNumber, fileName)`` already
+exists (like ``createMany({skipDuplicates: true})``) and rows whose sensor does
+not exist. Inserted rows are tagged with ``parserVersion``. Only a summary goes
+back to the caller.
+
+Imports of a file are checkpointed in ``import_checkpoints`` (see
+:class:`Checkpoint`): rows are committed in chunks of ``CHECKPOINT_ROWS``
+together with the last committed rowNumber, so a retried import skips the
+stored rows instead of sending them again, and a completed file is not even
+parsed. With checkpoints off everything runs in one transaction.
+
+psycopg (3) is optional; it is only imported when this sink is requested.
+"""
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field, replace
+from typing import Iterable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+
+from . import __version__
+from .batch import RowBatch
+from .emit import float_tokens
+from .errors import ParseError
+from .logs import debug, event, warning
+from .options import REJECTS_LIMIT
+from .validity import BAD_TEMPERATURE, NO_TIMESTAMP, OK, TEMP_MAX, TEMP_MIN, check
+
+NS_PER_MS = 1_000_000
+# Linhas por transação com checkpoint (--checkpoint-rows)
+CHECKPOINT_ROWS = 50_000
+# Leituras comparadas com o banco para confirmar a sobreposição de um arquivo baixado de novo
+APPEND_SAMPLES = 16
+# Parâmetros do DATABASE_URL que só o Prisma entende (a libpq recusa parâmetros desconhecidos)
+PRISMA_PARAMS = {'schema', 'connection_limit', 'pool_timeout', 'pgbouncer', 'statement_cache_size', 'socket_timeout'}
+
+# ON COMMIT DROP só vale no commit de fora: dentro de uma transação do chamador cada bloco vira
+# um savepoint e a tabela do bloco anterior ainda existe (pg_temp: nunca uma tabela de verdade)
+STAGE_DDL = '''
+DROP TABLE IF EXISTS pg_temp.qtparser_stage;
+CREATE TEMP TABLE qtparser_stage (
+    "sensorId" TEXT NOT NULL,
+    "timestamp" TIMESTAMP(3) NOT NULL,
+    temperature DOUBLE PRECISION NOT NULL,
+    humidity DOUBLE PRECISION,
+    "rowNumber" INTEGER NOT NULL
+) ON COMMIT DROP
+'''
+STAGE_COPY = 'COPY qtparser_stage ("sensorId", "timestamp", temperature, humidity, "rowNumber") FROM STDIN'
+UNKNOWN_SENSORS = '''
+SELECT count(*) FROM qtparser_stage s
+WHERE NOT EXISTS (SELECT 1 FROM sensors WHERE sensors.id = s."sensorId")
+'''
+# Sem alvo no ON CONFLICT: a chave única pode não existir no banco (só no schema do Prisma),
+# então o NOT EXISTS garante a regra e o ON CONFLICT cobre importações concorrentes
+MERGE = '''
+INSERT INTO sensor_data
+    (id, "sensorId", "timestamp", temperature, humidity, "fileName", "rowNumber", "createdAt", "validationId",
+     "parserVersion")
+SELECT 'c' || substr(md5(random()::text || clock_timestamp()::text || s."rowNumber"::text), 1, 24),
+       s."sensorId", s."timestamp", s.temperature, s.humidity, %(file_name)s, s."rowNumber",
+       now() AT TIME ZONE 'UTC', %(validation_id)s, %(parser_version)s
+FROM qtparser_stage s
+JOIN sensors ON sensors.id = s."sensorId"
+WHERE NOT EXISTS (
+    SELECT 1 FROM sensor_data d
+    WHERE d."sensorId" = s."sensorId" AND d."timestamp" = s."timestamp"
+      AND d."rowNumber" = s."rowNumber" AND d."fileName" = %(file_name)s
+)
+ON CONFLICT DO NOTHING
+'''
+SAVE_CHECKPOINT = '''
+INSERT INTO import_checkpoints
+    (id, "fileHash", "fileName", "optionsHash", options, "lastRow", inserted, duplicates, failed, completed, "updatedAt")
+VALUES ('c' || substr(md5(random()::text || clock_timestamp()::text), 1, 24), %(file_hash)s, %(file_name)s,
+        %(options_hash)s, %(options)s::jsonb, %(last_row)s, %(inserted)s, %(duplicates)s, %(failed)s, %(completed)s,
+        now() AT TIME ZONE 'UTC')
+ON CONFLICT ("fileHash", "fileName", "optionsHash") DO UPDATE SET
+    "lastRow" = EXCLUDED."lastRow", inserted = EXCLUDED.inserted, duplicates = EXCLUDED.duplicates,
+    failed = EXCLUDED.failed, completed = EXCLUDED.completed, "updatedAt" = EXCLUDED."updatedAt"
+'''
+
+
+@dataclass
+class SinkTarget:
+    dsn: str
+    file_name: str
+    sensor_id: Optional[str] = None
+    validation_id: Optional[str] = None
+    # Loggers multicanal: id do canal ("1", "2", ...) -> sensor
+    channel_sensors: dict = field(default_factory=dict)
+    # Arquivo baixado de novo: pular o trecho que o sensor já tem (ver overlap_start)
+    append: bool = False
+    # 'rows' (sensor_data) ou 'blocks' (sensor_data_blocks, ver qtparser.blocks)
+    storage: str = 'rows'
+    # Pasta do arquivo Parquet que também recebe as linhas (ver qtparser.archive)
+    archive: Optional[str] = None
+    # Sidecar NDJSON/Parquet das linhas recusadas (ver qtparser.rejects)
+    rejects: Optional[str] = None
+    rejects_limit: int = REJECTS_LIMIT
+
+    def default_sensor(self) -> str:
+        return self.sensor_id or 'unknown'
+
+
+def require_psycopg():
+    try:
+        import psycopg
+    except ImportError:
+        raise ParseError('PostgreSQL sink requires psycopg', code=5)
+    return psycopg
+
+
+def libpq_dsn(url: str) -> tuple:
+    """(conninfo, search_path) for a Prisma-style DATABASE_URL."""
+    parts = urlsplit(url)
+    if not parts.scheme:
+        # Já está no formato "key=value" da libpq
+        return url, None
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    schema = next((v for k, v in query if k == 'schema'), None)
+    query = [(k, v) for k, v in query if k not in PRISMA_PARAMS]
+    return urlunsplit(parts._replace(query=urlencode(query))), schema
+
+
+def copy_text(value: str) -> str:
+    """Escape a value for COPY's text format."""
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def accepted_rows(batch: RowBatch) -> tuple:
+    """(accepted mask, rows without timestamp, rows with a bad temperature)."""
+    codes = check(batch)
+    return codes == OK, int((codes == NO_TIMESTAMP).sum()), int((codes == BAD_TEMPERATURE).sum())
+
+
+def copy_lines(batch: RowBatch, mask: np.ndarray, first_row: int, target: SinkTarget, sensors: dict) -> str:
+    """COPY text for the accepted rows of a batch; ``first_row`` is the rowNumber of its first row."""
+    idx = np.flatnonzero(mask)
+    if not len(idx):
+        return ''
+    # Milissegundos truncados, como o new Date() do Node
+    ns = batch.timestamp.astype('datetime64[ns]', copy=False)[idx].view(np.int64)
+    stamps = np.datetime_as_string((ns // NS_PER_MS).astype('datetime64[ms]'), unit='ms').tolist()
+    temps = float_tokens(batch.temperature[idx])
+    hum = batch.humidity[idx]
+    hums = ['\\N' if not ok else t for t, ok in zip(float_tokens(hum), np.isfinite(hum).tolist())]
+    numbers = (idx + first_row).tolist()
+    if batch.channel is None:
+        sensor = sensors.setdefault(None, copy_text(target.default_sensor()))
+        owners = [sensor] * len(idx)
+    else:
+        owners = []
+        for ch in batch.channel[idx].tolist():
+            if ch not in sensors:
+                sensors[ch] = copy_text(target.channel_sensors.get(str(ch)) or target.default_sensor())
+            owners.append(sensors[ch])
+    return ''.join(f'{s}\t{t}\t{a}\t{b}\t{n}\n' for s, t, a, b, n in zip(owners, stamps, temps, hums, numbers))
+
+
+def connect(dsn: str):
+    """Open an autocommit psycopg connection for a DATABASE_URL."""
+    psycopg = require_psycopg()
+    conninfo, schema = libpq_dsn(dsn)
+    try:
+        return psycopg.connect(conninfo, autocommit=True, options=f'-c search_path={schema}' if schema else None)
+    except psycopg.Error as e:
+        raise ParseError(f'Database error: {e}', code=7)
+
+
+class Checkpoint:
+    """Durable import progress of one file in ``import_checkpoints``.
+
+    The key is the file's SHA-256, its ``fileName`` and a hash of the parser
+    options and target; ``lastRow`` is the last rowNumber whose chunk was
+    committed, and it is updated in the same transaction as that chunk's merge.
+    """
+
+    def __init__(self, file_hash: str, file_name: str, options: dict, every: int = CHECKPOINT_ROWS):
+        self.file_hash = file_hash
+        self.file_name = file_name
+        self.options = options
+        self.options_hash = hashlib.sha256(json.dumps(options, sort_keys=True).encode('utf-8')).hexdigest()
+        self.every = max(1, every)
+        self.last_row = 0
+        self.totals = {'inserted': 0, 'duplicates': 0, 'failed': 0}
+        self.completed = False
+
+    def load(self, conn) -> 'Checkpoint':
+        row = conn.execute(
+            'SELECT "lastRow", inserted, duplicates, failed, completed FROM import_checkpoints '
+            'WHERE "fileHash" = %s AND "fileName" = %s AND "optionsHash" = %s',
+            (self.file_hash, self.file_name, self.options_hash),
+        ).fetchone()
+        if row:
+            self.last_row, inserted, duplicates, failed, self.completed = row
+            self.totals = {'inserted': inserted, 'duplicates': duplicates, 'failed': failed}
+        return self
+
+    def save(self, cur, last_row: int, totals: dict, completed: bool) -> None:
+        cur.execute(SAVE_CHECKPOINT, {
+            'file_hash': self.file_hash, 'file_name': self.file_name, 'options_hash': self.options_hash,
+            'options': json.dumps(self.options), 'last_row': last_row, 'completed': completed, **totals,
+        })
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        raise ParseError('File not found', code=2)
+    except OSError as e:
+        raise ParseError(f"Read error: {e}", code=3)
+    return digest.hexdigest()
+
+
+def checkpoint_options(options, target: SinkTarget) -> dict:
+    """What decides the rows and rowNumbers of an import (part of the checkpoint key)."""
+    return {
+        'sheet': options.sheet_name, 'channels': options.channels, 'vendor': options.vendor,
+        'sensorId': target.sensor_id, 'channelSensors': target.channel_sensors,
+        'validationId': target.validation_id, 'append': target.append,
+        # Só entra na chave fora do padrão, para não invalidar os checkpoints já gravados
+        **({'storage': target.storage} if target.storage != 'rows' else {}),
+    }
+
+
+def overlap_start(conn, sensor_id: str, samples: int = APPEND_SAMPLES):
+    """``start`` hook for :func:`qtparser.api.parse` that skips what ``sensor_id`` already has.
+
+    The rows up to the last one at or before the newest stored timestamp are
+    the candidate overlap. It is only skipped when the file is in time order
+    there and a fingerprint of up to ``samples`` rows spread over the stored
+    range (timestamp, temperature, humidity) matches the stored readings;
+    otherwise the whole file is imported (duplicates are still skipped by the
+    merge).
+    """
+    stored = conn.execute(
+        'SELECT min("timestamp"), max("timestamp") FROM sensor_data WHERE "sensorId" = %s', (sensor_id,)
+    ).fetchone()
+
+    def start(timestamps: np.ndarray, readings) -> int:
+        if stored[1] is None:
+            return 0
+        ts = timestamps.astype('datetime64[ns]', copy=False)
+        valid = ~np.isnat(ts)
+        # Mesma truncagem para milissegundos usada na gravação
+        ms = ts.view(np.int64) // NS_PER_MS
+        lo, hi = (int(np.datetime64(v, 'ms').astype(np.int64)) for v in stored)
+        old = valid & (ms <= hi)
+        if not old.any():
+            return 0
+        first_new = int(np.flatnonzero(old)[-1]) + 1
+        if (valid[:first_new] & (ms[:first_new] > hi)).any():
+            event('append', first_new=0, reason='file not in time order')
+            return 0
+        candidates = np.flatnonzero(old & (ms >= lo))
+        if not len(candidates):
+            event('append', first_new=0, reason='no rows inside the stored range')
+            return 0
+        pick = np.unique(candidates[np.linspace(0, len(candidates) - 1, min(samples, len(candidates))).astype(int)])
+        temperature, humidity = readings(pick)
+        # Linhas que a validação recusaria nunca foram gravadas: ficam fora da comparação
+        with np.errstate(invalid='ignore'):
+            keep = (temperature >= TEMP_MIN) & (temperature <= TEMP_MAX)
+        if not keep.any():
+            event('append', first_new=0, reason='no valid sample rows')
+            return 0
+        when = ms[pick][keep].astype('datetime64[ms]').astype(object).tolist()
+        found = {}
+        for t, temp, hum in conn.execute(
+            'SELECT "timestamp", temperature, humidity FROM sensor_data WHERE "sensorId" = %s AND "timestamp" = ANY(%s)',
+            (sensor_id, when),
+        ):
+            found.setdefault(t, set()).add((temp, hum))
+        expected = zip(when, temperature[keep].tolist(), humidity[keep].tolist())
+        matched = all((temp, None if hum != hum else hum) in found.get(t, ()) for t, temp, hum in expected)
+        event('append', first_new=first_new if matched else 0, samples=int(keep.sum()), matched=matched)
+        return first_new if matched else 0
+
+    return start
+
+
+def load_rows(conn, stream: Iterable[RowBatch], target: SinkTarget, progress=None,
+              checkpoint: Optional[Checkpoint] = None) -> dict:
+    """COPY the batches into a staging table and merge them into ``sensor_data`` on
+    ``conn``; returns the summary.
+
+    Without ``checkpoint`` everything is one transaction. With it, a chunk is
+    committed every ``checkpoint.every`` rows together with the checkpoint, and
+    the stream must start at or after ``checkpoint.last_row`` (see
+    ``ParseOptions.skip_rows``); ``inserted``/``duplicates``/``failed`` then
+    include the earlier attempts. Row numbers start after the stream's
+    ``start``. ``progress(rows)`` is called after each batch.
+    """
+    psycopg = require_psycopg()
+    t0 = time.monotonic()
+    resumed = checkpoint.last_row if checkpoint else 0
+    first = getattr(stream, 'start', 0)
+    summary = {'rows': first, **(checkpoint.totals if checkpoint else {'inserted': 0, 'duplicates': 0, 'failed': 0}),
+               'noTimestamp': 0, 'badTemperature': 0, 'unknownSensor': 0}
+    if resumed:
+        summary['resumedFrom'] = resumed
+    if first > resumed:
+        summary['appendSkipped'] = first - resumed
+    sensors: dict = {}
+    batches = iter(stream)
+    exhausted = False
+    try:
+        while not exhausted:
+            with conn.transaction(), conn.cursor() as cur:
+                cur.execute(STAGE_DDL)
+                chunk_start, staged, chunk_failed = summary['rows'], 0, 0
+                with cur.copy(STAGE_COPY) as copy:
+                    for batch in batches:
+                        mask, no_ts, bad_temp = accepted_rows(batch)
+                        copy.write(copy_lines(batch, mask, summary['rows'] + 1, target, sensors))
+                        summary['rows'] += len(batch)
+                        summary['noTimestamp'] += no_ts
+                        summary['badTemperature'] += bad_temp
+                        chunk_failed += no_ts + bad_temp
+                        staged += int(mask.sum())
+                        if progress:
+                            progress(summary['rows'])
+                        if checkpoint and summary['rows'] - chunk_start >= checkpoint.every:
+                            break
+                    else:
+                        exhausted = True
+                event('counts', staged=staged)
+                # Tabela temporária não tem estatísticas: sem ANALYZE o planejador erra o anti-join
+                cur.execute('ANALYZE qtparser_stage')
+                cur.execute(UNKNOWN_SENSORS)
+                unknown = cur.fetchone()[0]
+                cur.execute(MERGE, {'file_name': target.file_name, 'validation_id': target.validation_id,
+                                    'parser_version': __version__})
+                summary['unknownSensor'] += unknown
+                summary['inserted'] += cur.rowcount
+                summary['duplicates'] += staged - unknown - cur.rowcount
+                summary['failed'] += chunk_failed + unknown
+                if checkpoint:
+                    totals = {k: summary[k] for k in ('inserted', 'duplicates', 'failed')}
+                    checkpoint.save(cur, summary['rows'], totals, exhausted)
+            if checkpoint:
+                event('checkpoint', last_row=summary['rows'], completed=exhausted)
+    except psycopg.Error as e:
+        raise ParseError(f'Database error: {e}', code=7)
+    summary['ms'] = int((time.monotonic() - t0) * 1000)
+    return summary
+
+
+def import_path(conn, path: str, options, target: SinkTarget, progress=None,
+                checkpoint_rows: int = CHECKPOINT_ROWS) -> dict:
+    """Parse ``path`` and load it on ``conn``, resuming from its checkpoint.
+
+    A file already completed with the same options is not parsed again.
+    ``checkpoint_rows=0`` disables checkpoints (one transaction, no resume).
+    With ``target.append`` the rows the sensor already has are not parsed
+    further nor sent (see :func:`overlap_start`). With ``target.storage =
+    'blocks'`` the rows go to day blocks (:func:`qtparser.blocks.load_blocks`),
+    committed in the same chunks. With
+    ``target.archive`` the accepted rows are also written to the Parquet
+    archive (:mod:`qtparser.archive`) once the load succeeds. With
+    ``target.rejects`` the refused rows go to a sidecar (:mod:`qtparser.rejects`).
+    ``progress(rows, total)`` is called after each batch.
+    """
+    from . import api
+    psycopg = require_psycopg()
+    if target.rejects:
+        options = replace(options, keep_source=True)
+    if target.storage == 'blocks':
+        from .blocks import load_blocks as load
+    else:
+        load = load_rows
+    try:
+        start = overlap_start(conn, target.sensor_id) if target.append and target.sensor_id else None
+        file_hash = file_sha256(path) if checkpoint_rows > 0 or target.archive else None
+        if checkpoint_rows <= 0:
+            return _load(load, conn, api.parse(path, options, start), target, progress, None, file_hash)
+        checkpoint = Checkpoint(file_hash, target.file_name, checkpoint_options(options, target), checkpoint_rows)
+        checkpoint.load(conn)
+    except psycopg.Error as e:
+        raise ParseError(f'Database error: {e}', code=7)
+    if checkpoint.completed:
+        debug(f"Import already completed: {target.file_name} ({checkpoint.last_row} rows)")
+        event('checkpoint', last_row=checkpoint.last_row, completed=True, skipped=True)
+        return {'rows': checkpoint.last_row, **checkpoint.totals, 'noTimestamp': 0, 'badTemperature': 0,
+                'unknownSensor': 0, 'resumedFrom': checkpoint.last_row, 'skipped': True, 'ms': 0}
+    if checkpoint.last_row:
+        debug(f"Resuming import of {target.file_name} after row {checkpoint.last_row}")
+    try:
+        stream = api.parse(path, replace(options, skip_rows=checkpoint.last_row), start)
+    except psycopg.Error as e:
+        raise ParseError(f'Database error: {e}', code=7)
+    return _load(load, conn, stream, target, progress, checkpoint, file_hash)
+
+
+def _load(load, conn, stream, target: SinkTarget, progress, checkpoint: Optional[Checkpoint], file_hash) -> dict:
+    # O total do stream conta só as linhas restantes
+    total = None if stream.total is None else stream.total + stream.start
+    tap = rejects = None
+    if target.archive:
+        from .archive import ArchiveTap, require_pyarrow
+        require_pyarrow()
+        tap = ArchiveTap(stream, target)
+    batches = tap or stream
+    if target.rejects:
+        from .rejects import RejectsTap, RejectsWriter
+        rejects = RejectsWriter(target.rejects, stream.source, target.rejects_limit)
+        batches = RejectsTap(batches, rejects)
+    resumed = checkpoint.last_row if checkpoint else 0
+    summary = load(conn, batches, target, progress and (lambda rows: progress(rows, total)), checkpoint)
+    if rejects is not None:
+        summary['rejects'] = rejects.close()
+        event('rejects', **summary['rejects'])
+    if tap is not None:
+        if resumed:
+            # As linhas anteriores vieram de outra tentativa: o export mensal cobre o arquivo
+            warning(f'Archive skipped for resumed import of {target.file_name}')
+        else:
+            summary['archived'] = tap.write(target.archive, file_hash[:16])
+    return summary
+
+
+def write_postgres(path: str, options, target: SinkTarget, progress=None, checkpoint_rows: int = CHECKPOINT_ROWS) -> dict:
+    """:func:`import_path` on a new connection to ``target.dsn``."""
+    with connect(target.dsn) as conn:
+        return import_path(conn, path, options, target, progress, checkpoint_rows)
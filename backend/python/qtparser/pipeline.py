@@ -0,0 +1,93 @@
+"""Overlap parsing with output: batches are produced on a worker thread."""
+import os
+import queue
+import threading
+from typing import Iterable, Iterator, Optional
+
+from .batch import RowBatch
+from .logs import advance
+
+_DONE = object()
+
+
+class BatchStream:
+    """Iterator of :class:`RowBatch` that also knows how many rows to expect.
+
+    ``total`` is None when the row count is only known at the end (e.g. the
+    long multi-channel format drops empty probe readings). ``start`` is the
+    number of leading rows that were skipped. ``source`` gives access to the
+    sheet cells (:class:`qtparser.rejects.SourceRows`) when
+    ``ParseOptions.keep_source`` is set, None otherwise.
+    """
+
+    def __init__(self, batches: Iterable[RowBatch], total: Optional[int] = None, start: int = 0, source=None):
+        self._it = iter(batches)
+        self.total = total
+        self.start = start
+        self.source = source
+
+    def __iter__(self) -> 'BatchStream':
+        return self
+
+    def __next__(self) -> RowBatch:
+        batch = next(self._it)
+        # Progresso dos heartbeats: conta o que o consumidor recebeu, não o que foi preparado
+        advance(len(batch))
+        return batch
+
+
+def available_cpus() -> int:
+    """Cores this process may run on (honours CPU affinity / container cpusets)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def prefetch(batches: Iterable[RowBatch], depth: int) -> Iterator[RowBatch]:
+    """Run ``batches`` on a worker thread, keeping at most ``depth`` batches queued.
+
+    The bounded queue keeps memory flat when the consumer (stdout pipe, and
+    the database behind it) is slower than the parser. Exceptions raised by
+    the producer are re-raised in the consumer. ``depth <= 0`` disables the
+    thread.
+    """
+    if depth <= 0:
+        yield from batches
+        return
+    q: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker():
+        try:
+            for batch in batches:
+                if not put(batch):
+                    return
+        except BaseException as e:  # repassar ao consumidor
+            put(e)
+            return
+        put(_DONE)
+
+    t = threading.Thread(target=worker, name='qtparser-prefetch', daemon=True)
+    t.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # Consumidor parou antes do fim (erro de escrita, pipe fechado): liberar o worker
+        stop.set()
+        t.join(timeout=1)
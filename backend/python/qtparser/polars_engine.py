@@ -0,0 +1,191 @@
+"""Optional Polars engine (``ParseOptions.engine = 'polars'``, ``--engine polars``).
+
+Works on the sheets already read by pandas (so every cell is converted exactly
+as in the pandas pipeline) and runs column classification, timestamp parsing
+and numeric cleanup as one Polars lazy query: every explicit timestamp format
+and both numeric columns are evaluated in parallel instead of one full-column
+pandas pass each.
+
+Like the lean decoder it only accepts sheets whose outcome it can reproduce
+exactly: one timestamp column where a single explicit format parses every
+value, one temperature column and at most one humidity column, and no other
+sheet that could win the sheet choice. Rows left without a timestamp would go
+through the per-row rescue, so those sheets (and anything needing format
+inference) raise :class:`PolarsUnsupported` and the pandas engine takes over
+with the same sheets. polars is optional; without it the pandas engine is used.
+
+Scope: this is a fast path for plain sheets, not a second pipeline. Column
+classification by content, format inference and the per-row timestamp rescue
+exist only in :mod:`qtparser.engine`; the ``strategy`` event (and
+``python -m qtparser.compare``, with its ``fallback`` reason) tells which
+engine decoded each file and why.
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .batch import RowBatch
+from .columns import build_rename_map
+from .detect import as_text
+from .lean import DATETIME_FORMATS, HEADER_SCAN_ROWS, TIME_COL_FORMATS
+from .logs import debug, event, stage, warning
+from .options import ParseOptions
+
+NUM_PATTERN = r'([-+]?[0-9]*\.?[0-9]+)'
+
+
+class PolarsUnsupported(Exception):
+    """The sheets need the pandas engine."""
+
+
+def column_mapping(columns) -> dict:
+    """{canonical name: [positions]} for a sheet's column labels."""
+    rename_map = build_rename_map(columns)
+    mapping = {}
+    for pos, label in enumerate(columns):
+        canon = rename_map.get(label)
+        if canon:
+            mapping.setdefault(canon, []).append(pos)
+    return mapping
+
+
+def mentions_temperature(df: pd.DataFrame) -> bool:
+    """Whether a header (or a row header autodetect could promote) maps to temperature."""
+    if any('temper' in str(c).strip().lower() for c in df.columns):
+        return True
+    head = df.head(HEADER_SCAN_ROWS)
+    return any('temper' in str(v).strip().lower() for v in head.to_numpy().ravel().tolist() if not pd.isna(v))
+
+
+def timestamp_expr(pl, name: str, fmt: str, rx):
+    # Mesma regex estrita do decodificador enxuto (dígitos ASCII, como o strptime do pandas)
+    pattern = '^' + rx.pattern.replace(r'\d', '[0-9]') + '$'
+    col = pl.col(name)
+    return pl.when(col.str.contains(pattern)).then(col.str.strptime(pl.Datetime('ns'), fmt, strict=False))
+
+
+def numeric_expr(pl, name: str):
+    """Same as detect.to_numeric_clean on a text column."""
+    return (
+        pl.col(name).str.replace_all(',', '.', literal=True)
+        .str.extract(NUM_PATTERN, 1)
+        .cast(pl.Float64, strict=False)
+    )
+
+
+def try_polars_decode(sheets: dict, options: ParseOptions) -> Optional[tuple]:
+    """Decode ``sheets`` with Polars: ``(batch, rows)`` or None when the pandas
+    engine is needed (``rows`` as in :func:`qtparser.lean.try_lean_decode`)."""
+    if options.engine != 'polars':
+        return None
+    try:
+        import polars as pl
+    except ImportError:
+        warning('Polars engine requested but polars is not installed; using pandas')
+        event('strategy', decoder='full', reason='polars not installed')
+        return None
+    try:
+        with stage('polars'):
+            batch, sheet = _decode(pl, sheets)
+    except PolarsUnsupported as e:
+        debug(f"Polars engine skipped: {e}")
+        event('strategy', decoder='full', reason=str(e))
+        return None
+    debug(f"Polars engine used: sheet={sheet} rows={len(batch)}")
+    event('strategy', decoder='polars', sheet=sheet, rows=len(batch))
+    if not options.keep_source:
+        return batch, None
+    from .rejects import SourceRows
+    df = sheets[sheet]
+    return batch, SourceRows('polars', sheet, list(df.columns), lambda i: df.iloc[i].tolist())
+
+
+def fallback_reason(sheets: dict) -> Optional[str]:
+    """Why the pandas engine would decode ``sheets`` (None when Polars does)."""
+    try:
+        import polars as pl
+    except ImportError:
+        return 'polars not installed'
+    try:
+        _decode(pl, sheets)
+    except PolarsUnsupported as e:
+        return str(e)
+    return None
+
+
+def _decode(pl, sheets: dict):
+    candidates = []
+    for name, df in sheets.items():
+        mapping = column_mapping(list(df.columns))
+        if 'temperature' in mapping and ('datetime' in mapping or 'time' in mapping):
+            candidates.append((name, df, mapping))
+    if not candidates:
+        raise PolarsUnsupported('no candidate sheet')
+    # A maior candidata; as outras só são aceitas se não puderem vencer (ver abaixo)
+    name, df, mapping = max(candidates, key=lambda c: len(c[1]))
+
+    if len(mapping['temperature']) > 1 or len(mapping.get('humidity', [])) > 1:
+        raise PolarsUnsupported('multi-probe sheet')
+    if 'datetime' in mapping:
+        if len(mapping['datetime']) > 1:
+            raise PolarsUnsupported('duplicated datetime columns')
+        if 'time' in mapping:
+            # O fastpath forçado de 'Lista' poderia trocar pelos valores de 'time'
+            raise PolarsUnsupported('both datetime and time columns')
+        ts_pos, formats = mapping['datetime'][0], DATETIME_FORMATS
+    elif 'date' in mapping:
+        raise PolarsUnsupported('date column needs dayfirst inference')
+    else:
+        if len(mapping['time']) > 1:
+            raise PolarsUnsupported('duplicated time columns')
+        ts_pos, formats = mapping['time'][0], TIME_COL_FORMATS
+
+    raw_ts = df.iloc[:, ts_pos]
+    if pd.api.types.is_numeric_dtype(raw_ts):
+        raise PolarsUnsupported('Excel serial timestamps')
+    numeric = {'temperature': df.iloc[:, mapping['temperature'][0]]}
+    if 'humidity' in mapping:
+        numeric['humidity'] = df.iloc[:, mapping['humidity'][0]]
+    if any(pd.api.types.is_bool_dtype(col) for col in numeric.values()):
+        raise PolarsUnsupported('boolean numeric column')
+
+    # Uma única consulta: todos os formatos de timestamp e as colunas numéricas em paralelo
+    frame = {'ts': pl.from_pandas(as_text(raw_ts))}
+    exprs = [timestamp_expr(pl, 'ts', fmt, rx).alias(f'ts{i}') for i, (fmt, rx) in enumerate(formats)]
+    for key, col in numeric.items():
+        if pd.api.types.is_numeric_dtype(col):
+            frame[key] = pl.Series(col.to_numpy(dtype=float), nan_to_null=False)
+            exprs.append(pl.col(key))
+        else:
+            frame[key] = pl.from_pandas(as_text(col))
+            exprs.append(numeric_expr(pl, key).alias(key))
+    out = pl.DataFrame(frame).lazy().select(exprs).collect()
+
+    # parse_with_formats fica com o formato de maior contagem; aqui só vale cobertura total
+    expected = int(raw_ts.notna().sum())
+    if expected == 0:
+        raise PolarsUnsupported('no timestamps')
+    chosen = next((i for i in range(len(formats)) if out[f'ts{i}'].count() == expected), None)
+    if chosen is None:
+        raise PolarsUnsupported('timestamps need inference')
+    if str(name).lower() == 'lista':
+        # Os fastpaths de 'Lista' varrem outras colunas; só aceitar quando nenhuma pode vencer
+        if 'time' not in mapping or int(df.notna().sum().max()) > expected:
+            raise PolarsUnsupported('Lista fastpaths may pick another column')
+    # Linhas com conteúdo e sem timestamp passariam pelo resgate linha a linha
+    if (raw_ts.isna() & df.notna().any(axis=1)).any():
+        raise PolarsUnsupported('rows without timestamp')
+
+    temperature = out['temperature'].to_numpy().astype(float)
+    readings = int(np.isfinite(temperature).sum())
+    if readings == 0:
+        raise PolarsUnsupported('no temperature values')
+    # Outra planilha só pode vencer se tiver temperaturas e linhas suficientes (len + 1 com autodetect)
+    for other, odf in sheets.items():
+        if other != name and len(odf) + 1 >= readings and mentions_temperature(odf):
+            raise PolarsUnsupported(f'sheet {other!r} may compete')
+
+    humidity = out['humidity'].to_numpy().astype(float) if 'humidity' in numeric else np.full(len(df), np.nan)
+    timestamp = out[f'ts{chosen}'].to_numpy().astype('datetime64[ns]')
+    return RowBatch(timestamp, temperature, humidity), name
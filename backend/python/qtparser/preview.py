@@ -0,0 +1,167 @@
+"""Fast scan/preview: answer sheet/columns/rows/time range from a small sample."""
+from collections import deque
+from itertools import islice
+
+import pandas as pd
+
+from .columns import build_rename_map, find_header_row
+from .detect import parse_datetime_columns, to_numeric_clean, unify_same_named_columns
+from .emit import iso_z
+from .errors import ParseError
+from .options import ParseOptions
+from .source import WorkbookSource, xlsx_rows
+
+SCAN_HEAD_ROWS = 200
+SCAN_TAIL_ROWS = 50
+SCAN_PREVIEW_ROWS = 5
+
+
+def ts_to_iso_z(ts_val):
+    if ts_val is None or pd.isna(ts_val):
+        return None
+    ts = pd.Timestamp(ts_val)
+    ts = ts.tz_localize('UTC') if ts.tz is None else ts.tz_convert('UTC')
+    return iso_z(ts.value)
+
+
+def read_sheet_samples(source: WorkbookSource, sheet_name=None) -> dict:
+    """Read only a head/tail sample of each sheet.
+
+    Returns {sheet: (row_count, head_rows, tail_rows)} where rows are lists of
+    cell values (header included in head_rows). XLSX sheets are streamed to
+    the end (their declared dimension is not trusted), keeping only the head
+    and the last SCAN_TAIL_ROWS rows.
+    """
+    samples = {}
+    if source.legacy:
+        import xlrd
+        if source.path is not None:
+            book = xlrd.open_workbook(source.path, on_demand=True)
+        else:
+            book = xlrd.open_workbook(file_contents=source.data, on_demand=True)
+        try:
+            for nm in ([sheet_name] if sheet_name else book.sheet_names()):
+                sh = book.sheet_by_name(nm)
+
+                def row_values(i):
+                    out = []
+                    for c in sh.row(i):
+                        if c.ctype == xlrd.XL_CELL_DATE:
+                            out.append(xlrd.xldate_as_datetime(c.value, book.datemode))
+                        elif c.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+                            out.append(None)
+                        else:
+                            out.append(c.value)
+                    return out
+
+                head = [row_values(i) for i in range(min(sh.nrows, SCAN_HEAD_ROWS + 1))]
+                tail = [row_values(i) for i in range(max(len(head), sh.nrows - SCAN_TAIL_ROWS), sh.nrows)]
+                samples[nm] = (sh.nrows, head, tail)
+                book.unload_sheet(nm)
+        finally:
+            book.release_resources()
+    else:
+        with source.xlsx_workbook() as wb:
+            for nm in ([sheet_name] if sheet_name else wb.sheetnames):
+                rows = xlsx_rows(wb[nm])
+                head = [list(r) for r in islice(rows, SCAN_HEAD_ROWS + 1)]
+                tail = deque(maxlen=SCAN_TAIL_ROWS)
+                count = len(head)
+                for r in rows:
+                    tail.append(r)
+                    count += 1
+                # O read_excel descarta as linhas vazias do fim da planilha
+                while tail and all(v is None for v in tail[-1]):
+                    tail.pop()
+                    count -= 1
+                samples[nm] = (count, head, [list(r) for r in tail])
+    return samples
+
+
+def sample_frame(rows, header_idx: int) -> pd.DataFrame:
+    width = max((len(r) for r in rows), default=0)
+    padded = [list(r) + [None] * (width - len(r)) for r in rows]
+    cols = [
+        str(v).strip() if v is not None and str(v).strip() != '' else f'Unnamed: {i}'
+        for i, v in enumerate(padded[header_idx])
+    ] if padded else []
+    return pd.DataFrame(padded[header_idx + 1:], columns=cols)
+
+
+def scan_sheet(head, tail):
+    """Run the column heuristics on a sample; returns a summary dict."""
+    best = None
+    candidates = [0]
+    auto_idx = find_header_row(head[:50])
+    if auto_idx not in (None, 0):
+        candidates.append(auto_idx)
+    for header_idx in candidates:
+        if len(head) <= header_idx:
+            continue
+        dfs = sample_frame(head + tail, header_idx)
+        n_head = len(head) - header_idx - 1
+        rename_map = build_rename_map(dfs.columns)
+        df1 = dfs.rename(columns=rename_map) if rename_map else dfs
+        ts = parse_datetime_columns(df1).reset_index(drop=True)
+        temp = unify_same_named_columns(df1, 'temperature')
+        hum = unify_same_named_columns(df1, 'humidity')
+        temp = to_numeric_clean(temp).reset_index(drop=True) if temp is not None else None
+        hum = to_numeric_clean(hum).reset_index(drop=True) if hum is not None else None
+        score = (int(temp.notna().sum()) if temp is not None else 0, int(ts.notna().sum()))
+        if best is None or score > best['score']:
+            best = {
+                'score': score, 'header_idx': header_idx, 'n_head': n_head,
+                'columns': list(dfs.columns), 'mapping': {str(k): v for k, v in rename_map.items()},
+                'ts': ts, 'temp': temp, 'hum': hum,
+            }
+    return best
+
+
+def scan_workbook(source: WorkbookSource, options: ParseOptions) -> dict:
+    try:
+        samples = read_sheet_samples(source, options.sheet_name)
+    except Exception as e:
+        raise ParseError(f"Read error: {e}", code=3)
+    chosen = None
+    chosen_name = None
+    for nm, (row_count, head, tail) in samples.items():
+        res = scan_sheet(head, tail)
+        if res is None:
+            continue
+        res['row_count'] = row_count
+        if chosen is None or res['score'] > chosen['score']:
+            chosen, chosen_name = res, nm
+    if chosen is None:
+        raise ParseError('No sheets found', code=4)
+
+    ts = chosen['ts']
+    head_ts = ts.iloc[:chosen['n_head']].dropna()
+    diffs = head_ts.diff().dropna().abs()
+    interval = diffs.median().total_seconds() if not diffs.empty else None
+    rows = chosen['row_count'] - chosen['header_idx'] - 1
+    # Cabeça e cauda lidas: o intervalo de tempo vem das duas pontas da planilha
+    valid = ts.dropna()
+    start = valid.min() if not valid.empty else None
+    end = valid.max() if not valid.empty else None
+
+    preview = []
+    for i in range(min(SCAN_PREVIEW_ROWS, chosen['n_head'])):
+        t = chosen['temp'].iloc[i] if chosen['temp'] is not None else None
+        h = chosen['hum'].iloc[i] if chosen['hum'] is not None else None
+        preview.append({
+            'timestamp': ts_to_iso_z(ts.iloc[i]),
+            'temperature': float(t) if pd.notna(t) else None,
+            'humidity': float(h) if pd.notna(h) else None,
+        })
+
+    return {
+        'sheet': chosen_name,
+        'sheets': list(samples.keys()),
+        'headerRow': chosen['header_idx'],
+        'columns': chosen['columns'],
+        'mapping': chosen['mapping'],
+        'rowCount': rows,
+        'timeRange': {'start': ts_to_iso_z(start), 'end': ts_to_iso_z(end), 'estimated': False},
+        'intervalSeconds': interval,
+        'preview': preview,
+    }
@@ -0,0 +1,154 @@
+"""Rejected-row sidecar (``--rejects PATH``), written during the parse itself.
+
+For each row the validation refuses (see :mod:`qtparser.validity`), the
+sidecar keeps its rowNumber, its position in the decoded sheet, the raw cell
+values the decoder read, the decoder that produced it and the rejection
+reason. The cells come from the sheet already in memory, so diagnosing a
+bad file needs no second read. The sidecar is capped at ``limit`` rows and
+written as NDJSON, or as Parquet (needs pyarrow) when the path ends in
+``.parquet``.
+
+Multi-channel output has no one-to-one source row: its records carry the
+reason and parsed values only (``sourceRow`` and ``raw`` are null).
+"""
+import json
+import math
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from typing import Callable, Optional
+
+import numpy as np
+
+from .batch import RowBatch
+from .emit import iso_z
+from .errors import ParseError
+from .options import REJECTS_LIMIT
+from .validity import DEFAULT_LIMITS, NO_TIMESTAMP, REASONS, Limits, check
+
+
+@dataclass
+class SourceRows:
+    """Cells of the decoded sheet, kept for the sidecar (``ParseOptions.keep_source``).
+
+    ``cells(i)`` returns the values of data row ``i`` (header excluded), in the
+    order of ``columns``. ``rescue`` tells that rows still without timestamp
+    went through the per-row rescue of the full pipeline.
+    """
+    strategy: str
+    sheet: str
+    columns: list
+    cells: Callable[[int], list]
+    rescue: bool = False
+
+
+def cell_text(v) -> Optional[str]:
+    """Raw cell value as text (None for empty cells)."""
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        return None
+    if isinstance(v, (datetime, date, time)):
+        return v.isoformat()
+    if isinstance(v, np.datetime64):
+        return None if np.isnat(v) else str(v)
+    text = str(v)
+    return None if text in ('NaT', 'nan') else text
+
+
+def _number(v: float) -> Optional[float]:
+    return None if math.isnan(v) else v
+
+
+class RejectsWriter:
+    """Collects up to ``limit`` rejected rows and writes them to ``path``."""
+
+    def __init__(self, path: str, source: Optional[SourceRows], limit: int = REJECTS_LIMIT):
+        self.path = path
+        self.source = source
+        self.limit = limit
+        self.parquet = path.lower().endswith('.parquet')
+        self.rejected = 0
+        self.records = []
+        if self.parquet:
+            from .arrow_ipc import require_pyarrow
+            require_pyarrow()
+        self._labels = [str(c) for c in source.columns] if source is not None else None
+
+    def add(self, batch: RowBatch, codes: np.ndarray, first_row: int) -> None:
+        """Record the rejected rows of ``batch``; ``first_row`` is the 0-based
+        output position of its first row (rowNumber - 1)."""
+        bad = np.flatnonzero(codes)
+        self.rejected += len(bad)
+        room = self.limit - len(self.records)
+        if room <= 0 or not len(bad):
+            return
+        ts = batch.timestamp.astype('datetime64[ns]', copy=False)
+        source = self.source if batch.channel is None else None
+        for i in bad[:room].tolist():
+            code = int(codes[i])
+            pos = first_row + i
+            strategy = source.strategy if source is not None else None
+            if source is not None and source.rescue and code == NO_TIMESTAMP:
+                strategy += '+rescue'
+            self.records.append({
+                'row': pos + 1,
+                'sourceRow': pos if source is not None else None,
+                'sheet': source.sheet if source is not None else None,
+                'strategy': strategy,
+                'reason': REASONS[code],
+                'raw': dict(zip(self._labels, map(cell_text, source.cells(pos)))) if source is not None else None,
+                'timestamp': None if np.isnat(ts[i]) else iso_z(ts[i].view(np.int64)),
+                'temperature': _number(float(batch.temperature[i])),
+                'humidity': _number(float(batch.humidity[i])),
+                'channel': None if batch.channel is None else str(batch.channel[i]),
+            })
+
+    def close(self) -> dict:
+        """Write the sidecar; returns ``{"path", "rows", "rejected"}``."""
+        tmp = os.path.join(os.path.dirname(self.path) or '.', f'.{os.path.basename(self.path)}.tmp')
+        try:
+            if self.parquet:
+                self._write_parquet(tmp)
+            else:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    f.writelines(json.dumps(r, ensure_ascii=False) + '\n' for r in self.records)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            raise ParseError(f'Rejects write error: {e}', code=3)
+        return {'path': self.path, 'rows': len(self.records), 'rejected': self.rejected}
+
+    def _write_parquet(self, path: str) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = pa.schema([
+            ('row', pa.int64()),
+            ('sourceRow', pa.int64()),
+            ('sheet', pa.string()),
+            ('strategy', pa.string()),
+            ('reason', pa.string()),
+            ('raw', pa.map_(pa.string(), pa.string())),
+            ('timestamp', pa.string()),
+            ('temperature', pa.float64()),
+            ('humidity', pa.float64()),
+            ('channel', pa.string()),
+        ])
+        rows = [{**r, 'raw': None if r['raw'] is None else list(r['raw'].items())} for r in self.records]
+        pq.write_table(pa.Table.from_pylist(rows, schema=schema), path, compression='zstd')
+
+
+class RejectsTap:
+    """Stream wrapper that feeds the rejected rows of each batch to a
+    :class:`RejectsWriter` and passes every batch on unchanged."""
+
+    def __init__(self, stream, writer: RejectsWriter, limits: Limits = DEFAULT_LIMITS):
+        self._stream = stream
+        self._writer = writer
+        self._limits = limits
+        self.start = getattr(stream, 'start', 0)
+        self.total = getattr(stream, 'total', None)
+
+    def __iter__(self):
+        row = self.start
+        for batch in self._stream:
+            self._writer.add(batch, check(batch, self._limits), row)
+            row += len(batch)
+            yield batch
@@ -0,0 +1,196 @@
+"""Row-range sharding of column conversions across worker processes.
+
+For sheets with at least ``ParseOptions.shard_min_rows`` rows, the row-local
+conversions (timestamp parsing with explicit formats, numeric cleanup) are
+split into contiguous row ranges. The column text is copied once into a
+``multiprocessing.shared_memory`` block (UTF-8, NUL-separated per range), and
+workers write their results straight into shared int64/float64 arrays, so
+columns are never pickled. Ranges are merged back in row order and the result
+is the same as converting the whole column in one process.
+
+Format inference (``dayfirst`` detection, ``pd.to_datetime`` without a
+format) looks at the whole column and is never sharded.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .pipeline import available_cpus
+
+SEP = '\x00'
+
+_pools: dict = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    # Um pool por tamanho, criado na primeira planilha grande e reaproveitado depois
+    with _pools_lock:
+        if workers not in _pools:
+            # spawn: o processo pai já tem threads (prefetch, heartbeat, pontuação de planilhas)
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pools[workers]
+
+
+class _SharedText:
+    """NUL-joined UTF-8 text of a column, one segment per row range."""
+
+    def __init__(self, values: pd.Series, ranges: List[Tuple[int, int]]):
+        arr = values.to_numpy(dtype=object, na_value='')
+        chunks = []
+        for a, b in ranges:
+            text = SEP.join(arr[a:b].tolist())
+            if text.count(SEP) != b - a - 1:
+                # Um NUL dentro de algum valor quebraria a separação das linhas
+                raise ValueError('NUL in column text')
+            chunks.append(text.encode('utf-8'))
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, sum(len(c) for c in chunks)))
+        self.spans = []
+        pos = 0
+        for c in chunks:
+            self.shm.buf[pos:pos + len(c)] = c
+            self.spans.append((pos, pos + len(c)))
+            pos += len(c)
+
+    def close(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+
+class _SharedArray:
+    def __init__(self, n: int, dtype):
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, n * np.dtype(dtype).itemsize))
+        self.array = np.ndarray(n, dtype=dtype, buffer=self.shm.buf)
+
+    def take(self) -> np.ndarray:
+        out = self.array.copy()
+        del self.array
+        self.shm.close()
+        self.shm.unlink()
+        return out
+
+
+def _read_segment(name: str, span: Tuple[int, int]) -> pd.Series:
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return pd.Series(bytes(shm.buf[span[0]:span[1]]).decode('utf-8').split(SEP))
+    finally:
+        shm.close()
+
+
+def _write_segment(name: str, dtype, row0: int, values: np.ndarray) -> None:
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        out = np.ndarray(len(values), dtype=dtype, buffer=shm.buf, offset=row0 * np.dtype(dtype).itemsize)
+        out[:] = values
+        del out
+    finally:
+        shm.close()
+
+
+def _datetime_range(text: str, span, out: str, row0: int, formats: Sequence[str]):
+    """Worker: try every format on one range and write the best one to ``out``.
+
+    Returns the count per format (None when the format raised) and the index
+    of the format written, or -1 when nothing parsed.
+    """
+    values = _read_segment(text, span)
+    counts: List[Optional[int]] = []
+    best, best_count, best_i = None, 0, -1
+    for i, fmt in enumerate(formats):
+        try:
+            candidate = pd.to_datetime(values, format=fmt, errors='coerce')
+        except Exception:
+            counts.append(None)
+            continue
+        cnt = int(candidate.notna().sum())
+        counts.append(cnt)
+        if cnt > best_count:
+            best, best_count, best_i = candidate, cnt, i
+    if best is None:
+        # Nenhum formato serviu nesta faixa: NaT
+        ints = np.full(len(values), np.iinfo(np.int64).min, dtype=np.int64)
+    else:
+        ints = best.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    _write_segment(out, np.int64, row0, ints)
+    return counts, best_i
+
+
+def _numeric_range(text: str, span, out: str, row0: int) -> None:
+    from .detect import to_numeric_clean
+    values = _read_segment(text, span)
+    _write_segment(out, np.float64, row0, to_numeric_clean(values).to_numpy(dtype=float))
+
+
+class Sharder:
+    """Runs row-local column conversions on ``workers`` processes for big columns."""
+
+    def __init__(self, workers: int = 0, min_rows: int = 200_000):
+        self.workers = workers or available_cpus()
+        self.min_rows = min_rows
+
+    def applies(self, n: int) -> bool:
+        return self.workers > 1 and n >= self.min_rows
+
+    def _ranges(self, n: int) -> List[Tuple[int, int]]:
+        edges = np.linspace(0, n, self.workers + 1).astype(int)
+        return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+    def parse_with_formats(self, values: pd.Series, formats: Sequence[str]) -> Optional[pd.Series]:
+        """Sharded :func:`qtparser.detect.parse_with_formats` (same result)."""
+        from .detect import parse_with_formats
+        ranges = self._ranges(len(values))
+        try:
+            text = _SharedText(values, ranges)
+        except ValueError:
+            return parse_with_formats(values, formats)
+        out = _SharedArray(len(values), np.int64)
+        try:
+            pool = _pool(self.workers)
+            jobs = [pool.submit(_datetime_range, text.shm.name, span, out.shm.name, a, list(formats))
+                    for (a, _), span in zip(ranges, text.spans)]
+            results = [j.result() for j in jobs]
+            # Mesmo critério do caminho serial: maior contagem total, primeiro formato em empate
+            best_i, best_count = -1, 0
+            for i in range(len(formats)):
+                per_range = [counts[i] for counts, _ in results]
+                if any(c is None for c in per_range):
+                    continue
+                if sum(per_range) > best_count:
+                    best_i, best_count = i, sum(per_range)
+            if best_i < 0:
+                return None
+            # Faixas em que outro formato ganhou localmente: refazer com o formato escolhido
+            redo = [pool.submit(_datetime_range, text.shm.name, span, out.shm.name, a, [formats[best_i]])
+                    for ((a, _), span), (_, local) in zip(zip(ranges, text.spans), results) if local != best_i]
+            for j in redo:
+                j.result()
+        finally:
+            text.close()
+            parsed = out.take()
+        return pd.Series(parsed.view('datetime64[ns]'), index=values.index)
+
+    def to_numeric_clean(self, col: pd.Series) -> pd.Series:
+        """Sharded :func:`qtparser.detect.to_numeric_clean` for text columns."""
+        from .detect import as_text, to_numeric_clean
+        ranges = self._ranges(len(col))
+        try:
+            text = _SharedText(as_text(col), ranges)
+        except ValueError:
+            return to_numeric_clean(col)
+        out = _SharedArray(len(col), np.float64)
+        try:
+            pool = _pool(self.workers)
+            jobs = [pool.submit(_numeric_range, text.shm.name, span, out.shm.name, a)
+                    for (a, _), span in zip(ranges, text.spans)]
+            for j in jobs:
+                j.result()
+        finally:
+            text.close()
+            values = out.take()
+        return pd.Series(values, index=col.index)
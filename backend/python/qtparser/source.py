@@ -0,0 +1,98 @@
+import io
+import os
+import warnings
+from contextlib import contextmanager
+from typing import Optional, Union
+
+from .errors import ParseError
+
+XLSX_MAGIC = b'PK\x03\x04'
+OLE2_MAGIC = b'\xd0\xcf\x11\xe0'
+
+SourceLike = Union[str, os.PathLike, bytes, bytearray, io.IOBase]
+
+
+class WorkbookSource:
+    """A workbook given as a path, raw bytes or a binary file object.
+
+    Buffers are kept in memory so the workbook can be re-read (header
+    autodetect reads a sheet a second time with ``header=None``).
+    """
+
+    def __init__(self, src: SourceLike):
+        self.path: Optional[str] = None
+        self.data: Optional[bytes] = None
+        if isinstance(src, (str, os.PathLike)):
+            self.path = os.fspath(src)
+            if not os.path.exists(self.path):
+                raise ParseError('File not found', code=2)
+            with open(self.path, 'rb') as f:
+                head = f.read(4)
+            ext = os.path.splitext(self.path)[1].lower()
+        else:
+            self.data = bytes(src) if isinstance(src, (bytes, bytearray)) else src.read()
+            head = self.data[:4]
+            ext = '.xls' if head == OLE2_MAGIC else '.xlsx'
+        self.name = os.path.basename(self.path) if self.path else '<buffer>'
+        self.size = os.path.getsize(self.path) if self.path else len(self.data)
+        # Arquivo .xls legítimo (não um XLSX renomeado) precisa do xlrd
+        self.legacy = ext == '.xls' and head != XLSX_MAGIC
+
+    @property
+    def engine(self) -> Optional[str]:
+        return 'xlrd' if self.legacy else None
+
+    def handle(self):
+        """Path or a fresh in-memory stream, suitable for pandas/xlrd/openpyxl."""
+        return self.path if self.path is not None else io.BytesIO(self.data)
+
+    @contextmanager
+    def xlsx_workbook(self):
+        """Read-only openpyxl workbook, opened from a file object.
+
+        openpyxl refuses paths ending in .xls, and Elitech exports are XLSX
+        files named ``.xls``; read the sheets with :func:`xlsx_rows`.
+        """
+        from openpyxl import load_workbook
+        stream = open(self.path, 'rb') if self.path is not None else io.BytesIO(self.data)
+        try:
+            with warnings.catch_warnings():
+                # "Workbook contains no default style": comum nas exportações dos loggers
+                warnings.simplefilter('ignore', UserWarning)
+                wb = load_workbook(stream, read_only=True, data_only=True)
+            try:
+                yield wb
+            finally:
+                wb.close()
+        finally:
+            stream.close()
+
+    def read_sheets(self, sheet_name: Optional[str] = None) -> dict:
+        import pandas as pd
+        # Preferir ler todas as planilhas quando nenhum sheet é explicitamente informado
+        try:
+            df_or = pd.read_excel(self.handle(), engine=self.engine, sheet_name=sheet_name)
+        except Exception as e:
+            raise ParseError(f"Read error: {e}", code=3)
+        if isinstance(df_or, dict):
+            return df_or
+        # Apenas uma planilha retornada
+        return {sheet_name or 'Sheet1': df_or}
+
+    def read_raw(self, sheet_name: str):
+        """Read a sheet without treating any row as header (None on failure)."""
+        import pandas as pd
+        try:
+            return pd.read_excel(self.handle(), sheet_name=sheet_name, header=None, engine=self.engine)
+        except Exception:
+            try:
+                return pd.read_excel(self.handle(), sheet_name=sheet_name, header=None)
+            except Exception:
+                return None
+
+
+def xlsx_rows(ws):
+    """Row values of a read-only sheet, ignoring the dimension the file declares
+    (the logger exports record ``A1:A1``, which would cut the sheet to one cell)."""
+    ws.reset_dimensions()
+    return ws.iter_rows(values_only=True)
@@ -0,0 +1,145 @@
+"""Row validity rules applied inside the parser (``--validate``).
+
+Same rules as ``pushRow`` in pythonFallbackService: a row needs a timestamp
+and a numeric temperature inside the limits; humidity that is not numeric is
+kept as null, and is rejected only when the sensor type sets a humidity range.
+The checks run as numpy masks over whole batches, so Node receives only the
+valid rows plus one ``{"validation": ...}`` summary with the rejection counts
+and a few sample rows.
+
+Rejected rows still take up their line number: a ``{"skip": n}`` record tells
+the reader that ``n`` rows were dropped at that point, so the rowNumber of
+every emitted row is the same as without ``--validate``.
+"""
+import json
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from .batch import RowBatch
+from .emit import iso_z, ndjson_lines
+from .errors import ParseError
+
+# Limites padrão de pushRow (tipos de sensor sem temperatureRange)
+TEMP_MIN = -80.0
+TEMP_MAX = 120.0
+# Amostras de linhas recusadas no resumo (failSamples do Node)
+SAMPLES = 5
+
+OK = 0
+NO_TIMESTAMP = 1
+BAD_TEMPERATURE = 2
+BAD_HUMIDITY = 3
+REASONS = {NO_TIMESTAMP: 'no-timestamp', BAD_TEMPERATURE: 'bad-temperature', BAD_HUMIDITY: 'bad-humidity'}
+
+
+@dataclass(frozen=True)
+class Limits:
+    temp_min: float = TEMP_MIN
+    temp_max: float = TEMP_MAX
+    hum_min: Optional[float] = None
+    hum_max: Optional[float] = None
+
+    @classmethod
+    def from_config(cls, text: Optional[str]) -> 'Limits':
+        """Limits from a SensorType.dataConfig JSON (``temperatureRange`` /
+        ``humidityRange`` with ``min``/``max``); missing keys keep the defaults."""
+        if not text:
+            return cls()
+        try:
+            config = json.loads(text)
+            temp = config.get('temperatureRange') or {}
+            hum = config.get('humidityRange') or {}
+            limits = cls(
+                float(temp.get('min', TEMP_MIN)), float(temp.get('max', TEMP_MAX)),
+                None if hum.get('min') is None else float(hum['min']),
+                None if hum.get('max') is None else float(hum['max']),
+            )
+        except (ValueError, TypeError, AttributeError):
+            raise ParseError('Invalid --limits JSON', code=1)
+        if limits.temp_min > limits.temp_max:
+            raise ParseError('Invalid --limits: temperatureRange min > max', code=1)
+        return limits
+
+
+DEFAULT_LIMITS = Limits()
+
+
+def check(batch: RowBatch, limits: Limits = DEFAULT_LIMITS) -> np.ndarray:
+    """Reason code of each row (``OK`` for valid rows), first failing rule wins."""
+    has_ts = ~np.isnat(batch.timestamp.astype('datetime64[ns]', copy=False))
+    with np.errstate(invalid='ignore'):
+        good_temp = (batch.temperature >= limits.temp_min) & (batch.temperature <= limits.temp_max)
+        # NaN passa: umidade ausente ou não numérica vira null, como no Node
+        bad_hum = np.zeros(len(batch), dtype=bool)
+        if limits.hum_min is not None:
+            bad_hum |= batch.humidity < limits.hum_min
+        if limits.hum_max is not None:
+            bad_hum |= batch.humidity > limits.hum_max
+    return np.select(
+        [~has_ts, ~good_temp, bad_hum],
+        [NO_TIMESTAMP, BAD_TEMPERATURE, BAD_HUMIDITY],
+        OK,
+    ).astype(np.uint8)
+
+
+def _number(v: float):
+    return None if math.isnan(v) else v
+
+
+class Tally:
+    """Rejection counts by reason and the first sample rows across batches."""
+
+    def __init__(self):
+        self.rows = 0
+        self.counts = np.zeros(len(REASONS) + 1, dtype=np.int64)
+        self.samples = []
+
+    def add(self, batch: RowBatch, codes: np.ndarray) -> None:
+        self.counts += np.bincount(codes, minlength=len(self.counts))
+        if len(self.samples) < SAMPLES:
+            for i in np.flatnonzero(codes)[:SAMPLES - len(self.samples)].tolist():
+                ts = batch.timestamp.astype('datetime64[ns]', copy=False)[i]
+                self.samples.append({
+                    'timestamp': None if np.isnat(ts) else iso_z(ts.view(np.int64)),
+                    'temperature': _number(float(batch.temperature[i])),
+                    'humidity': _number(float(batch.humidity[i])),
+                    'reason': REASONS[int(codes[i])],
+                    'line': self.rows + i + 1,
+                })
+        self.rows += len(batch)
+
+    def summary(self) -> dict:
+        rejected = int(self.counts[1:].sum())
+        return {
+            'rows': self.rows,
+            'valid': self.rows - rejected,
+            'rejected': rejected,
+            'noTimestamp': int(self.counts[NO_TIMESTAMP]),
+            'badTemperature': int(self.counts[BAD_TEMPERATURE]),
+            'badHumidity': int(self.counts[BAD_HUMIDITY]),
+            'samples': self.samples,
+        }
+
+
+def valid_lines(batch: RowBatch, codes: np.ndarray) -> str:
+    """NDJSON of the valid rows of a batch, with a ``{"skip": n}`` record in place
+    of each run of rejected rows."""
+    ok = codes == OK
+    if ok.all():
+        return ''.join(ndjson_lines(batch))
+    idx = np.flatnonzero(ok)
+    rejected = np.cumsum(~ok)
+    # Linhas recusadas antes de cada linha válida (desde a válida anterior) e no fim do lote
+    before = np.diff(rejected[idx], prepend=0).tolist()
+    tail = int(rejected[-1] - (rejected[idx[-1]] if len(idx) else 0))
+    parts = []
+    for gap, line in zip(before, ndjson_lines(batch.take(idx))):
+        if gap:
+            parts.append(f'{{"skip": {gap}}}\n')
+        parts.append(line)
+    if tail:
+        parts.append(f'{{"skip": {tail}}}\n')
+    return ''.join(parts)
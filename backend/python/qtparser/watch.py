@@ -0,0 +1,389 @@
+"""Watch-folder ingestion: ``python -m qtparser.watch <dir>...``.
+
+Long-running service that imports every .xls/.xlsx that appears under the
+watched directories (recursively) into ``sensor_data``, so readings are
+available as soon as an export lands in the folder. On Linux the directories
+are watched with inotify (through libc, no extra dependency); elsewhere, or
+when inotify is unavailable or out of watches, they are polled every
+``--poll-seconds``.
+
+A file is imported only after its size and mtime held still for
+``--settle-seconds`` (loggers, browsers and network shares write in pieces),
+on the same pool of workers and per-worker connections as
+:mod:`qtparser.bulk`, with checkpoints: a restart rescans the folders and the
+files already completed are skipped without being parsed. A file that changes
+again later (a re-downloaded export) is imported again; use ``--append`` to
+send only its new tail.
+
+Output is one JSON line per status change of a file::
+
+    {"watch": {"dirs": [...], "mode": "inotify"|"poll", "workers": 2}}
+    {"file": ..., "status": "queued", "sensorId": ...}
+    {"file": ..., "status": "imported"|"skipped", "rows": ..., "inserted": ..., "ms": ..., "delayMs": ...}
+    {"file": ..., "status": "failed", "error": ..., "code": ...}
+
+``delayMs`` is the time from the file's last write to the end of its import.
+Failed files are retried when they change or after ``--retry-seconds``.
+SIGINT/SIGTERM stop the watcher after the imports in progress.
+"""
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import signal
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
+
+from . import bulk
+from .errors import ParseError
+from .logs import debug
+from .options import ParseOptions
+from .pg_sink import CHECKPOINT_ROWS
+from .pipeline import available_cpus
+
+SETTLE_SECONDS = 5.0
+POLL_SECONDS = 10.0
+RETRY_SECONDS = 600.0
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT = struct.Struct('iIII')
+
+
+class Inotify:
+    """Minimal inotify binding over libc; :meth:`open` returns None where it is unavailable."""
+
+    def __init__(self, libc, fd: int):
+        self._libc = libc
+        self.fd = fd
+        self._dirs: Dict[int, str] = {}
+
+    @classmethod
+    def open(cls) -> Optional['Inotify']:
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        return cls(libc, fd) if fd >= 0 else None
+
+    def add(self, directory: str) -> bool:
+        """Watch ``directory`` (not its subdirectories); False when the kernel refuses (e.g. max_user_watches)."""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            debug(f"inotify_add_watch failed for {directory}: {os.strerror(ctypes.get_errno())}")
+            return False
+        self._dirs[wd] = directory
+        return True
+
+    def read(self, timeout: float) -> List[Tuple[Optional[str], int]]:
+        """(path, mask) of the events within ``timeout`` seconds; path is None on queue overflow."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        out = []
+        pos = 0
+        while pos + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, pos)
+            name = data[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b'\0')
+            pos += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                out.append((None, mask))
+            elif wd in self._dirs and name:
+                out.append((os.path.join(self._dirs[wd], os.fsdecode(name)), mask))
+        return out
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def file_state(path: str) -> Optional[Tuple[int, int]]:
+    """(size, mtime_ns), or None when the file is gone."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def is_workbook(path: str) -> bool:
+    name = os.path.basename(path)
+    # Arquivos temporários do Excel (~$...) e ocultos
+    return name.lower().endswith(bulk.EXTENSIONS) and not name.startswith(('~$', '.'))
+
+
+def _init_worker(dsn: str) -> None:
+    # Ctrl+C chega a todo o grupo de processos: quem encerra é o processo principal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    bulk.init_worker(dsn)
+
+
+class Watcher:
+    """Debounces the files of the watched directories and imports them on a worker pool."""
+
+    def __init__(self, dirs: List[str], base: ParseOptions, dsn: str, out, jobs: Optional[int] = None,
+                 sensor_id: Optional[str] = None, sensor_map: Optional[dict] = None,
+                 validation_id: Optional[str] = None, checkpoint_rows: int = CHECKPOINT_ROWS,
+                 append: bool = False, settle: float = SETTLE_SECONDS, poll: float = POLL_SECONDS,
+                 retry: float = RETRY_SECONDS, use_inotify: bool = True, storage: str = 'rows',
+                 archive: Optional[str] = None):
+        self.dirs = [os.path.abspath(d) for d in dirs]
+        # Os núcleos já estão ocupados por outros arquivos: sem threads extras por arquivo
+        self.options = replace(base, prefetch=0, sheet_workers=1, shard_workers=1)
+        self.dsn = dsn
+        self.out = out
+        self.workers = max(1, jobs or available_cpus())
+        self.sensor_id = sensor_id
+        self.sensor_map = sensor_map or {}
+        self.validation_id = validation_id
+        self.checkpoint_rows = checkpoint_rows
+        self.append = append
+        self.storage = storage
+        self.archive = archive
+        self.settle = settle
+        self.poll = poll
+        self.retry = retry
+        self.notify = Inotify.open() if use_inotify else None
+        self.stopped = False
+        # path -> (estado, desde quando está estável)
+        self.pending: Dict[str, Tuple[Tuple[int, int], float]] = {}
+        # path -> estado já importado (ou com falha, e quando)
+        self.done: Dict[str, Tuple[int, int]] = {}
+        self.failed_at: Dict[str, float] = {}
+        self.running: Dict = {}
+        self._conn = None
+        self._next_scan = 0.0
+
+    def report(self, path: str, status: str, **fields) -> None:
+        self.out.write(json.dumps({'file': path, 'status': status, **fields}, ensure_ascii=False) + '\n')
+        self.out.flush()
+
+    def watch_tree(self, top: str) -> None:
+        """Add inotify watches to ``top`` and its subdirectories, falling back to polling on failure."""
+        for root, _, _ in os.walk(top):
+            if self.notify is None:
+                return
+            if not self.notify.add(root):
+                debug('inotify unavailable, polling instead')
+                self.notify.close()
+                self.notify = None
+                self._next_scan = 0.0
+
+    def scan(self, paths: Optional[List[str]] = None) -> None:
+        """Queue the workbooks under ``paths`` (default: every watched dir) that are new or changed."""
+        now = time.monotonic()
+        for path in bulk.find_files(paths or self.dirs):
+            if is_workbook(path):
+                self.touch(path, now)
+
+    def touch(self, path: str, now: float) -> None:
+        state = file_state(path)
+        if state is None:
+            # Arquivo apagado: esquecer também a falha, senão ele seria retentado para sempre
+            self.pending.pop(path, None)
+            self.failed_at.pop(path, None)
+            self.done.pop(path, None)
+            return
+        if path in self.failed_at and now - self.failed_at[path] >= self.retry:
+            del self.failed_at[path]
+            self.done.pop(path, None)
+        if self.done.get(path) == state:
+            return
+        known = self.pending.get(path)
+        if known is None or known[0] != state:
+            self.pending[path] = (state, now)
+
+    def wait_events(self, timeout: float) -> None:
+        if self.notify is None:
+            time.sleep(timeout)
+            return
+        now = time.monotonic()
+        for path, mask in self.notify.read(timeout):
+            if path is None:
+                debug('inotify queue overflow, rescanning')
+                self.scan()
+            elif mask & IN_ISDIR:
+                # Pasta nova (ou movida para cá): vigiar e pegar o que já chegou nela
+                self.watch_tree(path)
+                self.scan([path])
+            elif is_workbook(path):
+                self.touch(path, now)
+
+    def connection(self):
+        from .pg_sink import connect
+        if self._conn is None or self._conn.closed or self._conn.broken:
+            self._conn = connect(self.dsn)
+        return self._conn
+
+    def settled(self) -> List[str]:
+        """Pending files whose size and mtime held for the settle time (re-checked now)."""
+        now = time.monotonic()
+        ready = []
+        for path, (state, since) in list(self.pending.items()):
+            if path in self.running.values():
+                continue
+            current = file_state(path)
+            if current is None:
+                del self.pending[path]
+            elif current != state:
+                self.pending[path] = (current, now)
+            elif now - since >= self.settle:
+                ready.append(path)
+        return ready
+
+    def dispatch(self, pool, paths: List[str]) -> None:
+        try:
+            sensors = bulk.resolve_sensors(self.connection(), paths, self.sensor_id, self.sensor_map)
+        except ParseError as e:
+            # Banco fora do ar: os arquivos continuam pendentes para a próxima volta
+            debug(f'Sensor lookup failed: {e}')
+            return
+        now = time.monotonic()
+        for path in paths:
+            state, _ = self.pending.pop(path)
+            self.done[path] = state
+            sensor = sensors.get(path)
+            if not sensor:
+                self.failed_at[path] = now
+                self.report(path, 'failed', error='No sensor for file (use --sensor-id or --sensor-map)', code=2)
+                continue
+            future = pool.submit(bulk.import_file, path, sensor, self.options, self.validation_id,
+                                 self.checkpoint_rows, self.append, self.storage, self.archive)
+            self.running[future] = path
+            self.report(path, 'queued', sensorId=sensor)
+
+    def collect(self, futures) -> None:
+        for fut in futures:
+            path = self.running.pop(fut)
+            try:
+                result = fut.result()
+            except Exception as e:
+                # Worker morto (ex.: sem memória): só este arquivo falha
+                result = {'error': f'{type(e).__name__}: {e}', 'code': 1}
+            if 'error' in result:
+                self.failed_at[path] = time.monotonic()
+                self.report(path, 'failed', **result)
+                continue
+            self.failed_at.pop(path, None)
+            state = self.done.get(path)
+            delay = int((time.time_ns() - state[1]) / 1e6) if state else None
+            self.report(path, 'skipped' if result.get('skipped') else 'imported', **result, delayMs=delay)
+
+    def stop(self, *_) -> None:
+        self.stopped = True
+
+    def run(self) -> None:
+        for top in self.dirs:
+            self.watch_tree(top)
+        mode = 'inotify' if self.notify else 'poll'
+        self.out.write(json.dumps({'watch': {'dirs': self.dirs, 'mode': mode, 'workers': self.workers}}) + '\n')
+        self.out.flush()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.dsn,)) as pool:
+            try:
+                while not self.stopped:
+                    now = time.monotonic()
+                    if now >= self._next_scan:
+                        self.scan()
+                        self._next_scan = now + self.poll if self.notify is None else float('inf')
+                    for path, at in list(self.failed_at.items()):
+                        if now - at >= self.retry:
+                            self.touch(path, now)
+                    ready = self.settled()
+                    if ready:
+                        self.dispatch(pool, ready)
+                    finished = [f for f in self.running if f.done()]
+                    if finished:
+                        self.collect(finished)
+                    # Acordar a tempo de ver a estabilização dos pendentes e o fim das importações
+                    timeout = self.poll
+                    if self.pending:
+                        timeout = min(timeout, max(0.2, self.settle / 2))
+                    if self.running:
+                        timeout = min(timeout, 1.0)
+                    self.wait_events(timeout)
+            finally:
+                self.stopped = True
+                pool.shutdown(wait=True, cancel_futures=True)
+                self.collect([f for f in self.running if f.done() and not f.cancelled()])
+                if self.notify:
+                    self.notify.close()
+                if self._conn is not None:
+                    self._conn.close()
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog='python -m qtparser.watch', description='Watch directories and import new logger exports into sensor_data.')
+    p.add_argument('dirs', nargs='+', help='directories to watch (recursively)')
+    p.add_argument('--dsn', default=None, help='connection URL (default: $DATABASE_URL)')
+    p.add_argument('--jobs', type=int, default=None, help='worker processes and database connections (default: available cores)')
+    p.add_argument('--sensor-id', default=None, help='sensor for every file')
+    p.add_argument('--sensor-map', default=None, help='JSON file mapping file names (or stems) to sensor ids')
+    p.add_argument('--validation-id', default=None, help='validation the rows belong to')
+    p.add_argument('--vendor', default=None, help='logger vendor hint (elitech, novus, instrutemp, testo)')
+    p.add_argument('--checkpoint-rows', type=int, default=CHECKPOINT_ROWS, help='rows per committed chunk (0 = off; then restarts import every file again)')
+    p.add_argument('--append', action='store_true', help="skip the leading rows each file's sensor already has (re-downloaded exports)")
+    p.add_argument('--storage', choices=['rows', 'blocks'], default='rows', help='sensor_data rows, or compressed per-sensor-day blocks (see qtparser.blocks)')
+    p.add_argument('--archive', default=None, help='also write the rows to this Parquet archive directory (see qtparser.archive)')
+    p.add_argument('--engine', choices=['pandas', 'polars'], default='pandas', help='engine of the full pipeline')
+    p.add_argument('--settle-seconds', type=float, default=SETTLE_SECONDS, help='how long size and mtime must hold before a file is imported')
+    p.add_argument('--poll-seconds', type=float, default=POLL_SECONDS, help='rescan interval without inotify')
+    p.add_argument('--retry-seconds', type=float, default=RETRY_SECONDS, help='retry failed files that did not change after this long')
+    p.add_argument('--poll', action='store_true', help='poll even where inotify is available (network shares)')
+    args = p.parse_args(argv)
+    dsn = args.dsn or os.environ.get('DATABASE_URL')
+    if not dsn:
+        p.error('--dsn or DATABASE_URL is required')
+    if args.jobs is not None and args.jobs < 1:
+        p.error('--jobs must be >= 1')
+    if args.storage == 'blocks' and args.append:
+        p.error('--storage blocks does not support --append')
+
+    from .pg_sink import connect
+    try:
+        missing = [d for d in args.dirs if not os.path.isdir(d)]
+        if missing:
+            raise ParseError(f'Directory not found: {missing[0]}', code=2)
+        sensor_map = {}
+        if args.sensor_map:
+            try:
+                with open(args.sensor_map, encoding='utf-8') as f:
+                    sensor_map = json.load(f)
+            except (OSError, ValueError) as e:
+                raise ParseError(f'Invalid sensor map: {e}', code=6)
+        # Falhar já na partida se o banco ou o psycopg não estiverem disponíveis
+        connect(dsn).close()
+    except ParseError as e:
+        print(json.dumps({'error': str(e)}))
+        return e.code
+
+    watcher = Watcher(args.dirs, ParseOptions(vendor=args.vendor, engine=args.engine), dsn, sys.stdout,
+                      args.jobs, args.sensor_id, sensor_map, args.validation_id, args.checkpoint_rows,
+                      args.append, args.settle_seconds, args.poll_seconds, args.retry_seconds,
+                      use_inotify=not args.poll, storage=args.storage, archive=args.archive)
+    signal.signal(signal.SIGTERM, watcher.stop)
+    signal.signal(signal.SIGINT, watcher.stop)
+    watcher.run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
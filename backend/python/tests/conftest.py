@@ -0,0 +1,48 @@
+"""Shared fixtures of the qtparser tests (run from backend/python: ``python -m pytest``)."""
+from pathlib import Path
+
+import pytest
+
+# Exportações reais dos loggers Elitech: XLSX com extensão .xls e dimensão A1:A1
+UPLOADS = Path(__file__).resolve().parents[3] / 'uploads'
+
+
+@pytest.fixture
+def elitech_upload():
+    files = sorted(UPLOADS.glob('EF72*.xls'))
+    if not files:
+        pytest.skip('no uploads/EF72*.xls export available')
+    return files[0]
+
+
+@pytest.fixture
+def pg_conn():
+    """Connection to $DATABASE_URL inside a transaction rolled back after the test."""
+    import os
+    dsn = os.environ.get('DATABASE_URL')
+    if not dsn:
+        pytest.skip('DATABASE_URL not set')
+    psycopg = pytest.importorskip('psycopg')
+    from qtparser.errors import ParseError
+    from qtparser.pg_sink import connect
+    try:
+        conn = connect(dsn)
+    except ParseError as e:
+        pytest.skip(str(e))
+    try:
+        with conn.transaction():
+            # As transações do código testado viram savepoints desta
+            yield conn
+            raise psycopg.Rollback()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def pg_sensor(pg_conn):
+    """A sensor with its sensor_data emptied (inside the rolled-back transaction)."""
+    row = pg_conn.execute('SELECT id FROM sensors ORDER BY id LIMIT 1').fetchone()
+    if row is None:
+        pytest.skip('no sensor in the database')
+    pg_conn.execute('DELETE FROM sensor_data WHERE "sensorId" = %s', (row[0],))
+    return row[0]
@@ -0,0 +1,111 @@
+import datetime as dt
+
+import numpy as np
+import pytest
+
+from qtparser import pg_sink
+from qtparser.options import ParseOptions
+from qtparser.pg_sink import SinkTarget, import_path, overlap_start
+
+T0 = dt.datetime(2025, 3, 1)
+
+
+def _minutes(*offsets):
+    return np.array([np.datetime64(T0 + dt.timedelta(minutes=m), 'ns') if m is not None else np.datetime64('NaT', 'ns')
+                     for m in offsets])
+
+
+class FakeConn:
+    """Stands in for psycopg: the min/max query, then the sample lookup by timestamp."""
+
+    def __init__(self, stored):
+        self.stored = stored  # datetime -> (temperature, humidity)
+        self.lookups = []
+
+    def execute(self, sql, params):
+        if 'min(' in sql:
+            class Row:
+                @staticmethod
+                def fetchone(rows=sorted(self.stored)):
+                    return (rows[0], rows[-1]) if rows else (None, None)
+            return Row
+        self.lookups.append(params[1])
+        return [(t, *self.stored[t]) for t in params[1] if t in self.stored]
+
+
+def _stored(*offsets, temperature=4.5, humidity=None):
+    return {T0 + dt.timedelta(minutes=m): (temperature, humidity) for m in offsets}
+
+
+def _readings(temperature, humidity=np.nan):
+    def readings(pick):
+        return np.full(len(pick), temperature, dtype=float), np.full(len(pick), humidity, dtype=float)
+    return readings
+
+
+@pytest.fixture
+def events(monkeypatch):
+    seen = []
+    monkeypatch.setattr(pg_sink, 'event', lambda kind, **fields: seen.append(fields))
+    return seen
+
+
+def test_nothing_stored_starts_at_zero(events):
+    start = overlap_start(FakeConn({}), 'S1')
+    assert start(_minutes(0, 5), _readings(4.5)) == 0
+    assert events == []
+
+
+def test_file_newer_than_the_stored_range_starts_at_zero(events):
+    start = overlap_start(FakeConn(_stored(0, 5)), 'S1')
+    assert start(_minutes(10, 15), _readings(4.5)) == 0
+    assert events == []
+
+
+def test_matching_fingerprint_skips_the_overlap(events):
+    conn = FakeConn(_stored(0, 5, 10))
+    start = overlap_start(conn, 'S1')
+    # NaT no meio não conta nem impede
+    assert start(_minutes(0, None, 5, 10, 15, 20), _readings(4.5)) == 4
+    assert events == [{'first_new': 4, 'samples': 3, 'matched': True}]
+    assert conn.lookups == [[T0, T0 + dt.timedelta(minutes=5), T0 + dt.timedelta(minutes=10)]]
+
+
+def test_different_readings_import_everything(events):
+    start = overlap_start(FakeConn(_stored(0, 5, 10)), 'S1')
+    assert start(_minutes(0, 5, 10, 15), _readings(5.0)) == 0
+    assert events[-1]['matched'] is False and events[-1]['first_new'] == 0
+    # Umidade gravada como NULL só casa com NaN
+    start = overlap_start(FakeConn(_stored(0, 5, 10)), 'S1')
+    assert start(_minutes(0, 5, 10, 15), _readings(4.5, 60.0)) == 0
+
+
+def test_sample_count_is_capped(events):
+    conn = FakeConn(_stored(*range(100)))
+    start = overlap_start(conn, 'S1', samples=4)
+    assert start(_minutes(*range(120)), _readings(4.5)) == 100
+    assert len(conn.lookups[0]) == 4 and conn.lookups[0][0] == T0 and conn.lookups[0][-1] == T0 + dt.timedelta(minutes=99)
+
+
+@pytest.mark.parametrize('offsets, temperature, reason', [
+    ((0, 20, 5, 25), 4.5, 'file not in time order'),
+    ((-10, -5, 30), 4.5, 'no rows inside the stored range'),
+    ((0, 5, 30), 999.0, 'no valid sample rows'),
+], ids=['out-of-order', 'before-range', 'invalid-samples'])
+def test_unsafe_overlaps_import_everything(events, offsets, temperature, reason):
+    conn = FakeConn(_stored(0, 10))
+    start = overlap_start(conn, 'S1')
+    assert start(_minutes(*offsets), _readings(temperature)) == 0
+    assert events == [{'first_new': 0, 'reason': reason}]
+    assert conn.lookups == []
+
+
+def test_downloading_the_same_export_again_skips_it(pg_conn, pg_sensor, elitech_upload):
+    first = import_path(pg_conn, str(elitech_upload), ParseOptions(), SinkTarget(dsn='', file_name='a.xls', sensor_id=pg_sensor),
+                        checkpoint_rows=0)
+    again = import_path(pg_conn, str(elitech_upload), ParseOptions(),
+                        SinkTarget(dsn='', file_name='b.xls', sensor_id=pg_sensor, append=True), checkpoint_rows=0)
+    assert again['appendSkipped'] == first['rows']
+    # Nada lido depois do trecho pulado: nem inserção nem duplicata
+    assert first['inserted'] > 0
+    assert (again['inserted'], again['duplicates']) == (0, 0)
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pytest
+
+from qtparser.archive import ArchiveTap, month_of, part_path, read_archive, to_row_batch, write_part, write_sensor
+from qtparser.batch import RowBatch
+from qtparser.errors import ParseError
+from qtparser.pg_sink import SinkTarget
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+# 2025-01-31 23:59, 2025-02-01 00:00, 2025-02-28 12:00 (UTC)
+JAN_END, FEB_START, FEB_MID = (int(np.datetime64(v, 'ms').astype(np.int64))
+                               for v in ('2025-01-31T23:59', '2025-02-01T00:00', '2025-02-28T12:00'))
+
+
+def _files(root):
+    return sorted(os.path.relpath(os.path.join(d, f), root) for d, _, fs in os.walk(root) for f in fs)
+
+
+def test_month_of_is_utc():
+    assert month_of(np.array([JAN_END, FEB_START, FEB_MID])).tolist() == ['2025-01', '2025-02', '2025-02']
+
+
+def test_part_path_is_hive_and_escapes_the_sensor(tmp_path):
+    assert part_path(str(tmp_path), 'a/b c', '2025-02', 'db') == \
+        os.path.join(str(tmp_path), 'sensorId=a%2Fb%20c', 'month=2025-02', 'db.parquet')
+
+
+def test_rows_are_split_by_sensor_and_month(tmp_path):
+    root = str(tmp_path)
+    ms = np.array([FEB_MID, JAN_END, FEB_START])
+    assert write_sensor(root, 'S1', 'f', ms, np.array([3.0, 1.0, 2.0]), np.array([np.nan, 50.0, 51.0])) == 2
+    assert write_sensor(root, 'S2', 'f', ms[:1], np.array([9.0]), np.array([np.nan])) == 1
+    assert _files(root) == [os.path.join('sensorId=S1', 'month=2025-01', 'f.parquet'),
+                            os.path.join('sensorId=S1', 'month=2025-02', 'f.parquet'),
+                            os.path.join('sensorId=S2', 'month=2025-02', 'f.parquet')]
+    # Cada parte ordenada por tempo, só com as colunas de leitura (sensor e mês vêm das pastas)
+    feb = pq.read_table(part_path(root, 'S1', '2025-02', 'f'))
+    assert feb.column_names == ['timestamp', 'temperature', 'humidity']
+    assert feb['temperature'].to_pylist() == [2.0, 3.0] and feb['humidity'].to_pylist() == [51.0, None]
+
+
+def test_parts_are_never_rewritten(tmp_path):
+    path = part_path(str(tmp_path), 'S1', '2025-02', 'f')
+    assert write_part(path, np.array([FEB_START]), np.array([1.0]), np.array([np.nan]))
+    assert not write_part(path, np.array([FEB_START]), np.array([7.0]), np.array([np.nan]))
+    assert pq.read_table(path)['temperature'].to_pylist() == [1.0]
+    assert _files(str(tmp_path)) == [os.path.relpath(path, str(tmp_path))]
+
+
+def test_read_filters_on_the_partitions_and_drops_repeats(tmp_path):
+    root = str(tmp_path)
+    ms = np.array([JAN_END, FEB_START, FEB_MID])
+    write_sensor(root, 'S1', 'db', ms, np.array([1.0, 2.0, 3.0]), np.full(3, np.nan))
+    # A mesma leitura vinda da importação do arquivo
+    write_sensor(root, 'S1', 'file', ms[1:2], np.array([2.0]), np.full(1, np.nan))
+    write_sensor(root, 'S2', 'db', ms, np.array([4.0, 5.0, 6.0]), np.full(3, np.nan))
+    table = read_archive(root)
+    assert table.num_rows == 6
+    assert table['sensorId'].to_pylist() == ['S1'] * 3 + ['S2'] * 3
+    feb = read_archive(root, ['S2'], '2025-02-01T00:00', '2025-02-28T12:00')
+    assert feb['temperature'].to_pylist() == [5.0]
+    np.testing.assert_array_equal(to_row_batch(feb).timestamp, np.array(['2025-02-01T00:00'], dtype='datetime64[ns]'))
+
+
+def test_reading_a_missing_archive_is_code_2(tmp_path):
+    with pytest.raises(ParseError) as e:
+        read_archive(str(tmp_path / 'none'))
+    assert e.value.code == 2
+
+
+def test_tap_keeps_accepted_rows_per_channel_sensor(tmp_path):
+    ms = np.array([JAN_END, FEB_START, FEB_MID, FEB_MID])
+    batch = RowBatch(ms.astype('datetime64[ms]').astype('datetime64[ns]'), np.array([1.0, 999.0, 3.0, 4.0]),
+                     np.full(4, np.nan), np.array(['1', '1', '1', '2'], dtype=object))
+    target = SinkTarget(dsn='', file_name='f.xls', sensor_id='S9', channel_sensors={'1': 'S1'})
+    tap = ArchiveTap(iter([batch]), target)
+    assert list(tap) == [batch]
+    assert tap.write(str(tmp_path), 'f') == 3
+    table = read_archive(str(tmp_path))
+    # Temperatura fora da faixa fica de fora; canal sem sensor vai para o sensor do arquivo
+    assert list(zip(table['sensorId'].to_pylist(), table['temperature'].to_pylist())) == \
+        [('S1', 1.0), ('S1', 3.0), ('S9', 4.0)]
@@ -0,0 +1,153 @@
+import types
+from contextlib import contextmanager
+
+import psycopg
+import pytest
+
+from qtparser import api, backfill, bulk
+from qtparser.options import ParseOptions
+from qtparser.pg_sink import SAVE_CHECKPOINT
+
+
+class FakeCursor:
+    """The statements of backfill._apply, answered from FakeConn; COPY data is only counted."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append(sql)
+        if sql is backfill.UPDATE:
+            self.rowcount = self.conn.diff[2]
+        elif sql is backfill.INSERT:
+            self.rowcount = self.conn.diff[1]
+        elif sql is SAVE_CHECKPOINT:
+            key = (params['file_hash'], params['file_name'], params['options_hash'])
+            self.conn.checkpoints[key] = (params['last_row'], params['inserted'], params['duplicates'],
+                                          params['failed'], params['completed'])
+
+    def fetchall(self):
+        return self.conn.channels
+
+    def fetchone(self):
+        return self.conn.diff
+
+    @contextmanager
+    def copy(self, sql):
+        yield types.SimpleNamespace(write=lambda data: None)
+
+
+class FakeConn:
+    def __init__(self, stored, diff=(100, 3, 2, 1), channels=()):
+        self.stored = stored  # linhas do GROUP BY de STORED
+        self.diff = diff  # staged, missing, changed, storedOnly
+        self.channels = list(channels)
+        self.checkpoints = {}
+        self.statements = []
+
+    def execute(self, sql, params):
+        if sql is backfill.STORED:
+            return types.SimpleNamespace(fetchall=lambda: [r for r in self.stored])
+        # Checkpoint.load
+        return types.SimpleNamespace(fetchone=lambda: self.checkpoints.get(params))
+
+    @contextmanager
+    def transaction(self):
+        try:
+            yield
+        except psycopg.Rollback:
+            pass
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    holder = types.SimpleNamespace(conn=None)
+    monkeypatch.setattr(bulk, 'worker_connection', lambda: holder.conn)
+    monkeypatch.setattr(bulk, 'worker_dsn', lambda: '')
+
+    def use(*args, **kwargs):
+        holder.conn = FakeConn(*args, **kwargs)
+        return holder.conn
+    return use
+
+
+def _by_sensor(results):
+    return {r['sensorId']: r for r in results}
+
+
+def test_stored_targets_sum_a_sensor_over_its_validations():
+    conn = FakeConn([('S1', 'V1', 100), ('S2', None, 50), ('S1', 'V2', 10)])
+    assert backfill.stored_targets(conn, 'f.xls') == [('S1', 'V1', 110), ('S2', None, 50)]
+
+
+def test_match_channels_gives_each_channel_to_one_sensor():
+    # Ordenado como CHANNELS: mais pares iguais primeiro
+    cur = FakeCursor(FakeConn([], channels=[('S1', '1', 90), ('S2', '1', 80), ('S2', '2', 70), ('S3', '2', 5)]))
+    assert backfill.match_channels(cur, 'f.xls', ['S1', 'S2', 'S3']) == {'S1': '1', 'S2': '2'}
+
+
+def test_throttle_waits_for_the_rate(monkeypatch):
+    slept = []
+    monkeypatch.setattr(backfill, 'time', types.SimpleNamespace(monotonic=lambda: 11.0, sleep=slept.append))
+    backfill.throttle(300, 100, t0=10.0)  # 3 s de linhas em 1 s
+    backfill.throttle(50, 100, t0=10.0)  # abaixo da cota
+    backfill.throttle(10 ** 6, 0, t0=10.0)  # sem limite
+    assert slept == [2.0]
+
+
+def test_file_not_imported(conn, elitech_upload):
+    conn([])
+    assert [r['status'] for r in backfill.backfill_file(str(elitech_upload), None, ParseOptions())] == ['notImported']
+
+
+def test_every_sensor_of_the_file_is_backfilled_once(conn, elitech_upload):
+    fake = conn([('S1', 'V1', 100), ('S2', None, 50), ('S1', 'V2', 10)])
+    path = str(elitech_upload)
+    first = _by_sensor(backfill.backfill_file(path, None, ParseOptions()))
+    assert {s: r['status'] for s, r in first.items()} == {'S1': 'backfilled', 'S2': 'backfilled'}
+    assert first['S1']['stored'] == 110 and first['S1']['inserted'] == 3 and first['S1']['updated'] == 2
+    assert first['S1']['rows'] == first['S2']['rows'] > 0
+    # Um arquivo de um só canal: os dois sensores comparados com todas as linhas, sem CHANNELS
+    assert backfill.CHANNELS not in fake.statements and 'channel' not in first['S1']
+    again = _by_sensor(backfill.backfill_file(path, None, ParseOptions()))
+    assert {s: r['status'] for s, r in again.items()} == {'S1': 'current', 'S2': 'current'}
+    assert again['S1']['rows'] == first['S1']['rows'] and again['S1']['inserted'] == 3
+
+
+def test_only_due_pairs_are_applied(conn, elitech_upload):
+    fake = conn([('S1', 'V1', 100), ('S2', None, 50)])
+    path = str(elitech_upload)
+    assert [r['sensorId'] for r in backfill.backfill_file(path, 'S2', ParseOptions())] == ['S2']
+    fake.statements.clear()
+    results = _by_sensor(backfill.backfill_file(path, None, ParseOptions()))
+    assert results['S2']['status'] == 'current' and results['S1']['status'] == 'backfilled'
+    assert fake.statements.count(backfill.INSERT) == 1
+
+
+def test_dry_run_saves_nothing(conn, elitech_upload):
+    fake = conn([('S1', 'V1', 100)])
+    results = backfill.backfill_file(str(elitech_upload), None, ParseOptions(), dry_run=True)
+    assert [(r['status'], r['missing'], r['changed'], r['storedOnly']) for r in results] == [('dryRun', 3, 2, 1)]
+    assert backfill.UPDATE not in fake.statements and fake.checkpoints == {}
+
+
+def test_throttle_runs_after_every_batch(conn, elitech_upload, monkeypatch):
+    conn([('S1', 'V1', 100)])
+    calls = []
+    monkeypatch.setattr(backfill, 'throttle', lambda rows, rate, t0: calls.append((rows, rate)))
+    options = ParseOptions(batch_size=1000)
+    results = backfill.backfill_file(str(elitech_upload), None, options, rows_per_sec=500)
+    sizes = [len(b) for b in api.parse(str(elitech_upload), options)]
+    assert len(sizes) > 1
+    assert calls == [(sum(sizes[:i + 1]), 500) for i in range(len(sizes))]
+    assert results[0]['rows'] == sum(sizes)
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from qtparser.batch import RowBatch
+from qtparser.blocks import MS_PER_DAY, MAX_SCALED, SCALE, decode_block, encode_block, load_blocks, read_range
+from qtparser.errors import ParseError
+from qtparser.pg_sink import SinkTarget
+
+DAY0 = 20_000 * MS_PER_DAY  # 2024-10-04
+
+
+def _batch(ms, temperature, humidity=None):
+    ms = np.asarray(ms, dtype=np.int64)
+    humidity = np.full(len(ms), np.nan) if humidity is None else np.asarray(humidity, dtype=float)
+    return RowBatch(ms.astype('datetime64[ms]').astype('datetime64[ns]'),
+                    np.asarray(temperature, dtype=float), humidity)
+
+
+def test_block_round_trip():
+    rng = np.random.default_rng(7)
+    ms = DAY0 + np.sort(rng.choice(MS_PER_DAY, 500, replace=False))
+    temp = np.round(rng.uniform(-40, 60, 500), 2)
+    hum = np.round(rng.uniform(0, 100, 500), 2)
+    hum[::7] = np.nan
+    block = encode_block(ms, temp, hum)
+    assert block['count'] == 500
+    got_ms, got_temp, got_hum = decode_block(block['first_ts'], block['scale'], block['timestamps'],
+                                             block['temperature'], block['humidity'])
+    np.testing.assert_array_equal(got_ms, ms)
+    np.testing.assert_array_equal(got_temp, temp)
+    np.testing.assert_array_equal(got_hum, hum)
+
+
+def test_block_without_humidity_keeps_it_missing():
+    ms = DAY0 + np.arange(3) * 60_000
+    block = encode_block(ms, np.array([1.0, 1.5, -0.25]), np.full(3, np.nan))
+    assert block['humidity'] is None
+    _, temp, hum = decode_block(block['first_ts'], SCALE, block['timestamps'], block['temperature'], None)
+    np.testing.assert_array_equal(temp, [1.0, 1.5, -0.25])
+    assert np.isnan(hum).all()
+
+
+def test_block_rejects_values_outside_int32():
+    ms = DAY0 + np.arange(2)
+    too_big = MAX_SCALED / SCALE * 2
+    with pytest.raises(ParseError):
+        encode_block(ms, np.array([0.0, too_big]), np.full(2, np.nan))
+    with pytest.raises(ParseError):
+        encode_block(ms, np.array([0.0, 1.0]), np.array([np.nan, -too_big]))
+
+
+def _sensor(conn):
+    row = conn.execute('SELECT id FROM sensors ORDER BY id LIMIT 1').fetchone()
+    if row is None:
+        pytest.skip('no sensor in the database')
+    return row[0]
+
+
+def test_merge_into_existing_blocks(pg_conn):
+    sensor = _sensor(pg_conn)
+    target = SinkTarget(dsn='', file_name='blocks-test.xls', sensor_id=sensor, storage='blocks')
+    pg_conn.execute('DELETE FROM sensor_data_blocks WHERE "sensorId" = %s', (sensor,))
+    minutes = np.arange(10) * 60_000
+    first = load_blocks(pg_conn, [_batch(DAY0 + minutes, np.arange(10) / 4)], target)
+    assert (first['inserted'], first['duplicates'], first['blocks']) == (10, 0, 1)
+
+    # Metade repetida (com outros valores: os gravados valem) e metade nova, parte no dia seguinte
+    again = np.r_[DAY0 + minutes[5:], DAY0 + MS_PER_DAY + minutes[:5]]
+    second = load_blocks(pg_conn, [_batch(again, np.full(10, 99.0), np.full(10, 50.0))], target)
+    # O primeiro dia só recebeu repetidas: não é regravado
+    assert (second['inserted'], second['duplicates'], second['blocks']) == (5, 5, 1)
+
+    stored = read_range(pg_conn, sensor)
+    ms = stored.timestamp.astype('datetime64[ms]').view(np.int64)
+    np.testing.assert_array_equal(ms, np.r_[DAY0 + minutes, DAY0 + MS_PER_DAY + minutes[:5]])
+    np.testing.assert_array_equal(stored.temperature, np.r_[np.arange(10) / 4, np.full(5, 99.0)])
+    assert np.isnan(stored.humidity[:10]).all() and (stored.humidity[10:] == 50.0).all()
+
+
+def test_days_are_written_as_the_stream_moves_past_them(pg_conn):
+    sensor = _sensor(pg_conn)
+    target = SinkTarget(dsn='', file_name='blocks-test.xls', sensor_id=sensor, storage='blocks')
+    pg_conn.execute('DELETE FROM sensor_data_blocks WHERE "sensorId" = %s', (sensor,))
+    days_written = []
+
+    def stream():
+        for day in range(3):
+            yield _batch(DAY0 + day * MS_PER_DAY + np.arange(4) * 60_000, np.full(4, float(day)))
+            days_written.append(pg_conn.execute(
+                'SELECT count(*) FROM sensor_data_blocks WHERE "sensorId" = %s', (sensor,)).fetchone()[0])
+
+    summary = load_blocks(pg_conn, stream(), target)
+    # Depois de cada lote só o dia ainda aberto fica em memória
+    assert days_written == [0, 1, 2]
+    assert (summary['inserted'], summary['blocks']) == (12, 3)
+
+
+def test_out_of_range_rows_are_refused(pg_conn):
+    sensor = _sensor(pg_conn)
+    target = SinkTarget(dsn='', file_name='blocks-test.xls', sensor_id=sensor, storage='blocks')
+    pg_conn.execute('DELETE FROM sensor_data_blocks WHERE "sensorId" = %s', (sensor,))
+    summary = load_blocks(pg_conn, [_batch(DAY0 + np.arange(3), [1.0, 2.0, 3.0], [10.0, 1e9, 30.0])], target)
+    assert (summary['inserted'], summary['failed']) == (2, 1)
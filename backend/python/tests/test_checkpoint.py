@@ -0,0 +1,72 @@
+import pytest
+
+from qtparser.errors import ParseError
+from qtparser.options import ParseOptions
+from qtparser.pg_sink import Checkpoint, SinkTarget, checkpoint_options, file_sha256, import_path
+
+OPTIONS = ParseOptions(batch_size=1000)
+FILE_NAME = 'checkpoint-test.xls'
+
+
+class Crash(Exception):
+    pass
+
+
+def test_checkpoint_key_depends_on_what_decides_the_rows():
+    target = SinkTarget(dsn='', file_name='f.xls', sensor_id='S1')
+    base = checkpoint_options(OPTIONS, target)
+    assert 'storage' not in base
+    # Tamanho de lote não muda as linhas: mesma chave; sensor e armazenamento mudam
+    assert Checkpoint('h', 'f.xls', checkpoint_options(ParseOptions(batch_size=7), target)).options_hash == \
+        Checkpoint('h', 'f.xls', base).options_hash
+    other_sensor = checkpoint_options(OPTIONS, SinkTarget(dsn='', file_name='f.xls', sensor_id='S2'))
+    blocks = checkpoint_options(OPTIONS, SinkTarget(dsn='', file_name='f.xls', sensor_id='S1', storage='blocks'))
+    hashes = {Checkpoint('h', 'f.xls', o).options_hash for o in (base, other_sensor, blocks)}
+    assert len(hashes) == 3
+
+
+def test_hashing_a_missing_file_is_code_2(tmp_path):
+    with pytest.raises(ParseError) as e:
+        file_sha256(str(tmp_path / 'missing.xls'))
+    assert e.value.code == 2
+
+
+def _stored(conn, sensor):
+    return conn.execute('SELECT count(*), count(DISTINCT "rowNumber") FROM sensor_data '
+                        'WHERE "sensorId" = %s AND "fileName" = %s', (sensor, FILE_NAME)).fetchone()
+
+
+def test_retry_resumes_after_the_last_committed_chunk(pg_conn, pg_sensor, elitech_upload):
+    pg_conn.execute('DELETE FROM import_checkpoints WHERE "fileName" = %s', (FILE_NAME,))
+    target = SinkTarget(dsn='', file_name=FILE_NAME, sensor_id=pg_sensor)
+
+    def crash_in_second_chunk(rows, total):
+        if rows > 3000:
+            raise Crash()
+
+    with pytest.raises(Crash):
+        import_path(pg_conn, str(elitech_upload), OPTIONS, target, crash_in_second_chunk, checkpoint_rows=2000)
+    # Só o primeiro bloco ficou gravado
+    assert _stored(pg_conn, pg_sensor) == (2000, 2000)
+
+    resumed = import_path(pg_conn, str(elitech_upload), OPTIONS, target, checkpoint_rows=2000)
+    assert resumed['resumedFrom'] == 2000
+    assert resumed['duplicates'] == 0
+    assert resumed['inserted'] == resumed['rows'] - resumed['failed']
+    assert _stored(pg_conn, pg_sensor) == (resumed['inserted'], resumed['inserted'])
+
+    # Arquivo concluído: nem é lido de novo
+    again = import_path(pg_conn, str(elitech_upload), OPTIONS, target, checkpoint_rows=2000)
+    assert again['skipped'] and again['inserted'] == resumed['inserted']
+
+
+def test_without_checkpoints_a_failure_keeps_nothing(pg_conn, pg_sensor, elitech_upload):
+    target = SinkTarget(dsn='', file_name=FILE_NAME, sensor_id=pg_sensor)
+
+    def crash(rows, total):
+        if rows > 3000:
+            raise Crash()
+
+    with pytest.raises(Crash):
+        import_path(pg_conn, str(elitech_upload), OPTIONS, target, crash, checkpoint_rows=0)
+    assert _stored(pg_conn, pg_sensor) == (0, 0)
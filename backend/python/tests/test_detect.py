@@ -0,0 +1,126 @@
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from qtparser import api, detect
+from qtparser.columns import detect_channels, normalize_str
+from qtparser.options import ParseOptions
+
+pytest.importorskip('pyarrow')
+
+ARROW = 'string[pyarrow]'
+
+# Células como o read_excel devolve: texto com espaços e caracteres invisíveis, números,
+# datetime, vazios; o nome das colunas segue o papel de cada uma
+FRAME = pd.DataFrame({
+    'iso': ['2025-03-01 00:00:00', ' 2025-03-01T00:05:00.250 ', '﻿2025−03-01 00：10:00',
+            '2025-03-01  00:15:00', None, 'x', '', np.nan],
+    'mixed': ['01/03/2025 00:20', dt.datetime(2025, 3, 1, 0, 25), 4.5, 7, True, pd.NaT,
+              'a\tb‎ c', '\x00'],
+    'temperature': [4.5, np.nan, 5.0, 1e20, 0.1 + 0.2, -0.0, 3.0, 2.0],
+    'stamps': pd.to_datetime(['2025-03-01 00:00', None, '2025-03-01 00:10', '2025-03-01 00:15:00.5',
+                              '2025-03-02 00:00', '2025-03-02 00:00', '2025-03-02 00:00', '2025-03-02 00:00'],
+                             format='mixed'),
+})
+
+
+def _per_cell(col):
+    # Comportamento anterior: normalize_str célula a célula
+    return col.astype(object).where(col.notna(), '').map(normalize_str).tolist()
+
+
+@pytest.fixture(params=[ARROW, None], ids=['arrow', 'object'])
+def text_dtype(request, monkeypatch):
+    monkeypatch.setattr(detect, 'TEXT_DTYPE', request.param)
+    return request.param
+
+
+@pytest.mark.parametrize('name', FRAME.columns)
+def test_normalized_column_matches_normalize_str(text_dtype, name):
+    assert detect.normalized_column(FRAME[name]).tolist() == _per_cell(FRAME[name])
+
+
+def test_arrow_and_object_detect_the_same(monkeypatch):
+    results = {}
+    for dtype in (ARROW, None):
+        monkeypatch.setattr(detect, 'TEXT_DTYPE', dtype)
+        columns = {name: detect.normalized_column(FRAME[name]) for name in FRAME.columns}
+        results[dtype] = {
+            'fractions': {name: detect.iso_fraction(s) for name, s in columns.items()},
+            'strict': detect.try_strict_iso_on_df(FRAME, None),
+        }
+    assert results[ARROW]['fractions'] == results[None]['fractions']
+    assert results[ARROW]['fractions']['iso'] == (5, 4)
+    pd.testing.assert_series_equal(results[ARROW]['strict'], results[None]['strict'])
+    assert int(results[ARROW]['strict'].notna().sum()) == 6
+
+
+def test_normalized_column_stays_on_the_arrow_backend(text_dtype):
+    s = detect.normalized_column(FRAME['mixed'])
+    if text_dtype == ARROW:
+        assert s.dtype == ARROW
+    else:
+        assert s.dtype == object
+
+
+def _probe_sheet(path, columns):
+    pd.DataFrame(columns).to_excel(path, index=False, sheet_name='Dados')
+    return str(path)
+
+
+def _long(stream):
+    def num(v):
+        return None if v != v else float(v)
+    return [(str(t), num(temp), num(hum), ch)
+            for b in stream for t, temp, hum, ch in zip(b.timestamp, b.temperature, b.humidity, b.channel)]
+
+
+def test_channels_are_paired_by_header_number():
+    renamed = ['datetime', 'temperature', 'humidity', 'temperature', 'humidity']
+    raw = ['Data/Hora', 'Temperatura 2', 'Umidade 1', 'Temperatura 1', 'Umidade 2']
+    assert detect_channels(renamed, raw) == [('2', 1, 4), ('1', 3, 2)]
+    # Sem número distinto em cada temperatura: canais pela ordem, sufixo ".1" do pandas ignorado
+    raw = ['Data/Hora', 'Temperatura', 'Umidade', 'Temperatura.1', 'Umidade.1']
+    assert detect_channels(renamed, raw) == [('1', 1, 2), ('2', 3, 4)]
+    assert detect_channels(renamed[:4], raw[:4]) == [('1', 1, 2), ('2', 3, None)]
+
+
+def test_melt_keeps_each_probe_contiguous_and_drops_empty_readings():
+    df = pd.DataFrame([['4,5', '60', '7', None], [None, None, '8', '50'], ['5', None, None, None]],
+                      columns=['temperature', 'humidity', 'temperature', 'humidity'])
+    ts = pd.Series(pd.to_datetime(['2025-03-01 00:00', '2025-03-01 00:05', '2025-03-01 00:10'], utc=True))
+    long_df = detect.melt_channels(df, ts, [('1', 0, 1), ('2', 2, 3)])
+    assert long_df['channel'].tolist() == ['1', '1', '2', '2']
+    assert long_df['temperature'].tolist() == [4.5, 5.0, 7.0, 8.0]
+    assert long_df['humidity'].fillna(-1).tolist() == [60.0, -1, -1, 50.0]
+    assert long_df['timestamp'].tolist() == ts.iloc[[0, 2, 0, 1]].tolist()
+
+
+@pytest.mark.parametrize('lean', [True, False], ids=['lean', 'full'])
+def test_multi_probe_sheet_streams_every_channel(tmp_path, lean):
+    path = _probe_sheet(tmp_path / 'probes.xlsx', {
+        'Data/Hora': ['2025-03-01 00:00:00', '2025-03-01 00:05:00', '2025-03-01 00:10:00'],
+        'Temperatura 1 (°C)': [4.5, 5.0, None],
+        'Umidade 1 (%)': [60, 61, 62],
+        'Temperatura 2 (°C)': [-18.0, None, -17.5],
+    })
+    stream = api.parse(path, ParseOptions(channels=True, lean=lean, batch_size=2))
+    assert stream.total is None
+    assert _long(stream) == [
+        ('2025-03-01T00:00:00.000000000', 4.5, 60.0, '1'),
+        ('2025-03-01T00:05:00.000000000', 5.0, 61.0, '1'),
+        ('2025-03-01T00:10:00.000000000', None, 62.0, '1'),
+        ('2025-03-01T00:00:00.000000000', -18.0, None, '2'),
+        ('2025-03-01T00:10:00.000000000', -17.5, None, '2'),
+    ]
+    # Sem --channels as sondas continuam colapsadas em uma leitura por linha
+    single = list(api.parse(path, ParseOptions(lean=lean)))
+    assert [b.channel for b in single] == [None] and single[0].temperature.tolist() == [4.5, 5.0, -17.5]
+
+
+def test_single_probe_sheet_has_no_channel_with_channels_on(tmp_path):
+    path = _probe_sheet(tmp_path / 'one.xlsx', {'Data/Hora': ['2025-03-01 00:00:00'], 'Temperatura': [4.5]})
+    batches = list(api.parse(path, ParseOptions(channels=True, lean=False)))
+    assert [b.channel for b in batches] == [None] and batches[0].temperature.tolist() == [4.5]
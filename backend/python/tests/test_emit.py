@@ -0,0 +1,99 @@
+import io
+import json
+import math
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from qtparser import api
+from qtparser.batch import RowBatch
+from qtparser.emit import iso_z, write_ndjson
+from qtparser.options import ParseOptions
+
+PYTHON_DIR = Path(__file__).resolve().parents[1]
+UPLOADS = sorted((PYTHON_DIR.parents[1] / 'uploads').glob('*.xls*'))
+
+
+def _previous_ndjson(batches) -> str:
+    """The writer before the columnar one: a dict and json.dumps per row."""
+    def ts(v):
+        v = np.datetime64(v, 'ns')
+        return None if np.isnat(v) else iso_z(v.astype(np.int64))
+
+    def num(v):
+        v = float(v)
+        return None if math.isnan(v) else v
+
+    lines = []
+    for batch in batches:
+        for i in range(len(batch)):
+            obj = {'timestamp': ts(batch.timestamp[i]), 'temperature': num(batch.temperature[i]), 'humidity': num(batch.humidity[i])}
+            if batch.channel is not None:
+                obj['channel'] = batch.channel[i]
+            lines.append(json.dumps(obj, ensure_ascii=False) + '\n')
+    return ''.join(lines)
+
+
+def _ndjson(batches) -> str:
+    out = io.StringIO()
+    for batch in batches:
+        write_ndjson(batch, out)
+    return out.getvalue()
+
+
+def test_edge_values_match_the_per_row_writer():
+    ts = np.array(['2025-03-01T00:00:00', 'NaT', '2025-03-01T00:00:00.5', '2025-03-01T00:00:00.000001',
+                   '2025-03-01T00:00:00.000000007', '1969-12-31T23:59:59.999', '1900-01-01T12:00:00', '2262-04-11T00:00:00'],
+                  dtype='datetime64[ns]')
+    temperature = np.array([4.5, np.nan, np.inf, -np.inf, -0.0, 0.1 + 0.2, 1e20, 5e-324])
+    humidity = np.array([np.nan, 61.0, 100.0, 0.0, 1.5e-7, 12345678.9, np.nan, -1.0])
+    channel = np.array(['1', 'câmara 2', '', 'x"y', '\\', '1', '☃', '1'], dtype=object)
+    for batch in (RowBatch(ts, temperature, humidity), RowBatch(ts, temperature, humidity, channel)):
+        assert _ndjson([batch]) == _previous_ndjson([batch])
+
+
+@pytest.mark.skipif(not UPLOADS, reason='no uploads/*.xls export available')
+@pytest.mark.parametrize('lean', [True, False], ids=['lean', 'full'])
+@pytest.mark.parametrize('path', UPLOADS, ids=[p.name for p in UPLOADS])
+def test_uploads_match_the_per_row_writer(path, lean):
+    batches = list(api.parse(str(path), ParseOptions(lean=lean, batch_size=1000)))
+    assert _ndjson(batches) == _previous_ndjson(batches)
+
+
+@pytest.mark.skipif(not UPLOADS, reason='no uploads/*.xls export available')
+def test_cli_stdout_matches_the_per_row_writer():
+    path = UPLOADS[0]
+    stdout = subprocess.run([sys.executable, '-m', 'qtparser', str(path)], cwd=PYTHON_DIR,
+                            capture_output=True, check=True).stdout
+    assert stdout == _previous_ndjson(api.parse(str(path), ParseOptions())).encode('utf-8')
+
+
+@pytest.mark.skipif(not UPLOADS, reason='no uploads/*.xls export available')
+@pytest.mark.parametrize('lean', [True, False], ids=['lean', 'full'])
+def test_stream_is_cut_in_batches_with_a_known_total(lean):
+    stream = api.parse(str(UPLOADS[0]), ParseOptions(lean=lean, batch_size=1000))
+    sizes = [len(b) for b in stream]
+    assert stream.total == sum(sizes) and len(sizes) > 1
+    assert set(sizes[:-1]) == {1000} and 0 < sizes[-1] <= 1000
+    skipped = api.parse(str(UPLOADS[0]), ParseOptions(lean=lean, batch_size=1000, skip_rows=1500))
+    assert (skipped.start, skipped.total) == (1500, stream.total - 1500)
+    assert sum(len(b) for b in skipped) == stream.total - 1500
+
+
+@pytest.mark.skipif(not UPLOADS, reason='no uploads/*.xls export available')
+def test_cli_progress_follows_every_batch():
+    path = UPLOADS[0]
+    stdout = subprocess.run([sys.executable, '-m', 'qtparser', str(path), '--progress', '--batch-size', '2000'],
+                            cwd=PYTHON_DIR, capture_output=True, check=True).stdout
+    records = [json.loads(line) for line in stdout.decode('utf-8').splitlines()]
+    progress = [r['progress'] for r in records if 'progress' in r]
+    rows = sum('progress' not in r for r in records)
+    assert [p['rows'] for p in progress] == list(range(2000, rows, 2000)) + [rows]
+    assert {p['total'] for p in progress} == {rows}
+    # Cada registro vem logo depois das linhas do seu lote
+    assert 'progress' in records[2000] and 'progress' in records[-1]
+    rows_only = b''.join(line + b'\n' for line in stdout.splitlines() if not line.startswith(b'{"progress"'))
+    assert rows_only == _previous_ndjson(api.parse(str(path), ParseOptions())).encode('utf-8')
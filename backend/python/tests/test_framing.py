@@ -0,0 +1,50 @@
+import io
+import json
+import sys
+
+import numpy as np
+
+from qtparser import api, cli
+from qtparser.batch import RowBatch
+from qtparser.framing import FRAME_HEADER
+from qtparser.pipeline import BatchStream
+
+
+def frames(data: bytes) -> list:
+    out = []
+    while data:
+        kind, seq, size = FRAME_HEADER.unpack_from(data)
+        out.append((kind, seq, data[FRAME_HEADER.size:FRAME_HEADER.size + size]))
+        data = data[FRAME_HEADER.size + size:]
+    return out
+
+
+def run_framed(monkeypatch, argv) -> tuple:
+    stdout = io.TextIOWrapper(io.BytesIO())
+    monkeypatch.setattr(sys, 'stdin', io.StringIO(''.join(f'ACK {i}\n' for i in range(1, 100))))
+    monkeypatch.setattr(sys, 'stdout', stdout)
+    code = cli.main(argv + ['--framed'])
+    stdout.flush()
+    return code, frames(stdout.buffer.getvalue())
+
+
+def test_unexpected_error_mid_stream_becomes_an_error_frame(monkeypatch, tmp_path):
+    def broken(*args, **kwargs):
+        def batches():
+            ts = np.array(['2025-03-01T00:00:00'], dtype='datetime64[ns]')
+            yield RowBatch(ts, np.array([4.0]), np.array([np.nan]))
+            raise RuntimeError('decoder exploded')
+        return BatchStream(batches(), total=2)
+
+    monkeypatch.setattr(api, 'parse', broken)
+    code, out = run_framed(monkeypatch, [str(tmp_path / 'x.xlsx')])
+    assert code == 1
+    assert [k for k, _, _ in out] == [b'S', b'R', b'X']
+    assert [s for _, s, _ in out] == [1, 2, 3]
+    assert json.loads(out[-1][2]) == {'error': 'RuntimeError: decoder exploded'}
+
+
+def test_parse_error_becomes_an_error_frame(monkeypatch, tmp_path):
+    code, out = run_framed(monkeypatch, [str(tmp_path / 'missing.xlsx')])
+    assert code == 2
+    assert [(k, json.loads(p)) for k, _, p in out] == [(b'X', {'error': 'File not found'})]
@@ -0,0 +1,37 @@
+import numpy as np
+
+from qtparser import api, lean
+from qtparser.lean import try_lean_decode
+from qtparser.options import ParseOptions
+from qtparser.source import WorkbookSource
+
+
+def _rows(stream):
+    batches = list(stream)
+    return (np.concatenate([b.timestamp for b in batches]),
+            np.concatenate([b.temperature for b in batches]),
+            np.concatenate([b.humidity for b in batches]))
+
+
+def test_lean_path_runs_on_elitech_export(elitech_upload):
+    decoded = try_lean_decode(WorkbookSource(str(elitech_upload)), ParseOptions())
+    assert decoded is not None
+    batch, _ = decoded
+    assert len(batch) > 1000
+    assert np.isfinite(batch.temperature).all()
+
+
+def test_lean_matches_full_pipeline(elitech_upload):
+    lean = _rows(api.parse(str(elitech_upload), ParseOptions()))
+    full = _rows(api.parse(str(elitech_upload), ParseOptions(lean=False)))
+    np.testing.assert_array_equal(lean[0], full[0])
+    np.testing.assert_array_equal(lean[1], full[1])
+    np.testing.assert_array_equal(lean[2], full[2])
+
+
+def test_lean_failure_warns_once(elitech_upload, monkeypatch, capsys):
+    def broken(*args, **kwargs):
+        raise RuntimeError('boom')
+    monkeypatch.setattr(lean, '_decode', broken)
+    assert try_lean_decode(WorkbookSource(str(elitech_upload)), ParseOptions()) is None
+    assert capsys.readouterr().err.splitlines() == ['WARNING: Lean decoder failed, using full pipeline: boom']
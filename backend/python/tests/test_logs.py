@@ -0,0 +1,104 @@
+import io
+import json
+import time
+
+import numpy as np
+import pytest
+
+from qtparser import logs
+from qtparser.batch import RowBatch
+from qtparser.pipeline import BatchStream, prefetch
+
+
+def _batch(n):
+    return RowBatch(np.full(n, np.datetime64('2025-03-01T00:00:00', 'ns')), np.zeros(n), np.full(n, np.nan))
+
+
+def _heartbeats(out):
+    return [e for e in map(json.loads, out.getvalue().splitlines()) if e['event'] == 'heartbeat']
+
+
+def _wait_beats(out, count):
+    deadline = time.monotonic() + 5
+    while len(_heartbeats(out)) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return _heartbeats(out)
+
+
+def test_heartbeats_report_rows_taken_from_the_stream():
+    out = io.StringIO()
+    logs.enable_events(out, heartbeat=0.01)
+    try:
+        stream = BatchStream(iter([_batch(3), _batch(4)]), total=7)
+        with logs.stage('write'):
+            next(stream)
+            seen = len(_wait_beats(out, 1))
+            beat = _wait_beats(out, seen + 1)[-1]
+            assert (beat['stage'], beat['rows']) == ('write', 3)
+            next(stream)
+            seen = len(_wait_beats(out, 1))
+            beat = _wait_beats(out, seen + 1)[-1]
+            assert (beat['stage'], beat['rows']) == ('write', 7)
+    finally:
+        logs.disable_events()
+
+
+def test_stalled_parse_keeps_the_same_heartbeat_progress():
+    # Processo vivo sem avançar: heartbeats continuam, mas com o mesmo progresso
+    out = io.StringIO()
+    logs.enable_events(out, heartbeat=0.01)
+    try:
+        with logs.stage('read'):
+            beats = _wait_beats(out, 5)
+    finally:
+        logs.disable_events()
+    assert {(b['stage'], b['rows']) for b in beats} == {('read', 0)}
+
+
+def _producer(n, produced, fail_at=None):
+    for i in range(n):
+        if i == fail_at:
+            raise ValueError('bad batch')
+        produced.append(i)
+        yield _batch(i + 1)
+
+
+def _settle(produced):
+    # Esperar o worker parar de produzir (fila cheia)
+    last = -1
+    while len(produced) != last:
+        last = len(produced)
+        time.sleep(0.05)
+    return last
+
+
+def test_prefetch_keeps_at_most_depth_batches_ahead():
+    produced = []
+    stream = prefetch(_producer(20, produced), depth=2)
+    assert len(next(stream)) == 1
+    # Um lote entregue, dois na fila e um esperando vaga
+    assert _settle(produced) == 4
+    assert [len(b) for b in stream] == list(range(2, 21))
+
+
+def test_prefetch_reraises_producer_errors_in_order():
+    stream = prefetch(_producer(5, [], fail_at=2), depth=2)
+    assert len(next(stream)) == 1 and len(next(stream)) == 2
+    with pytest.raises(ValueError, match='bad batch'):
+        next(stream)
+
+
+def test_consumer_stopping_early_releases_the_worker():
+    produced = []
+    stream = prefetch(_producer(1000, produced), depth=2)
+    next(stream)
+    stream.close()
+    assert _settle(produced) < 10
+
+
+def test_prefetch_depth_zero_runs_inline():
+    produced = []
+    stream = prefetch(_producer(3, produced), depth=0)
+    assert produced == []
+    next(stream)
+    assert produced == [0]
@@ -0,0 +1,41 @@
+import io
+import json
+
+from qtparser import api
+from qtparser.manifest import ManifestEntry, run_manifest
+from qtparser.options import ParseOptions
+
+
+def test_unexpected_error_fails_only_that_file(elitech_upload, monkeypatch):
+    real_parse = api.parse
+
+    def parse(src, options=None, **kwargs):
+        if src == 'broken.xls':
+            raise RuntimeError('boom')
+        return real_parse(src, options, **kwargs)
+
+    monkeypatch.setattr(api, 'parse', parse)
+    entries = [ManifestEntry('broken.xls', 'a'), ManifestEntry(str(elitech_upload), 'b')]
+    out = io.BytesIO()
+    summary = run_manifest(entries, ParseOptions(), out, jobs=1)
+    assert summary['failed'] == 1 and summary['rows'] > 1000
+    done = {r['done']['file']: r['done'] for r in map(json.loads, out.getvalue().splitlines()) if 'done' in r}
+    assert done['a']['error'] == 'RuntimeError: boom' and done['a']['code'] == 1
+    assert done['b']['rows'] == summary['rows']
+
+
+def test_workers_are_spawned_not_forked(elitech_upload, monkeypatch):
+    from qtparser import manifest
+    contexts = []
+    real_pool = manifest.ProcessPoolExecutor
+
+    def pool(*args, **kwargs):
+        contexts.append(kwargs.get('mp_context'))
+        return real_pool(*args, **kwargs)
+
+    monkeypatch.setattr(manifest, 'ProcessPoolExecutor', pool)
+    entries = [ManifestEntry(str(elitech_upload), 'a'), ManifestEntry(str(elitech_upload), 'b')]
+    out = io.BytesIO()
+    summary = run_manifest(entries, ParseOptions(), out, jobs=2, events=True)
+    assert [c.get_start_method() for c in contexts] == ['spawn']
+    assert summary['failed'] == 0 and summary['rows'] > 2000
@@ -0,0 +1,83 @@
+import sys
+
+import numpy as np
+import pytest
+
+from qtparser.batch import RowBatch
+from qtparser.errors import ParseError
+from qtparser.pg_sink import SinkTarget, accepted_rows, connect, copy_lines, copy_text, libpq_dsn, load_rows
+
+
+def _batch(stamps, temperature, humidity=None, channel=None):
+    ts = np.array(stamps, dtype='datetime64[ns]')
+    humidity = np.full(len(ts), np.nan) if humidity is None else np.asarray(humidity, dtype=float)
+    return RowBatch(ts, np.asarray(temperature, dtype=float), humidity,
+                    None if channel is None else np.array(channel, dtype=object))
+
+
+def test_prisma_url_becomes_a_libpq_dsn():
+    conninfo, schema = libpq_dsn('postgresql://u:p@db:5432/qtm?schema=app&connection_limit=5&sslmode=require')
+    assert (conninfo, schema) == ('postgresql://u:p@db:5432/qtm?sslmode=require', 'app')
+    assert libpq_dsn('host=db dbname=qtm') == ('host=db dbname=qtm', None)
+
+
+def test_copy_lines_number_and_escape_the_accepted_rows():
+    batch = _batch(['2025-03-01T00:00:00.123456', 'NaT', '2025-03-01T00:01:00', '2025-03-01T00:02:00'],
+                   [4.5, 5.0, 200.0, -0.5], [61.0, np.nan, np.nan, np.nan])
+    mask, no_ts, bad_temp = accepted_rows(batch)
+    assert (mask.tolist(), no_ts, bad_temp) == ([True, False, False, True], 1, 1)
+    target = SinkTarget(dsn='', file_name='f.xls', sensor_id='a\tb')
+    lines = copy_lines(batch, mask, 11, target, {})
+    # Milissegundos truncados, umidade ausente como \N, rowNumber pela posição no arquivo
+    assert lines == 'a\\tb\t2025-03-01T00:00:00.123\t4.5\t61.0\t11\na\\tb\t2025-03-01T00:02:00.000\t-0.5\t\\N\t14\n'
+    assert copy_lines(batch, np.zeros(4, dtype=bool), 1, target, {}) == ''
+    assert copy_text('x\\y\nz\r') == 'x\\\\y\\nz\\r'
+
+
+def test_copy_lines_map_channels_to_sensors():
+    batch = _batch(['2025-03-01T00:00:00'] * 3, [1.0, 2.0, 3.0], channel=['1', '2', '3'])
+    target = SinkTarget(dsn='', file_name='f.xls', channel_sensors={'1': 'S1', '2': 'S2'})
+    owners = [line.split('\t')[0] for line in copy_lines(batch, np.ones(3, dtype=bool), 1, target, {}).splitlines()]
+    assert owners == ['S1', 'S2', 'unknown']
+
+
+def test_missing_psycopg_is_code_5(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'psycopg', None)
+    with pytest.raises(ParseError) as e:
+        connect('postgresql://localhost/qtm')
+    assert e.value.code == 5
+
+
+def test_unreachable_database_is_code_7():
+    pytest.importorskip('psycopg')
+    with pytest.raises(ParseError) as e:
+        connect('postgresql://nobody@/qtm?host=/nonexistent&connect_timeout=1')
+    assert e.value.code == 7
+
+
+def test_load_counts_inserted_duplicate_failed_and_unknown(pg_conn, pg_sensor):
+    stamps = [f'2025-03-01T00:0{i}:00' for i in range(5)]
+    batch = _batch(stamps[:4] + ['NaT'], [4.0, 5.0, 6.0, 150.0, 7.0], [60.0, np.nan, 62.0, 63.0, 64.0])
+    target = SinkTarget(dsn='', file_name='sink-test.xls', sensor_id=pg_sensor)
+    first = load_rows(pg_conn, [batch], target)
+    assert {k: first[k] for k in ('rows', 'inserted', 'duplicates', 'failed', 'noTimestamp', 'badTemperature')} == \
+        {'rows': 5, 'inserted': 3, 'duplicates': 0, 'failed': 2, 'noTimestamp': 1, 'badTemperature': 1}
+    stored = pg_conn.execute(
+        'SELECT "rowNumber", temperature, humidity, "parserVersion" FROM sensor_data '
+        'WHERE "sensorId" = %s AND "fileName" = %s ORDER BY "rowNumber"', (pg_sensor, 'sink-test.xls')).fetchall()
+    assert [r[:3] for r in stored] == [(1, 4.0, 60.0), (2, 5.0, None), (3, 6.0, 62.0)]
+    assert all(r[3] for r in stored)
+
+    # Mesmo arquivo de novo: nada inserido; sensor inexistente conta como falha
+    again = load_rows(pg_conn, [batch], target)
+    assert (again['inserted'], again['duplicates']) == (0, 3)
+    unknown = load_rows(pg_conn, [batch], SinkTarget(dsn='', file_name='sink-test.xls', sensor_id='no-such-sensor'))
+    assert (unknown['inserted'], unknown['unknownSensor'], unknown['failed']) == (0, 3, 5)
+
+
+def test_database_errors_are_code_7(pg_conn):
+    conn = connect(pg_conn.info.dsn)
+    conn.close()
+    with pytest.raises(ParseError) as e:
+        load_rows(conn, [_batch(['2025-03-01T00:00:00'], [4.0])], SinkTarget(dsn='', file_name='f.xls'))
+    assert e.value.code == 7
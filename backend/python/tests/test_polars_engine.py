@@ -0,0 +1,80 @@
+import sys
+
+import pandas as pd
+import pytest
+
+from qtparser.compare import compare_file
+from qtparser.options import ParseOptions
+
+pytest.importorskip('polars')
+
+BASE = ParseOptions(lean=False)
+
+
+def test_engines_agree_on_elitech_export(elitech_upload):
+    result = compare_file(str(elitech_upload), BASE)
+    assert result['engine'] == 'polars'
+    assert result['same']
+
+
+def test_engines_agree_on_plain_sheet(tmp_path):
+    path = tmp_path / 'plain.xlsx'
+    pd.DataFrame({
+        'Data/Hora': ['2025-03-01 00:00:00', '2025-03-01 00:05:00', '2025-03-01 00:10:00'],
+        'Temperatura(°C)': ['4,5', '5.0', 'x'],
+        'Umidade(%RH)': [60, 61, 62],
+    }).to_excel(path, index=False, sheet_name='Dados')
+    result = compare_file(str(path), BASE)
+    assert result['engine'] == 'polars'
+    assert result['same']
+
+
+def test_rows_needing_rescue_fall_back_to_pandas(tmp_path):
+    # Linha com leitura e sem timestamp: o resgate linha a linha fica no pandas
+    path = tmp_path / 'rescue.xlsx'
+    pd.DataFrame({
+        'Data/Hora': ['2025-03-01 00:00:00', None, '2025-03-01 00:10:00'],
+        'Temperatura(°C)': [4.5, 5.0, 6.0],
+    }).to_excel(path, index=False, sheet_name='Dados')
+    result = compare_file(str(path), BASE)
+    assert result['engine'] == 'pandas'
+    assert result['fallback'] == 'rows without timestamp'
+    assert result['same']
+
+
+T = ['2025-03-01 00:00:00', '2025-03-01 00:05:00', '2025-03-01 00:10:00']
+TEMPS = [4.5, 5.0, 6.0]
+
+# Planilhas fora do escopo do Polars: o pandas decodifica e a saída tem de ser a mesma
+FALLBACKS = {
+    'multi-probe sheet': {'Dados': {'Data/Hora': T, 'Temperatura 1': TEMPS, 'Temperatura 2': [7.0, 8.0, 9.0]}},
+    'date column needs dayfirst inference': {
+        'Dados': {'Data': ['01/03/2025', '01/03/2025', '02/03/2025'], 'Hora': ['00:00', '00:05', '00:10'], 'Temperatura': TEMPS},
+    },
+    'Excel serial timestamps': {'Dados': {'Data/Hora': [45717.0, 45717.25, 45717.5], 'Temperatura': TEMPS}},
+    'timestamps need inference': {
+        'Dados': {'Data/Hora': ['2025-03-01 00:00:00', '01/03/2025 00:05', '2025-03-01 00:10:00'], 'Temperatura': TEMPS},
+    },
+    'both datetime and time columns': {'Dados': {'Data/Hora': T, 'Hora': ['00:00:00', '00:05:00', '00:10:00'], 'Temperatura': TEMPS}},
+    'Lista fastpaths may pick another column': {'Lista': {'Data/Hora': T, 'Temperatura': TEMPS}},
+    "sheet 'B' may compete": {'A': {'Data/Hora': T, 'Temperatura': TEMPS}, 'B': {'Data/Hora': T[:2], 'Temperatura': [7.0, 8.0]}},
+    'no candidate sheet': {'Dados': {'Valor': [1, 2], 'Outro': [3, 4]}},
+}
+
+
+@pytest.mark.parametrize('reason', FALLBACKS)
+def test_fallback_paths_match_pandas(tmp_path, reason):
+    path = tmp_path / 'fallback.xlsx'
+    with pd.ExcelWriter(path) as writer:
+        for name, columns in FALLBACKS[reason].items():
+            pd.DataFrame(columns).to_excel(writer, index=False, sheet_name=name)
+    result = compare_file(str(path), BASE)
+    assert (result['engine'], result['fallback']) == ('pandas', reason)
+    assert result['same']
+
+
+def test_missing_polars_falls_back_to_pandas(elitech_upload, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'polars', None)
+    result = compare_file(str(elitech_upload), BASE)
+    assert (result['engine'], result['fallback']) == ('pandas', 'polars not installed')
+    assert result['same']
@@ -0,0 +1,13 @@
+from qtparser import api
+from qtparser.options import ParseOptions
+
+
+def test_scan_reads_xlsx_named_xls(elitech_upload):
+    assert elitech_upload.read_bytes()[:2] == b'PK'
+    scan = api.scan(str(elitech_upload), ParseOptions())
+    assert scan['sheet'] == 'Lista'
+    assert {'time', 'temperature', 'humidity'} <= set(scan['mapping'].values())
+    # A contagem vem das linhas lidas, não da dimensão A1:A1 gravada no arquivo
+    assert scan['rowCount'] > 1000
+    assert scan['timeRange']['start'] < scan['timeRange']['end']
+    assert scan['preview'][0]['temperature'] is not None
@@ -0,0 +1,95 @@
+import json
+import math
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+PYTHON_DIR = Path(__file__).resolve().parents[1]
+LIMITS = {'temperatureRange': {'min': 20, 'max': 35}, 'humidityRange': {'max': 70}}
+
+
+def _run(*args):
+    result = subprocess.run([sys.executable, '-m', 'qtparser', *map(str, args)], cwd=PYTHON_DIR,
+                            capture_output=True, text=True, check=True)
+    return [json.loads(line) for line in result.stdout.splitlines()]
+
+
+def _removed_rows(records):
+    """rowNumbers dropped by --validate (the ranges covered by the skip records)."""
+    removed, row = [], 0
+    for r in records:
+        if 'skip' in r:
+            removed.extend(range(row + 1, row + r['skip'] + 1))
+            row += r['skip']
+        elif 'timestamp' in r:
+            row += 1
+    return removed
+
+
+def _reason(r):
+    # Regras de pushRow no Node, escritas de novo aqui de propósito
+    if r['timestamp'] is None:
+        return 'no-timestamp'
+    t = r['temperature']
+    if t is None or not LIMITS['temperatureRange']['min'] <= t <= LIMITS['temperatureRange']['max']:
+        return 'bad-temperature'
+    if r['humidity'] is not None and r['humidity'] > LIMITS['humidityRange']['max']:
+        return 'bad-humidity'
+    return None
+
+
+def test_sidecar_matches_rows_removed_by_validate(elitech_upload, tmp_path):
+    sidecar = tmp_path / 'rejects.ndjson'
+    full = _run(elitech_upload)
+    validated = _run(elitech_upload, '--validate', '--limits', json.dumps(LIMITS),
+                     '--rejects', sidecar, '--rejects-limit', len(full))
+    rejects = [json.loads(line) for line in sidecar.read_text(encoding='utf-8').splitlines()]
+
+    expected = {i + 1: _reason(r) for i, r in enumerate(full) if _reason(r)}
+    assert {'bad-temperature', 'bad-humidity'} <= set(expected.values())
+    assert [r['row'] for r in rejects] == _removed_rows(validated) == sorted(expected)
+    assert {r['row']: r['reason'] for r in rejects} == expected
+    assert validated[-1]['validation']['rejected'] == len(rejects)
+    for r in rejects:
+        assert r['sourceRow'] == r['row'] - 1
+        assert r['temperature'] == full[r['row'] - 1]['temperature']
+        cell = next(v for k, v in r['raw'].items() if 'temper' in k.lower())
+        assert math.isclose(float(cell.replace(',', '.')), r['temperature'])
+
+
+def test_sidecar_reports_rescue_and_raw_cells(tmp_path):
+    path = tmp_path / 'rescue.xlsx'
+    pd.DataFrame({
+        'Data/Hora': ['2025-03-01 00:00:00', 'lixo', '2025-03-01 00:10:00', '2025-03-01 00:15:00'],
+        'Temperatura(°C)': [4.5, 5.0, '--', 6.0],
+    }).to_excel(path, index=False, sheet_name='Dados')
+    sidecar = tmp_path / 'rejects.ndjson'
+    validated = _run(path, '--validate', '--rejects', sidecar)
+    rejects = [json.loads(line) for line in sidecar.read_text(encoding='utf-8').splitlines()]
+    assert _removed_rows(validated) == [2, 3]
+    assert [(r['row'], r['sourceRow'], r['reason'], r['strategy']) for r in rejects] == [
+        (2, 1, 'no-timestamp', 'full+rescue'),
+        (3, 2, 'bad-temperature', 'full'),
+    ]
+    assert rejects[0]['raw']['Data/Hora'] == 'lixo'
+    assert rejects[1]['raw']['Temperatura(°C)'] == '--'
+
+
+def test_sidecar_is_capped(elitech_upload, tmp_path):
+    sidecar = tmp_path / 'rejects.ndjson'
+    validated = _run(elitech_upload, '--validate', '--limits', json.dumps(LIMITS),
+                     '--rejects', sidecar, '--rejects-limit', 10)
+    rows = [json.loads(line)['row'] for line in sidecar.read_text(encoding='utf-8').splitlines()]
+    assert rows == _removed_rows(validated)[:10]
+    assert validated[-1]['validation']['rejected'] > 10
+
+
+
+def test_cli_startup_loads_no_numeric_modules():
+    # --rejects-limit vem de options: importar o CLI não pode puxar numpy/pandas
+    code = ('import sys, qtparser.cli; '
+            'print([m for m in ("numpy", "pandas", "pyarrow", "polars", "xlrd", "openpyxl") if m in sys.modules])')
+    result = subprocess.run([sys.executable, '-c', code], cwd=PYTHON_DIR, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from qtparser import api, engine
+from qtparser.detect import parse_with_formats, to_numeric_clean
+from qtparser.options import ParseOptions
+from qtparser.shard import Sharder
+from qtparser.source import WorkbookSource
+
+ISO = '%Y-%m-%d %H:%M:%S'
+BR = '%d/%m/%Y %H:%M'
+
+
+@pytest.fixture(scope='module')
+def sharder():
+    # Quatro faixas mesmo em colunas pequenas
+    return Sharder(workers=4, min_rows=1)
+
+
+def test_applies_only_to_big_columns_with_several_workers():
+    assert Sharder(workers=4, min_rows=100).applies(100)
+    assert not Sharder(workers=4, min_rows=100).applies(99)
+    assert not Sharder(workers=1, min_rows=1).applies(10 ** 6)
+
+
+def test_formats_match_the_serial_parse(sharder):
+    # ISO vence no total, mas a última faixa é toda dd/mm: ela é refeita com o formato escolhido
+    values = pd.Series(['2025-03-01 00:00:00'] * 9 + ['', None] + ['01/03/2025 00:10'] * 5, index=range(100, 116))
+    expected = parse_with_formats(values, [BR, ISO])
+    result = sharder.parse_with_formats(values, [BR, ISO])
+    pd.testing.assert_series_equal(result, expected, check_names=False)
+    assert int(result.notna().sum()) == 9
+
+
+def test_a_format_that_raises_is_skipped_everywhere(sharder):
+    values = pd.Series(['2025-03-01 00:00:00', '2025-03-01 00:05:00', 'x', '2025-03-01 00:15:00'])
+    result = sharder.parse_with_formats(values, ['%Q', ISO])
+    pd.testing.assert_series_equal(result, parse_with_formats(values, ['%Q', ISO]), check_names=False)
+
+
+def test_no_format_parsing_anything_gives_none(sharder):
+    assert sharder.parse_with_formats(pd.Series(['a', 'b', 'c', 'd', 'e']), [ISO, BR]) is None
+
+
+def test_nul_in_the_text_falls_back_to_one_process(sharder):
+    values = pd.Series(['2025-03-01 00:00:00', 'a\x00b', '2025-03-01 00:10:00', '2025-03-01 00:15:00'])
+    pd.testing.assert_series_equal(sharder.parse_with_formats(values, [ISO]), parse_with_formats(values, [ISO]),
+                                   check_names=False)
+    col = pd.Series(['1,5', '2\x00', '-3', 'x'])
+    pd.testing.assert_series_equal(sharder.to_numeric_clean(col), to_numeric_clean(col))
+
+
+def test_numeric_cleanup_matches_the_serial_one(sharder):
+    col = pd.Series(['4,5', ' 5.0 °C', None, '-0,25', 'x', '1e3', '+7', '', '12.5.1'], index=range(10, 19))
+    result = sharder.to_numeric_clean(col)
+    pd.testing.assert_series_equal(result, to_numeric_clean(col))
+    assert result.dtype == np.float64
+
+
+def test_sharded_parse_of_an_export_matches_one_process(elitech_upload):
+    def rows(options):
+        batches = list(api.parse(str(elitech_upload), options))
+        return tuple(np.concatenate([getattr(b, f) for b in batches]) for f in ('timestamp', 'temperature', 'humidity'))
+
+    serial = rows(ParseOptions(lean=False, shard_workers=1))
+    sharded = rows(ParseOptions(lean=False, shard_workers=3, shard_min_rows=1))
+    for a, b in zip(serial, sharded):
+        np.testing.assert_array_equal(a, b)
+
+
+def _stamps(n):
+    return pd.date_range('2025-03-01', periods=n, freq='5min').strftime(ISO).tolist()
+
+
+# Em ordem do arquivo: B vence A no desempate por timestamps; C empata com A e perde pela ordem
+SHEETS = {
+    'Resumo': pd.DataFrame({'Campo': ['Modelo', 'Serie', 'Inicio', 'Fim', 'Intervalo'], 'Valor': list('abcde')}),
+    'A': pd.DataFrame({'Data/Hora': _stamps(20), 'Temperatura': np.linspace(2, 8, 20)}),
+    'B': pd.DataFrame({'Data/Hora': _stamps(30), 'Temperatura': [4.5] * 20 + ['x'] * 10}),
+    'C': pd.DataFrame({'Data/Hora': _stamps(20), 'Temperatura': np.linspace(2, 8, 20)}),
+    'D': pd.DataFrame({'Data/Hora': _stamps(3), 'Temperatura': [1.0, 2.0, 3.0]}),
+}
+
+
+@pytest.fixture(scope='module')
+def workbook(tmp_path_factory):
+    path = tmp_path_factory.mktemp('sheets') / 'sheets.xlsx'
+    with pd.ExcelWriter(path) as writer:
+        for name, df in SHEETS.items():
+            df.to_excel(writer, index=False, sheet_name=name)
+    source = WorkbookSource(str(path))
+    return source, source.read_sheets()
+
+
+@pytest.mark.parametrize('workers', [2, 4])
+def test_parallel_sheet_scoring_chooses_like_one_thread(workbook, workers):
+    source, sheets = workbook
+    serial = engine.choose_sheet(source, sheets, workers=1)
+    parallel = engine.choose_sheet(source, sheets, workers=workers)
+    assert (serial.name, serial.temp_count, serial.ts_count) == ('B', 20, 30)
+    assert (parallel.name, parallel.temp_count, parallel.ts_count) == (serial.name, serial.temp_count, serial.ts_count)
+    pd.testing.assert_frame_equal(parallel.df, serial.df)
+    pd.testing.assert_series_equal(parallel.ts, serial.ts)
+
+
+def test_tie_goes_to_the_first_sheet_of_the_workbook(workbook):
+    source, sheets = workbook
+    for workers in (1, 4):
+        assert engine.choose_sheet(source, {k: sheets[k] for k in ('C', 'A', 'D')}, workers=workers).name == 'C'
+
+
+def test_sheets_too_small_to_win_are_not_scored(workbook, monkeypatch):
+    source, sheets = workbook
+    scored = []
+    evaluate = engine.evaluate_sheet
+
+    def spy(source, name, *args):
+        scored.append(name)
+        return evaluate(source, name, *args)
+
+    monkeypatch.setattr(engine, 'evaluate_sheet', spy)
+    # Maior primeiro: depois de B (20 leituras) Resumo e D, de 5 e 3 linhas, nem são avaliadas
+    assert engine.choose_sheet(source, sheets, workers=1).name == 'B'
+    assert scored == ['B', 'A', 'C']
+
+
+def test_beaten_sheet_is_abandoned_before_header_autodetect(workbook, monkeypatch):
+    source, sheets = workbook
+    reread = []
+    monkeypatch.setattr(source, 'read_raw', lambda name: reread.append(name))
+    # Resumo não tem temperaturas: só o autodetect de cabeçalho poderia salvá-la
+    assert engine.evaluate_sheet(source, 'Resumo', sheets['Resumo'], beaten=lambda: True) is None
+    assert reread == []
+    engine.evaluate_sheet(source, 'Resumo', sheets['Resumo'], beaten=lambda: False)
+    assert reread == ['Resumo']
@@ -0,0 +1,75 @@
+import json
+
+import numpy as np
+import pytest
+
+from qtparser.batch import RowBatch
+from qtparser.errors import ParseError
+from qtparser.validity import (BAD_HUMIDITY, BAD_TEMPERATURE, NO_TIMESTAMP, OK, Limits, Tally, check,
+                               valid_lines)
+
+T = np.datetime64('2025-03-01T00:00:00', 'ns')
+NAT = np.datetime64('NaT', 'ns')
+
+
+def _batch(temperature, humidity=None, timestamp=None):
+    n = len(temperature)
+    ts = np.array([T + np.timedelta64(i, 'm') for i in range(n)]) if timestamp is None else np.array(timestamp)
+    hum = np.full(n, np.nan) if humidity is None else np.asarray(humidity, dtype=float)
+    return RowBatch(ts.astype('datetime64[ns]'), np.asarray(temperature, dtype=float), hum)
+
+
+def test_temperature_limits_are_inclusive():
+    codes = check(_batch([-80.0, 120.0, -80.01, 120.01, np.nan, np.inf]))
+    assert codes.tolist() == [OK, OK, BAD_TEMPERATURE, BAD_TEMPERATURE, BAD_TEMPERATURE, BAD_TEMPERATURE]
+
+
+def test_custom_temperature_limits():
+    limits = Limits(temp_min=-40.0, temp_max=85.0)
+    assert check(_batch([-40.0, 85.0, -40.5, 85.5]), limits).tolist() == [OK, OK, BAD_TEMPERATURE, BAD_TEMPERATURE]
+
+
+def test_missing_timestamp_wins_over_other_reasons():
+    batch = _batch([5.0, np.nan, 500.0], humidity=[200.0, 50.0, 50.0], timestamp=[NAT, NAT, T])
+    codes = check(batch, Limits(hum_min=0.0, hum_max=100.0))
+    assert codes.tolist() == [NO_TIMESTAMP, NO_TIMESTAMP, BAD_TEMPERATURE]
+
+
+def test_humidity_only_checked_with_a_range():
+    batch = _batch([5.0] * 5, humidity=[0.0, 100.0, -0.1, 100.1, np.nan])
+    assert (check(batch) == OK).all()
+    codes = check(batch, Limits(hum_min=0.0, hum_max=100.0))
+    # Umidade ausente continua válida (vira null)
+    assert codes.tolist() == [OK, OK, BAD_HUMIDITY, BAD_HUMIDITY, OK]
+    assert check(batch, Limits(hum_max=100.0)).tolist() == [OK, OK, OK, BAD_HUMIDITY, OK]
+
+
+def test_limits_from_sensor_type_config():
+    assert Limits.from_config(None) == Limits()
+    limits = Limits.from_config(json.dumps({'temperatureRange': {'min': -40}, 'humidityRange': {'max': 95}}))
+    assert limits == Limits(temp_min=-40.0, temp_max=120.0, hum_min=None, hum_max=95.0)
+    for bad in ('not json', '{"temperatureRange": {"min": "x"}}', '{"temperatureRange": {"min": 10, "max": 0}}'):
+        with pytest.raises(ParseError) as err:
+            Limits.from_config(bad)
+        assert err.value.code == 1
+
+
+def test_rejected_rows_become_skip_records():
+    batch = _batch([1.0, 500.0, 500.0, 2.0, 500.0], timestamp=[T, T, NAT, T, T])
+    records = [json.loads(line) for line in valid_lines(batch, check(batch)).splitlines()]
+    assert [r.get('skip', r.get('temperature')) for r in records] == [1.0, 2, 2.0, 1]
+    all_bad = _batch([500.0, 500.0])
+    assert valid_lines(all_bad, check(all_bad)) == '{"skip": 2}\n'
+
+
+def test_tally_counts_and_sample_lines():
+    tally = Tally()
+    first = _batch([1.0, 500.0])
+    tally.add(first, check(first))
+    second = _batch([2.0, 3.0, np.nan], timestamp=[NAT, T, T])
+    tally.add(second, check(second))
+    summary = tally.summary()
+    assert (summary['rows'], summary['valid'], summary['rejected']) == (5, 2, 3)
+    assert (summary['noTimestamp'], summary['badTemperature'], summary['badHumidity']) == (1, 2, 0)
+    assert [(s['line'], s['reason']) for s in summary['samples']] == [
+        (2, 'bad-temperature'), (3, 'no-timestamp'), (5, 'bad-temperature')]
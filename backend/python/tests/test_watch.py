@@ -0,0 +1,119 @@
+import io
+import types
+
+import pytest
+
+from qtparser import watch
+from qtparser.options import ParseOptions
+
+SETTLE = 5.0
+RETRY = 60.0
+
+
+@pytest.fixture
+def files(monkeypatch):
+    """path -> (size, mtime_ns); a missing key is a deleted file."""
+    states = {}
+    monkeypatch.setattr(watch, 'file_state', states.get)
+    return states
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = types.SimpleNamespace(t=1000.0)
+    monkeypatch.setattr(watch, 'time', types.SimpleNamespace(monotonic=lambda: now.t, time_ns=lambda: 0))
+    return now
+
+
+@pytest.fixture
+def watcher(tmp_path, files, clock):
+    return watch.Watcher([str(tmp_path)], ParseOptions(), '', io.StringIO(), jobs=1, settle=SETTLE, retry=RETRY,
+                         use_inotify=False)
+
+
+def _fail(watcher, path, at):
+    # Como dispatch/collect deixam um arquivo que falhou
+    state, _ = watcher.pending.pop(path)
+    watcher.done[path] = state
+    watcher.failed_at[path] = at
+
+
+def test_file_is_ready_only_after_the_settle_window(watcher, files, clock):
+    files['a.xls'] = (10, 1)
+    watcher.touch('a.xls', clock.t)
+    clock.t += SETTLE - 0.1
+    assert watcher.settled() == []
+    clock.t += 0.1
+    assert watcher.settled() == ['a.xls']
+
+
+def test_a_change_during_the_settle_window_restarts_it(watcher, files, clock):
+    files['a.xls'] = (10, 1)
+    watcher.touch('a.xls', clock.t)
+    clock.t += SETTLE - 1
+    files['a.xls'] = (20, 2)
+    assert watcher.settled() == []
+    clock.t += SETTLE - 0.1
+    assert watcher.settled() == []
+    clock.t += 0.1
+    assert watcher.settled() == ['a.xls']
+
+
+def test_touch_with_the_same_state_keeps_the_window(watcher, files, clock):
+    files['a.xls'] = (10, 1)
+    watcher.touch('a.xls', clock.t)
+    clock.t += SETTLE
+    # Novo evento do inotify sem mudança real
+    watcher.touch('a.xls', clock.t)
+    assert watcher.settled() == ['a.xls']
+
+
+def test_imported_file_is_not_queued_again_until_it_changes(watcher, files, clock):
+    files['a.xls'] = (10, 1)
+    watcher.touch('a.xls', clock.t)
+    watcher.done['a.xls'] = watcher.pending.pop('a.xls')[0]
+    watcher.touch('a.xls', clock.t + RETRY * 2)
+    assert watcher.pending == {}
+    files['a.xls'] = (11, 2)
+    watcher.touch('a.xls', clock.t)
+    assert 'a.xls' in watcher.pending
+
+
+def test_failed_file_is_retried_after_retry_seconds(watcher, files, clock):
+    files['a.xls'] = (10, 1)
+    watcher.touch('a.xls', clock.t)
+    _fail(watcher, 'a.xls', clock.t)
+    watcher.touch('a.xls', clock.t + RETRY - 1)
+    assert watcher.pending == {}
+    watcher.touch('a.xls', clock.t + RETRY)
+    assert 'a.xls' in watcher.pending and 'a.xls' not in watcher.failed_at
+
+
+def test_deleted_file_is_forgotten(watcher, files, clock):
+    files['a.xls'] = (10, 1)
+    files['b.xls'] = (10, 1)
+    watcher.touch('a.xls', clock.t)
+    watcher.touch('b.xls', clock.t)
+    _fail(watcher, 'a.xls', clock.t)
+    del files['a.xls'], files['b.xls']
+    watcher.touch('a.xls', clock.t + 1)
+    assert 'a.xls' not in watcher.failed_at and 'a.xls' not in watcher.done
+    # Sumiu durante a estabilização
+    clock.t += SETTLE
+    assert watcher.settled() == []
+    assert watcher.pending == {}
+
+
+def test_running_file_is_not_ready_again(watcher, files, clock):
+    files['a.xls'] = (10, 1)
+    watcher.touch('a.xls', clock.t)
+    watcher.running[object()] = 'a.xls'
+    clock.t += SETTLE
+    assert watcher.settled() == []
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('export.xls', True), ('EXPORT.XLSX', True), ('~$export.xlsx', False), ('.export.xls', False), ('export.csv', False),
+])
+def test_is_workbook(name, expected):
+    assert watch.is_workbook(f'/data/{name}') is expected
@@ -1,8 +1,12 @@
 import { spawn } from 'child_process';
 import { logger } from '../utils/logger.js';
 import * as fs from 'fs';
+import * as path from 'path';
 import { prisma } from '../lib/prisma.js';
 import { redisService } from './redisService.js';
+import { readArrowBatches, ArrowRecordBatch } from '../utils/arrowIpcReader.js';
+import { readFrames } from '../utils/framedProtocol.js';
+import { pythonJobScheduler } from './pythonJobScheduler.js';
 
 interface FallbackOptions {
   suitcaseId: string;
@@ -13,12 +17,74 @@ interface FallbackOptions {
   fileName: string;
   validationId?: string;
   vendorGuess?: string;
+  // Multi-probe loggers: maps the parser channel id ("1", "2", ...) to a sensor id
+  channelSensorIds?: Record<string, string>;
+  // Full-pipeline engine for this job (default: PYTHON_FALLBACK_ENGINE or 'pandas')
+  engine?: 'pandas' | 'polars';
+  // Re-downloaded logger file: with the Postgres sink, only the rows after what the sensor already has are imported
+  append?: boolean;
 }
 
 export class PythonFallbackService {
   private readonly PYTHON_BIN = process.env.PYTHON_FALLBACK_BIN || 'python3';
   private readonly SCRIPT_PATH = process.env.PYTHON_FALLBACK_SCRIPT || '/app/python/fallback_parser.py';
   private readonly TIMEOUT_MS = Number(process.env.PYTHON_FALLBACK_TIMEOUT_MS || 20000);
+  // Import runs: kill the parser after this long without progress (rows, events, or a heartbeat whose stage/rows moved)
+  private readonly IDLE_TIMEOUT_MS = Number(process.env.PYTHON_FALLBACK_IDLE_TIMEOUT_MS || process.env.PYTHON_FALLBACK_TIMEOUT_MS || 20000);
+  // Hard cap on a whole import run, progress or not (0 = no cap)
+  private readonly MAX_RUN_MS = Number(process.env.PYTHON_FALLBACK_MAX_RUN_MS || 30 * 60 * 1000);
+  // 'ndjson' (default) or 'arrow' (record batches; needs pyarrow in the Python image)
+  private readonly OUTPUT_FORMAT = process.env.PYTHON_FALLBACK_FORMAT || 'ndjson';
+  // NDJSON transport: 'framed' (acknowledged batches, bounded in flight) or 'lines' (plain stdout)
+  private readonly PROTOCOL = process.env.PYTHON_FALLBACK_PROTOCOL || 'framed';
+  private readonly WINDOW = Math.max(1, Number(process.env.PYTHON_FALLBACK_WINDOW || 4));
+  // 'pandas' (default) or 'polars' (plain sheets only, needs polars in the Python image; anything else falls back to pandas)
+  private readonly ENGINE = process.env.PYTHON_FALLBACK_ENGINE || 'pandas';
+  // 'node' (default: rows come back over stdout and are inserted with Prisma) or 'postgres'
+  // (the parser COPYs the rows into sensor_data itself, using DATABASE_URL, and returns a summary)
+  private readonly SINK = process.env.PYTHON_FALLBACK_SINK || 'node';
+  // '1': NDJSON output is validated inside the parser (only valid rows come back, plus one summary)
+  private readonly VALIDATE = process.env.PYTHON_FALLBACK_VALIDATE === '1';
+  // Directory for the rejected-row sidecar of each job (<jobId>.ndjson, written by the parser); unset = off
+  private readonly REJECTS_DIR = process.env.PYTHON_FALLBACK_REJECTS_DIR || '';
+
+  /**
+   * Quick preview of a file without importing it: chosen sheet, columns, row count,
+   * time range, sampling interval and the first normalized rows (python --scan mode).
+   */
+  async scanFile(filePath: string, sheetName?: string): Promise<any> {
+    if (!fs.existsSync(filePath)) {
+      throw new Error('Fallback: file not found');
+    }
+    const ticket = { sizeBytes: fs.statSync(filePath).size, label: filePath };
+    return pythonJobScheduler.run(ticket, () => new Promise((resolve, reject) => {
+      const args = sheetName ? [this.SCRIPT_PATH, filePath, sheetName, '--scan'] : [this.SCRIPT_PATH, filePath, '--scan'];
+      const child = spawn(this.PYTHON_BIN, args, { stdio: ['ignore', 'pipe', 'pipe'] });
+      let stdout = '';
+      let stderr = '';
+      const timer = setTimeout(() => {
+        try { child.kill('SIGKILL'); } catch {}
+        reject(new Error('Python fallback scan timeout'));
+      }, this.TIMEOUT_MS);
+      child.stdout.on('data', chunk => { stdout += chunk.toString(); });
+      child.stderr.on('data', chunk => { stderr += chunk.toString(); });
+      child.on('error', err => {
+        clearTimeout(timer);
+        reject(err);
+      });
+      child.on('close', code => {
+        clearTimeout(timer);
+        try {
+          const obj = JSON.parse(stdout.trim().split(/\r?\n/).pop() || '{}');
+          if (obj.error) return reject(new Error(obj.error));
+          if (code !== 0 || !obj.scan) return reject(new Error(stderr || `Python fallback scan failed with code ${code}`));
+          resolve(obj.scan);
+        } catch (e) {
+          reject(new Error(stderr || 'Python fallback scan returned malformed output'));
+        }
+      });
+    }));
+  }
 
   async processLegacyXls(filePath: string, originalName: string, options: FallbackOptions & { forceSensorId?: string }): Promise<any> {
     if (!fs.existsSync(filePath)) {
@@ -45,11 +111,59 @@ export class PythonFallbackService {
     }
     
     logger.info('Python fallback sheet selection', { vendor: options.vendorGuess, sheetName: sheetName || '(default)' });
+
+    // PYTHON_FALLBACK_VALIDATE: limits of the sensor type (temperatureRange / humidityRange), when the sensor is known
+    let dataConfig: any = null;
+    if (this.VALIDATE && options.forceSensorId) {
+      try {
+        const sensor = await prisma.sensor.findUnique({ where: { id: options.forceSensorId }, select: { type: { select: { dataConfig: true } } } });
+        dataConfig = sensor?.type?.dataConfig ?? null;
+      } catch {}
+    }
+    const limits = {
+      tempMin: Number(dataConfig?.temperatureRange?.min ?? -80),
+      tempMax: Number(dataConfig?.temperatureRange?.max ?? 120),
+      humMin: dataConfig?.humidityRange?.min == null ? null : Number(dataConfig.humidityRange.min),
+      humMax: dataConfig?.humidityRange?.max == null ? null : Number(dataConfig.humidityRange.max),
+    };
     
-    return new Promise((resolve, reject) => {
+    // Global limit, small files first and per-user fairness across concurrent uploads
+    const ticket = { sizeBytes: fs.statSync(filePath).size, userId: options.userId, jobId: options.jobId, label: originalName };
+    return pythonJobScheduler.run(ticket, slot => new Promise((resolve, reject) => {
       const start = Date.now();
       const args = sheetName ? [this.SCRIPT_PATH, filePath, sheetName] : [this.SCRIPT_PATH, filePath];
-      const child = spawn(this.PYTHON_BIN, args, { stdio: ['ignore', 'pipe', 'pipe'] });
+      // Structured JSON-lines events on stderr (stages, strategy, counts, heartbeats)
+      args.push('--events');
+      if (options.channelSensorIds && Object.keys(options.channelSensorIds).length > 0) {
+        args.push('--channels');
+      }
+      const useSink = this.SINK === 'postgres';
+      const useArrow = !useSink && this.OUTPUT_FORMAT === 'arrow';
+      const useFramed = !useSink && !useArrow && this.PROTOCOL === 'framed';
+      if (useSink) {
+        args.push('--sink', 'postgres', '--progress', '--file-name', options.fileName);
+        if (options.forceSensorId) {
+          args.push('--sensor-id', options.forceSensorId);
+          if (options.append) args.push('--append');
+        }
+        if (options.validationId) args.push('--validation-id', options.validationId);
+        if (options.channelSensorIds) args.push('--channel-sensors', JSON.stringify(options.channelSensorIds));
+      } else if (useArrow) args.push('--format', 'arrow');
+      else if (useFramed) args.push('--framed', '--window', String(this.WINDOW));
+      else args.push('--progress');
+      if (this.VALIDATE && !useSink && !useArrow) args.push('--validate');
+      if (this.REJECTS_DIR) args.push('--rejects', path.join(this.REJECTS_DIR, `${options.jobId}.ndjson`));
+      // Same limits as pushRow (the sink keeps its defaults)
+      if (dataConfig && !useSink && args.some(a => a === '--validate' || a === '--rejects')) args.push('--limits', JSON.stringify(dataConfig));
+      const engine = options.engine || this.ENGINE;
+      if (engine !== 'pandas') args.push('--engine', engine);
+      if (sheetName && options.vendorGuess) {
+        // Known vendor layout: let the parser take its lean (no pandas) path regardless of file size
+        args.push('--vendor', options.vendorGuess.toLowerCase());
+      }
+      const child = spawn(this.PYTHON_BIN, args, { stdio: [useFramed ? 'pipe' : 'ignore', 'pipe', 'pipe'] });
+      // ACKs written after the parser exited must not crash the process
+      child.stdin?.on('error', () => {});
       const rows: any[] = [];
       let stderr = '';
       let resolved = false;
@@ -57,101 +171,345 @@ export class PythonFallbackService {
       let failedLines = 0;
       let failNoTimestamp = 0;
       let failBadTemperature = 0;
+      let failBadHumidity = 0;
       const failSamples: Array<{ timestamp?: any; temperature?: any; humidity?: any; reason: string; line: number }>=[];
       const batch: any[] = [];
       const BATCH_SIZE = Math.min(options.chunkSize || 500, 1000);
 
-      const timer = setTimeout(() => {
-        if (!resolved) {
-          resolved = true;
-          try { child.kill('SIGKILL'); } catch {}
-          reject(new Error('Python fallback timeout'));
-        }
-      }, this.TIMEOUT_MS);
+      // Inactivity timeout: re-armed by output and by events that show progress. A heartbeat only
+      // counts when its stage or row count moved, so a parser stuck in a loop (or blocked on its
+      // ACK window) is killed even though its heartbeat thread keeps writing; MAX_RUN_MS caps the run
+      let timer: NodeJS.Timeout | undefined;
+      let runTimer: NodeJS.Timeout | undefined;
+      let lastBeat: string | undefined;
+      const abort = (message: string, meta: Record<string, any>) => {
+        if (resolved) return;
+        resolved = true;
+        clearTimeout(timer);
+        clearTimeout(runTimer);
+        try { child.kill('SIGKILL'); } catch {}
+        logger.error(message, { originalName, stage: metrics.lastStage, ...meta });
+        reportProgress('failed').then(() => reject(new Error('Python fallback timeout')));
+      };
+      const armTimer = () => {
+        clearTimeout(timer);
+        timer = setTimeout(() => abort('Python fallback idle timeout', { idleMs: this.IDLE_TIMEOUT_MS }), this.IDLE_TIMEOUT_MS);
+      };
+      if (this.MAX_RUN_MS > 0) {
+        runTimer = setTimeout(() => abort('Python fallback run time limit', { maxRunMs: this.MAX_RUN_MS }), this.MAX_RUN_MS);
+      }
 
-      child.stdout.on('data', async chunk => {
-        const text = chunk.toString();
-        for (const line of text.split(/\r?\n/)) {
-          if (!line.trim()) continue;
-          try {
-            const obj = JSON.parse(line);
-            if (obj.error) {
-              failedLines++;
-              continue;
-            }
-            totalLines++;
-            const sensorId = options.forceSensorId || 'unknown';
-            const timestampStr = obj.timestamp;
-            let timestamp: Date | null = null;
-            if (timestampStr) {
-              const d = new Date(timestampStr);
-              if (!isNaN(d.getTime())) timestamp = d; else timestamp = null;
-            }
-            const temperature = typeof obj.temperature === 'number' ? obj.temperature : parseFloat(String(obj.temperature));
-            const humidity = obj.humidity == null ? null : (typeof obj.humidity === 'number' ? obj.humidity : parseFloat(String(obj.humidity)));
-            // Basic validations
-            if (timestamp && !isNaN(temperature) && temperature >= -80 && temperature <= 120) {
-              batch.push({
-                sensorId,
-                timestamp,
-                temperature,
-                humidity: humidity == null || isNaN(humidity) ? null : humidity,
-                fileName: options.fileName,
-                rowNumber: totalLines,
-                validationId: options.validationId ?? null,
-                createdAt: new Date()
-              });
-            } else {
-              failedLines++;
-              if (!timestamp) {
-                failNoTimestamp++;
-                if (failSamples.length < 5) {
-                  failSamples.push({ timestamp: obj.timestamp, temperature: obj.temperature, humidity: obj.humidity, reason: 'no-timestamp', line: totalLines });
-                }
-              } else if (isNaN(temperature) || temperature < -80 || temperature > 120) {
-                failBadTemperature++;
-                if (failSamples.length < 5) {
-                  failSamples.push({ timestamp: obj.timestamp, temperature: obj.temperature, humidity: obj.humidity, reason: 'bad-temperature', line: totalLines });
-                }
-              }
+      // Aggregated parser events, logged once at the end instead of line by line
+      const metrics: {
+        stagesMs: Record<string, number>;
+        strategy?: string;
+        sheet?: string;
+        counts: Record<string, number>;
+        warnings: string[];
+        heartbeats: number;
+        lastStage?: string | null;
+        rejects?: { path: string; rows: number; rejected: number };
+      } = { stagesMs: {}, counts: {}, warnings: [], heartbeats: 0 };
+      const handleEvent = (ev: any) => {
+        if (ev.event !== 'heartbeat') armTimer();
+        switch (ev.event) {
+          case 'stage':
+            metrics.lastStage = ev.stage;
+            if (ev.status !== 'start') metrics.stagesMs[ev.stage] = (metrics.stagesMs[ev.stage] || 0) + (ev.ms || 0);
+            break;
+          case 'strategy':
+            metrics.strategy = ev.decoder;
+            if (ev.sheet) metrics.sheet = ev.sheet;
+            break;
+          case 'sheet':
+            metrics.sheet = ev.sheet;
+            break;
+          case 'counts':
+            for (const [k, v] of Object.entries(ev)) {
+              if (typeof v === 'number' && k !== 't') metrics.counts[k] = v;
             }
-            if (batch.length >= BATCH_SIZE) {
-              try {
-                await prisma.sensorData.createMany({ data: batch, skipDuplicates: true });
-              } catch (dbErr) {
-                logger.error('Python fallback batch insert error', { message: (dbErr as any)?.message });
-                failedLines += batch.length;
-              }
-              batch.length = 0;
-              // progress update
-              try {
-                await redisService.set(`job:progress:${options.jobId}`, { processed: totalLines, failed: failedLines }, 3600);
-              } catch {}
+            break;
+          case 'warning':
+            if (metrics.warnings.length < 20) metrics.warnings.push(ev.message);
+            break;
+          case 'heartbeat': {
+            metrics.heartbeats++;
+            metrics.lastStage = ev.stage;
+            const beat = `${ev.stage}:${ev.rows}`;
+            if (beat !== lastBeat) {
+              lastBeat = beat;
+              armTimer();
             }
-          } catch (e) {
-            // ignore malformed line
+            break;
           }
+          case 'error':
+            metrics.warnings.push(`error: ${ev.message}`);
+            break;
+          case 'rejects':
+            metrics.rejects = { path: ev.path, rows: ev.rows, rejected: ev.rejected };
+            break;
         }
-      });
+      };
+      armTimer();
 
-      child.stderr.on('data', chunk => {
-        const text = chunk.toString();
-        stderr += text;
-        // Log linhas de debug do script Python mesmo em sucesso
+      // Rows arrive while Python is still parsing: insert as they come, pausing the pipe
+      // while a batch is written so a slow database applies backpressure to the parser.
+      let parsedRows = 0;
+      let parseTotal: number | null = null;
+      let carry = '';
+      let pending: Promise<void> = Promise.resolve();
+
+      const flushBatch = async () => {
+        if (!batch.length) return;
         try {
-          for (const line of text.split(/\r?\n/)) {
-            if (!line.trim()) continue;
-            if (line.includes('DEBUG')) {
-              logger.info('Python fallback debug', { line });
+          await prisma.sensorData.createMany({ data: batch, skipDuplicates: true });
+        } catch (dbErr) {
+          logger.error('Python fallback batch insert error', { message: (dbErr as any)?.message });
+          failedLines += batch.length;
+        }
+        batch.length = 0;
+      };
+
+      const reportProgress = async (state: 'running' | 'completed' | 'failed' = 'running') => {
+        try {
+          await redisService.set(`job:progress:${options.jobId}`, {
+            state,
+            processed: totalLines,
+            failed: failedLines,
+            parsed: parsedRows,
+            total: parseTotal,
+            queueWaitMs: slot.queueWaitMs,
+            runMs: Date.now() - start,
+          }, 3600);
+        } catch {}
+      };
+
+      // Count a rejected row by reason, keeping the first few as samples
+      const recordFailure = (reason: 'no-timestamp' | 'bad-temperature' | 'bad-humidity', raw: any, line: number) => {
+        failedLines++;
+        if (reason === 'no-timestamp') failNoTimestamp++;
+        else if (reason === 'bad-temperature') failBadTemperature++;
+        else failBadHumidity++;
+        if (failSamples.length < 5) {
+          failSamples.push({ timestamp: raw.timestamp, temperature: raw.temperature, humidity: raw.humidity, reason, line });
+        }
+      };
+
+      // Validate one parsed row and queue it for createMany
+      const pushRow = (timestamp: Date | null, temperature: number, humidity: number | null, channel: string | null | undefined, raw: any) => {
+        totalLines++;
+        const sensorId = (channel != null && options.channelSensorIds?.[channel]) || options.forceSensorId || 'unknown';
+        // Basic validations (same rules as qtparser.validity)
+        const badHumidity = humidity != null && ((limits.humMin != null && humidity < limits.humMin) || (limits.humMax != null && humidity > limits.humMax));
+        if (timestamp && !isNaN(temperature) && temperature >= limits.tempMin && temperature <= limits.tempMax && !badHumidity) {
+          batch.push({
+            sensorId,
+            timestamp,
+            temperature,
+            humidity: humidity == null || isNaN(humidity) ? null : humidity,
+            fileName: options.fileName,
+            rowNumber: totalLines,
+            validationId: options.validationId ?? null,
+            createdAt: new Date()
+          });
+        } else if (!timestamp) {
+          recordFailure('no-timestamp', raw, totalLines);
+        } else if (isNaN(temperature) || temperature < limits.tempMin || temperature > limits.tempMax) {
+          recordFailure('bad-temperature', raw, totalLines);
+        } else {
+          recordFailure('bad-humidity', raw, totalLines);
+        }
+      };
+
+      // Arrow: same rules as pushRow, read straight from the column arrays (NaN = null);
+      // kept rows go to createMany without building an intermediate row object
+      const pushColumns = async (rb: ArrowRecordBatch) => {
+        const ts = rb.columns.timestamp_ms as Float64Array;
+        const temps = rb.columns.temperature as Float64Array;
+        const hums = rb.columns.humidity as Float64Array;
+        const channels = rb.columns.channel as (string | null)[] | undefined;
+        const { tempMin, tempMax, humMin, humMax } = limits;
+        const fixedSensorId = options.forceSensorId || 'unknown';
+        const createdAt = new Date();
+        const first = totalLines;
+        totalLines += rb.length;
+        for (let i = 0; i < rb.length; i++) {
+          const t = ts[i];
+          const temperature = temps[i];
+          const humidity = hums[i];
+          if (isNaN(t)) {
+            recordFailure('no-timestamp', { timestamp: null, temperature, humidity }, first + i + 1);
+            continue;
+          }
+          if (!(temperature >= tempMin && temperature <= tempMax)) {
+            recordFailure('bad-temperature', { timestamp: new Date(t), temperature, humidity }, first + i + 1);
+            continue;
+          }
+          if ((humMin != null && humidity < humMin) || (humMax != null && humidity > humMax)) {
+            recordFailure('bad-humidity', { timestamp: new Date(t), temperature, humidity }, first + i + 1);
+            continue;
+          }
+          const channel = channels?.[i];
+          batch.push({
+            sensorId: (channel != null && options.channelSensorIds?.[channel]) || fixedSensorId,
+            timestamp: new Date(t),
+            temperature,
+            humidity: isNaN(humidity) ? null : humidity,
+            fileName: options.fileName,
+            rowNumber: first + i + 1,
+            validationId: options.validationId ?? null,
+            createdAt
+          });
+          if (batch.length >= BATCH_SIZE) await flushBatch();
+        }
+      };
+
+      // Resolves true for a data row, false for control records (progress, skip, validation...)
+      const handleLine = async (line: string): Promise<boolean> => {
+        if (!line.trim()) return false;
+        let obj: any;
+        try {
+          obj = JSON.parse(line);
+        } catch (e) {
+          // ignore malformed line
+          return false;
+        }
+        if (obj.error) {
+          failedLines++;
+          return false;
+        }
+        if (obj.sink) {
+          // Postgres sink: the rows are already in sensor_data, only the summary comes back
+          totalLines = obj.sink.rows;
+          failedLines = obj.sink.failed;
+          failNoTimestamp = obj.sink.noTimestamp;
+          failBadTemperature = obj.sink.badTemperature;
+          metrics.counts.inserted = obj.sink.inserted;
+          metrics.counts.duplicates = obj.sink.duplicates;
+          metrics.counts.unknownSensor = obj.sink.unknownSensor;
+          // Retried job: rows up to this rowNumber were committed by an earlier attempt (checkpoint)
+          if (obj.sink.resumedFrom) metrics.counts.resumedFrom = obj.sink.resumedFrom;
+          if (obj.sink.appendSkipped) metrics.counts.appendSkipped = obj.sink.appendSkipped;
+          return false;
+        }
+        if (obj.skip) {
+          // --validate: rows rejected by the parser still take up their rowNumbers
+          totalLines += obj.skip;
+          return false;
+        }
+        if (obj.validation) {
+          failedLines += obj.validation.rejected;
+          failNoTimestamp += obj.validation.noTimestamp;
+          failBadTemperature += obj.validation.badTemperature;
+          failBadHumidity += obj.validation.badHumidity;
+          failSamples.splice(0, failSamples.length, ...obj.validation.samples);
+          return false;
+        }
+        if (obj.progress) {
+          parsedRows = obj.progress.rows;
+          parseTotal = obj.progress.total ?? null;
+          await reportProgress();
+          return false;
+        }
+        const timestampStr = obj.timestamp;
+        let timestamp: Date | null = null;
+        if (timestampStr) {
+          const d = new Date(timestampStr);
+          if (!isNaN(d.getTime())) timestamp = d; else timestamp = null;
+        }
+        const temperature = typeof obj.temperature === 'number' ? obj.temperature : parseFloat(String(obj.temperature));
+        const humidity = obj.humidity == null ? null : (typeof obj.humidity === 'number' ? obj.humidity : parseFloat(String(obj.humidity)));
+        pushRow(timestamp, temperature, humidity, obj.channel, obj);
+        if (batch.length >= BATCH_SIZE) {
+          await flushBatch();
+          await reportProgress();
+        }
+        return true;
+      };
+
+      // Arrow output: whole record batches with epoch-ms timestamps and float columns (NaN = null)
+      const consumeArrow = async () => {
+        for await (const rb of readArrowBatches(child.stdout)) {
+          armTimer();
+          await pushColumns(rb);
+          parsedRows += rb.length;
+          parseTotal = rb.schema.metadata.total ? Number(rb.schema.metadata.total) : null;
+          await reportProgress();
+        }
+      };
+
+      // Framed NDJSON: each frame is acknowledged once its rows are queued/inserted, so the
+      // parser never runs more than WINDOW batches ahead of the database
+      const consumeFrames = async () => {
+        for await (const frame of readFrames(child.stdout)) {
+          armTimer();
+          if (frame.kind === 'X') {
+            throw new Error(JSON.parse(frame.payload.toString()).error || 'Python fallback failed');
+          }
+          if (frame.kind === 'S') {
+            parseTotal = JSON.parse(frame.payload.toString()).total ?? null;
+          } else if (frame.kind === 'R') {
+            for (const line of frame.payload.toString().split('\n')) {
+              if (await handleLine(line)) parsedRows++;
             }
+            await reportProgress();
           }
-        } catch {}
+          child.stdin?.write(`ACK ${frame.seq}\n`);
+        }
+      };
+
+      let streamError: Error | null = null;
+      if (useArrow || useFramed) {
+        pending = (useArrow ? consumeArrow() : consumeFrames()).catch(err => {
+          streamError = err;
+          // Nobody reads stdout or sends ACKs anymore: the parser would block forever
+          try { child.kill('SIGKILL'); } catch {}
+        });
+      } else {
+        child.stdout.on('data', chunk => {
+          // A chunk may end mid-line: keep the tail for the next one
+          armTimer();
+          const lines = (carry + chunk.toString()).split(/\r?\n/);
+          carry = lines.pop() ?? '';
+          child.stdout.pause();
+          pending = pending
+            .then(async () => {
+              for (const line of lines) await handleLine(line);
+            })
+            .finally(() => child.stdout.resume());
+        });
+      }
+
+      let stderrCarry = '';
+      child.stderr.on('data', chunk => {
+        const lines = (stderrCarry + chunk.toString()).split(/\r?\n/);
+        stderrCarry = lines.pop() ?? '';
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          if (line.startsWith('{"event"')) {
+            try {
+              handleEvent(JSON.parse(line));
+              continue;
+            } catch {}
+          }
+          // Anything else (tracebacks, library warnings) is kept for the error message
+          if (stderr.length < 64 * 1024) stderr += line + '\n';
+          if (line.startsWith('WARNING:')) {
+            logger.warn('Python fallback warning', { line });
+          } else if (line.includes('DEBUG')) {
+            logger.info('Python fallback debug', { line });
+          }
+        }
       });
 
-      child.on('error', err => {
+      child.on('error', async err => {
         if (!resolved) {
           clearTimeout(timer);
+          clearTimeout(runTimer);
           resolved = true;
+          logger.error('Python fallback process error', { originalName, message: err.message });
+          // Every way out of the job leaves its final state in Redis, not just a non-zero exit
+          await reportProgress('failed');
           reject(err);
         }
       });
@@ -159,22 +517,27 @@ export class PythonFallbackService {
       child.on('close', async code => {
         if (resolved) return;
         clearTimeout(timer);
+        clearTimeout(runTimer);
         resolved = true;
+        // Finish the lines still queued behind an insert, then flush remaining batch
+        // (a line that failed to process fails the job below instead of leaving it unsettled)
+        await pending.catch(err => { streamError = streamError || err; });
         if (code !== 0) {
-          logger.error('Python fallback exited with non-zero code', { code, stderr });
-          return reject(new Error(stderr || `Python fallback failed with code ${code}`));
+          if (stderrCarry.trim()) stderr += stderrCarry;
+          logger.error('Python fallback exited with non-zero code', { code, stderr, message: streamError && (streamError as Error).message, parser: metrics });
+          await reportProgress('failed');
+          return reject(streamError || new Error(stderr || `Python fallback failed with code ${code}`));
         }
-        const duration = Date.now() - start;
-        // Flush remaining batch
-        if (batch.length) {
-          try {
-            await prisma.sensorData.createMany({ data: batch, skipDuplicates: true });
-          } catch (dbErr) {
-            logger.error('Python fallback final batch insert error', { message: (dbErr as any)?.message });
-            failedLines += batch.length;
-          }
+        if (streamError) {
+          logger.error('Python fallback output stream error', { message: (streamError as Error).message });
+          await reportProgress('failed');
+          return reject(streamError);
         }
-        logger.info('Python fallback completed', { originalName, totalLines, failedLines, duration, failNoTimestamp, failBadTemperature, failSamples });
+        await handleLine(carry);
+        await flushBatch();
+        const duration = Date.now() - start;
+        await reportProgress('completed');
+        logger.info('Python fallback completed', { originalName, totalLines, failedLines, duration, queueWaitMs: slot.queueWaitMs, failNoTimestamp, failBadTemperature, failBadHumidity, failSamples, parser: metrics });
         const processedRows = totalLines - failedLines;
         resolve({
           totalRows: totalLines,
@@ -185,7 +548,7 @@ export class PythonFallbackService {
           processingTime: duration,
         });
       });
-    });
+    }));
   }
 }
 
@@ -0,0 +1,146 @@
+import * as os from 'os';
+import { logger } from '../utils/logger.js';
+import { redisService } from './redisService.js';
+
+/**
+ * Agenda os processos do parser Python (pythonFallbackService).
+ *
+ * - Limite global de processos simultâneos (PYTHON_FALLBACK_CONCURRENCY).
+ * - Arquivos menores primeiro, com envelhecimento: a cada PYTHON_FALLBACK_AGING_MS
+ *   de espera o tamanho efetivo do arquivo cai pela metade, então um arquivo grande
+ *   não espera para sempre atrás de uploads pequenos.
+ * - Justiça entre usuários: a vaga livre vai para o usuário com menos processos
+ *   rodando; o tamanho só desempata entre usuários na mesma situação.
+ *
+ * Enquanto espera, o job publica `{ state: 'queued', position, queueWaitMs }` em
+ * `job:progress:<jobId>`; as posições de toda a fila são gravadas juntas (uma
+ * transação Redis) no máximo uma vez a cada PYTHON_FALLBACK_QUEUE_REPORT_MS.
+ * Depois de iniciado, o serviço chamador continua atualizando a mesma chave com
+ * `queueWaitMs` e `runMs`.
+ */
+
+export interface ParseJobTicket {
+  sizeBytes: number;
+  userId?: string;
+  jobId?: string;
+  label?: string;
+}
+
+export interface ParseJobSlot {
+  /** Tempo de espera na fila antes do processo iniciar (ms) */
+  queueWaitMs: number;
+  startedAt: number;
+}
+
+interface Waiting {
+  ticket: ParseJobTicket;
+  enqueuedAt: number;
+  start: () => void;
+}
+
+const ANONYMOUS = '(anonymous)';
+
+export class PythonJobScheduler {
+  private readonly MAX_CONCURRENT = Math.max(
+    1,
+    Number(process.env.PYTHON_FALLBACK_CONCURRENCY || Math.max(1, Math.floor(os.cpus().length / 2)))
+  );
+  private readonly AGING_MS = Math.max(1, Number(process.env.PYTHON_FALLBACK_AGING_MS || 15000));
+  private readonly QUEUE_REPORT_MS = Math.max(0, Number(process.env.PYTHON_FALLBACK_QUEUE_REPORT_MS ?? 1000));
+  private running = 0;
+  private readonly runningByUser = new Map<string, number>();
+  private waiting: Waiting[] = [];
+  private reportTimer: NodeJS.Timeout | null = null;
+  private lastReportAt = 0;
+
+  /** Run `task` once a slot is free; the slot is released when the task settles. */
+  async run<T>(ticket: ParseJobTicket, task: (slot: ParseJobSlot) => Promise<T>): Promise<T> {
+    const user = ticket.userId || ANONYMOUS;
+    const enqueuedAt = Date.now();
+    if (this.running >= this.MAX_CONCURRENT || this.waiting.length > 0) {
+      await new Promise<void>(resolve => {
+        this.waiting.push({ ticket, enqueuedAt, start: resolve });
+        this.dispatch();
+      });
+    } else {
+      this.acquire(user);
+    }
+    const startedAt = Date.now();
+    const queueWaitMs = startedAt - enqueuedAt;
+    if (queueWaitMs > 0) {
+      logger.info('Python fallback job left the queue', { label: ticket.label, userId: ticket.userId, queueWaitMs, running: this.running });
+    }
+    try {
+      return await task({ queueWaitMs, startedAt });
+    } finally {
+      this.release(user);
+    }
+  }
+
+  stats() {
+    return { running: this.running, waiting: this.waiting.length, maxConcurrent: this.MAX_CONCURRENT };
+  }
+
+  private acquire(user: string) {
+    this.running++;
+    this.runningByUser.set(user, (this.runningByUser.get(user) || 0) + 1);
+  }
+
+  private release(user: string) {
+    this.running--;
+    const left = (this.runningByUser.get(user) || 1) - 1;
+    if (left > 0) this.runningByUser.set(user, left);
+    else this.runningByUser.delete(user);
+    this.dispatch();
+  }
+
+  /** log2 do tamanho, menos um por período de envelhecimento esperado */
+  private effectiveSize(w: Waiting, now: number): number {
+    return Math.log2(Math.max(1, w.ticket.sizeBytes)) - (now - w.enqueuedAt) / this.AGING_MS;
+  }
+
+  private ordered(now: number): Waiting[] {
+    return [...this.waiting].sort((a, b) => {
+      const ua = this.runningByUser.get(a.ticket.userId || ANONYMOUS) || 0;
+      const ub = this.runningByUser.get(b.ticket.userId || ANONYMOUS) || 0;
+      if (ua !== ub) return ua - ub;
+      return this.effectiveSize(a, now) - this.effectiveSize(b, now) || a.enqueuedAt - b.enqueuedAt;
+    });
+  }
+
+  private dispatch() {
+    while (this.running < this.MAX_CONCURRENT && this.waiting.length > 0) {
+      // Reordenar a cada vaga: o número de processos por usuário muda a cada início
+      const next = this.ordered(Date.now())[0];
+      this.waiting = this.waiting.filter(w => w !== next);
+      this.acquire(next.ticket.userId || ANONYMOUS);
+      next.start();
+    }
+    this.scheduleReport();
+  }
+
+  /** Junta os despachos de uma janela de QUEUE_REPORT_MS numa única gravação da fila */
+  private scheduleReport() {
+    if (this.reportTimer || this.waiting.length === 0) return;
+    const delay = Math.max(0, this.lastReportAt + this.QUEUE_REPORT_MS - Date.now());
+    this.reportTimer = setTimeout(() => {
+      this.reportTimer = null;
+      this.lastReportAt = Date.now();
+      void this.reportQueue();
+    }, delay);
+    this.reportTimer.unref?.();
+  }
+
+  private async reportQueue() {
+    const now = Date.now();
+    const entries: Array<[string, any]> = [];
+    this.ordered(now).forEach((w, position) => {
+      if (w.ticket.jobId) {
+        entries.push([`job:progress:${w.ticket.jobId}`, { state: 'queued', position: position + 1, queueWaitMs: now - w.enqueuedAt }]);
+      }
+    });
+    await redisService.setMany(entries, 3600).catch(() => false);
+  }
+}
+
+export const pythonJobScheduler = new PythonJobScheduler();
@@ -134,6 +134,23 @@ class RedisService {
     }
   }
 
+  // Several keys with the same TTL in one round trip (MULTI)
+  async setMany(entries: Array<[string, any]>, ttl: number): Promise<boolean> {
+    if (!this.isReady() || entries.length === 0) return false;
+
+    try {
+      const multi = this.client!.multi();
+      for (const [key, value] of entries) {
+        multi.setEx(key, ttl, JSON.stringify(value));
+      }
+      await multi.exec();
+      return true;
+    } catch (error) {
+      logger.error('Redis: Failed to set keys:', error);
+      return false;
+    }
+  }
+
   async get(key: string): Promise<any | null> {
     if (!this.isReady()) return null;
     
@@ -0,0 +1,227 @@
+import type { Readable } from 'stream';
+
+/**
+ * Leitor mínimo de Arrow IPC (formato stream) para a saída do parser Python
+ * (`--format arrow`, ver python/qtparser/arrow_ipc.py).
+ *
+ * Suporta apenas o que o parser escreve: little-endian, sem compressão, sem
+ * dicionários, colunas int64 / float64 / utf8 sem filhos. Colunas numéricas
+ * são devolvidas como Float64Array (NaN = nulo), apontando direto para o corpo
+ * do record batch quando não há nulos a preencher.
+ */
+
+export interface ArrowField {
+  name: string;
+  type: 'int64' | 'float64' | 'utf8';
+}
+
+export interface ArrowSchema {
+  fields: ArrowField[];
+  metadata: Record<string, string>;
+}
+
+export interface ArrowRecordBatch {
+  schema: ArrowSchema;
+  length: number;
+  columns: Record<string, Float64Array | (string | null)[]>;
+}
+
+const CONTINUATION = 0xffffffff;
+const HEADER_SCHEMA = 1;
+const HEADER_RECORD_BATCH = 3;
+const TYPE_INT = 2;
+const TYPE_FLOAT = 3;
+const TYPE_UTF8 = 5;
+const PRECISION_DOUBLE = 2;
+
+/** Acesso às tabelas FlatBuffers da mensagem (apenas leitura). */
+class FlatTable {
+  constructor(private readonly buf: Buffer, readonly pos: number) {}
+
+  static root(buf: Buffer): FlatTable {
+    return new FlatTable(buf, buf.readUInt32LE(0));
+  }
+
+  private field(id: number): number {
+    const vt = this.pos - this.buf.readInt32LE(this.pos);
+    const slot = 4 + 2 * id;
+    return slot < this.buf.readUInt16LE(vt) ? this.buf.readUInt16LE(vt + slot) : 0;
+  }
+
+  private indirect(id: number): number {
+    const p = this.pos + this.field(id);
+    return p + this.buf.readUInt32LE(p);
+  }
+
+  has(id: number): boolean {
+    return this.field(id) !== 0;
+  }
+
+  u8(id: number, dflt = 0): number {
+    const o = this.field(id);
+    return o ? this.buf.readUInt8(this.pos + o) : dflt;
+  }
+
+  i16(id: number, dflt = 0): number {
+    const o = this.field(id);
+    return o ? this.buf.readInt16LE(this.pos + o) : dflt;
+  }
+
+  i32(id: number, dflt = 0): number {
+    const o = this.field(id);
+    return o ? this.buf.readInt32LE(this.pos + o) : dflt;
+  }
+
+  i64(id: number, dflt = 0): number {
+    const o = this.field(id);
+    return o ? Number(this.buf.readBigInt64LE(this.pos + o)) : dflt;
+  }
+
+  table(id: number): FlatTable | null {
+    return this.has(id) ? new FlatTable(this.buf, this.indirect(id)) : null;
+  }
+
+  string(id: number): string | null {
+    if (!this.has(id)) return null;
+    const p = this.indirect(id);
+    return this.buf.toString('utf8', p + 4, p + 4 + this.buf.readUInt32LE(p));
+  }
+
+  /** Vetor de tabelas. */
+  tables(id: number): FlatTable[] {
+    if (!this.has(id)) return [];
+    const p = this.indirect(id);
+    const out: FlatTable[] = [];
+    for (let i = 0, n = this.buf.readUInt32LE(p); i < n; i++) {
+      const e = p + 4 + 4 * i;
+      out.push(new FlatTable(this.buf, e + this.buf.readUInt32LE(e)));
+    }
+    return out;
+  }
+
+  /** Vetor de structs com dois campos int64 (FieldNode / Buffer). */
+  longPairs(id: number): Array<[number, number]> {
+    if (!this.has(id)) return [];
+    const p = this.indirect(id);
+    const out: Array<[number, number]> = [];
+    for (let i = 0, n = this.buf.readUInt32LE(p); i < n; i++) {
+      const e = p + 4 + 16 * i;
+      out.push([Number(this.buf.readBigInt64LE(e)), Number(this.buf.readBigInt64LE(e + 8))]);
+    }
+    return out;
+  }
+}
+
+function readSchema(header: FlatTable): ArrowSchema {
+  const fields = header.tables(1).map(f => {
+    const name = f.string(0) ?? '';
+    const typeType = f.u8(2);
+    const type = f.table(3);
+    if (f.has(4) || f.tables(5).length) {
+      throw new Error(`Arrow column ${name}: dictionaries/nested types are not supported`);
+    }
+    if (typeType === TYPE_INT && type && type.i32(0) === 64) return { name, type: 'int64' as const };
+    if (typeType === TYPE_FLOAT && type && type.i16(0) === PRECISION_DOUBLE) return { name, type: 'float64' as const };
+    if (typeType === TYPE_UTF8) return { name, type: 'utf8' as const };
+    throw new Error(`Arrow column ${name}: unsupported type ${typeType}`);
+  });
+  const metadata: Record<string, string> = {};
+  for (const kv of header.tables(2)) metadata[kv.string(0) ?? ''] = kv.string(1) ?? '';
+  return { fields, metadata };
+}
+
+function readRecordBatch(header: FlatTable, body: Buffer, schema: ArrowSchema): ArrowRecordBatch {
+  if (header.has(3)) throw new Error('Compressed Arrow batches are not supported');
+  const length = header.i64(0);
+  const nodes = header.longPairs(1);
+  const buffers = header.longPairs(2);
+  // Cópia única para um ArrayBuffer alinhado; as colunas são views sobre ele
+  const data = new ArrayBuffer(body.length);
+  new Uint8Array(data).set(body);
+  const bytes = new Uint8Array(data);
+  const columns: ArrowRecordBatch['columns'] = {};
+  let b = 0;
+  schema.fields.forEach((field, i) => {
+    const nullCount = nodes[i][1];
+    const [validOff, validLen] = buffers[b++];
+    const isValid = (row: number) =>
+      nullCount === 0 || validLen === 0 || ((bytes[validOff + (row >> 3)] >> (row & 7)) & 1) === 1;
+    if (field.type === 'utf8') {
+      const [offOff] = buffers[b++];
+      const [dataOff] = buffers[b++];
+      const offsets = new Int32Array(data, offOff, length + 1);
+      const values: (string | null)[] = new Array(length);
+      for (let r = 0; r < length; r++) {
+        values[r] = isValid(r) ? body.toString('utf8', dataOff + offsets[r], dataOff + offsets[r + 1]) : null;
+      }
+      columns[field.name] = values;
+      return;
+    }
+    const [valuesOff] = buffers[b++];
+    let values: Float64Array;
+    if (field.type === 'int64') {
+      const ints = new BigInt64Array(data, valuesOff, length);
+      values = new Float64Array(length);
+      for (let r = 0; r < length; r++) values[r] = Number(ints[r]);
+    } else {
+      values = new Float64Array(data, valuesOff, length);
+    }
+    if (nullCount > 0) {
+      for (let r = 0; r < length; r++) if (!isValid(r)) values[r] = NaN;
+    }
+    columns[field.name] = values;
+  });
+  return { schema, length, columns };
+}
+
+/**
+ * Lê record batches de um stream Arrow IPC à medida que chegam.
+ * Se o processo escrever um JSON `{"error": ...}` no lugar do stream, lança esse erro.
+ */
+export async function* readArrowBatches(stream: Readable): AsyncGenerator<ArrowRecordBatch> {
+  let pending = Buffer.alloc(0);
+  let schema: ArrowSchema | null = null;
+  let errorText: string | null = null;
+  for await (const chunk of stream) {
+    if (errorText !== null) {
+      errorText += chunk.toString();
+      continue;
+    }
+    pending = pending.length ? Buffer.concat([pending, chunk as Buffer]) : (chunk as Buffer);
+    if (schema === null && pending[0] === 0x7b /* '{' */) {
+      // O parser falhou antes de abrir o stream e escreveu o erro em JSON
+      errorText = pending.toString();
+      continue;
+    }
+    for (;;) {
+      if (pending.length < 8) break;
+      const prefix = pending.readUInt32LE(0) === CONTINUATION ? 8 : 4;
+      const metaLen = pending.readInt32LE(prefix - 4);
+      if (metaLen === 0) return; // fim do stream
+      if (pending.length < prefix + metaLen) break;
+      const meta = pending.subarray(prefix, prefix + metaLen);
+      const message = FlatTable.root(meta);
+      const bodyLen = message.i64(3);
+      const end = prefix + metaLen + bodyLen;
+      if (pending.length < end) break;
+      const headerType = message.u8(1);
+      const header = message.table(2);
+      if (header && headerType === HEADER_SCHEMA) {
+        schema = readSchema(header);
+      } else if (header && headerType === HEADER_RECORD_BATCH) {
+        if (!schema) throw new Error('Arrow record batch before schema');
+        yield readRecordBatch(header, pending.subarray(prefix + metaLen, end), schema);
+      } else {
+        throw new Error(`Unsupported Arrow message type ${headerType}`);
+      }
+      pending = pending.subarray(end);
+    }
+  }
+  if (errorText !== null) {
+    let message = 'Arrow stream expected';
+    try {
+      message = JSON.parse(errorText.trim().split(/\r?\n/)[0]).error || message;
+    } catch {}
+    throw new Error(message);
+  }
+}
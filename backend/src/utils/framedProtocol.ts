@@ -0,0 +1,44 @@
+import type { Readable } from 'stream';
+
+/**
+ * Protocolo em frames do parser Python (`--framed`, ver python/qtparser/framing.py).
+ *
+ * Cada frame: 1 byte de tipo, seq (uint32 LE), tamanho do payload (uint32 LE) e o payload.
+ * O consumidor confirma com `ACK <seq>\n` no stdin do parser; o parser mantém no
+ * máximo `--window` frames sem confirmação.
+ */
+
+export type FrameKind = 'S' | 'R' | 'E' | 'X';
+
+export interface Frame {
+  kind: FrameKind;
+  seq: number;
+  payload: Buffer;
+}
+
+const HEADER_BYTES = 9;
+
+/** Lê frames completos à medida que chegam, independente de como o stdout foi fatiado. */
+export async function* readFrames(stream: Readable): AsyncGenerator<Frame> {
+  let pending = Buffer.alloc(0);
+  for await (const chunk of stream) {
+    pending = pending.length ? Buffer.concat([pending, chunk as Buffer]) : (chunk as Buffer);
+    while (pending.length >= HEADER_BYTES) {
+      const length = pending.readUInt32LE(5);
+      if (pending.length < HEADER_BYTES + length) break;
+      const kind = String.fromCharCode(pending[0]) as FrameKind;
+      if (!'SREX'.includes(kind)) {
+        throw new Error(`Framed protocol: unexpected frame type 0x${pending[0].toString(16)}`);
+      }
+      yield {
+        kind,
+        seq: pending.readUInt32LE(1),
+        payload: pending.subarray(HEADER_BYTES, HEADER_BYTES + length),
+      };
+      pending = pending.subarray(HEADER_BYTES + length);
+    }
+  }
+  if (pending.length) {
+    throw new Error(`Framed protocol: stream ended inside a frame (${pending.length} bytes left)`);
+  }
+}
@@ -0,0 +1,75 @@
+import { describe, it, expect } from '@jest/globals';
+import * as fs from 'fs';
+import * as path from 'path';
+import { Readable } from 'stream';
+import { readArrowBatches, ArrowRecordBatch } from '../src/utils/arrowIpcReader';
+
+// Fixtures gravadas por qtparser/arrow_ipc.py (ver tests/fixtures/arrow/generate.py)
+const FIXTURES = path.resolve(__dirname, 'fixtures/arrow');
+const readings = fs.readFileSync(path.join(FIXTURES, 'readings.arrows'));
+const channels = fs.readFileSync(path.join(FIXTURES, 'channels.arrows'));
+
+const collect = async (chunks: Buffer[]): Promise<ArrowRecordBatch[]> => {
+  const batches: ArrowRecordBatch[] = [];
+  for await (const rb of readArrowBatches(Readable.from(chunks))) batches.push(rb);
+  return batches;
+};
+
+// NaN = nulo nas colunas numéricas
+const values = (rb: ArrowRecordBatch, name: string) =>
+  Array.from(rb.columns[name] as Float64Array, v => (isNaN(v) ? null : v));
+
+const plain = (batches: ArrowRecordBatch[]) =>
+  batches.map(rb => Object.fromEntries(rb.schema.fields.map(f => [
+    f.name, f.type === 'utf8' ? rb.columns[f.name] : values(rb, f.name),
+  ])));
+
+describe('readArrowBatches', () => {
+  it('reads the schema, metadata and every record batch', async () => {
+    const batches = await collect([readings]);
+    expect(batches.map(rb => rb.length)).toEqual([3, 2, 9]);
+    expect(batches[0].schema.fields).toEqual([
+      { name: 'timestamp_ms', type: 'int64' },
+      { name: 'temperature', type: 'float64' },
+      { name: 'humidity', type: 'float64' },
+    ]);
+    expect(batches[0].schema.metadata).toEqual({ total: '14' });
+    expect(values(batches[2], 'temperature')).toEqual([0, 1, 2, 3, 4, 5, 6, 7, 8]);
+  });
+
+  it('maps nulls of every column to NaN', async () => {
+    const [first] = await collect([readings]);
+    expect(values(first, 'timestamp_ms')).toEqual([Date.UTC(2025, 2, 1), null, Date.UTC(2025, 2, 1, 0, 2, 0, 123)]);
+    expect(values(first, 'temperature')).toEqual([4.5, 5, null]);
+    expect(values(first, 'humidity')).toEqual([61, null, 62.5]);
+  });
+
+  it('decodes int64 values before 1970 and far in the future', async () => {
+    const [, second] = await collect([readings]);
+    expect(values(second, 'timestamp_ms')).toEqual([-1, Date.UTC(2262, 3, 11)]);
+    expect(values(second, 'humidity')).toEqual([null, 0]);
+  });
+
+  it('decodes utf8 channels with nulls and empty strings', async () => {
+    const batches = await collect([channels]);
+    expect(batches).toHaveLength(1);
+    expect(batches[0].schema.metadata).toEqual({ total: '' });
+    expect(batches[0].columns.channel).toEqual(['1', 'câmara 2', '', null]);
+    expect(values(batches[0], 'humidity')).toEqual([null, null, null, null]);
+  });
+
+  it('reassembles messages split at any byte', async () => {
+    const expected = plain(await collect([readings]));
+    for (let cut = 1; cut < readings.length; cut++) {
+      const batches = await collect([readings.subarray(0, cut), readings.subarray(cut)]);
+      expect(plain(batches)).toEqual(expected);
+    }
+    const bytes = Array.from(channels, b => Buffer.from([b]));
+    expect(plain(await collect(bytes))).toEqual(plain(await collect([channels])));
+  });
+
+  it('throws the parser error written instead of the stream', async () => {
+    const error = Buffer.from('{"error": "No sheets found"}\n');
+    await expect(collect([error.subarray(0, 5), error.subarray(5)])).rejects.toThrow('No sheets found');
+  });
+});
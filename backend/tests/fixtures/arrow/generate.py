@@ -0,0 +1,68 @@
+"""Gera as fixtures Arrow IPC de arrowIpcReader.test.ts com o writer do parser.
+
+    cd backend/python
+    python ../tests/fixtures/arrow/generate.py
+"""
+import io
+import os
+import sys
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', '..', '..', 'python'))
+
+from qtparser.arrow_ipc import write_arrow  # noqa: E402
+from qtparser.batch import RowBatch  # noqa: E402
+
+NAT = np.datetime64('NaT')
+
+
+class Stream:
+    def __init__(self, batches, total):
+        self.batches = batches
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.batches)
+
+
+def ts(*values):
+    return np.array([NAT if v is None else np.datetime64(v, 'ns') for v in values], dtype='datetime64[ns]')
+
+
+def write(name, batches, channels, total):
+    sink = io.BytesIO()
+    write_arrow(Stream(batches, total), sink, channels)
+    with open(os.path.join(HERE, name), 'wb') as f:
+        f.write(sink.getvalue())
+
+
+# Três lotes: nulos em cada coluna, instante anterior a 1970 e milissegundos grandes (int64)
+write('readings.arrows', [
+    RowBatch(
+        ts('2025-03-01T00:00:00', None, '2025-03-01T00:02:00.123'),
+        np.array([4.5, 5.0, np.nan]),
+        np.array([61.0, np.nan, 62.5]),
+    ),
+    RowBatch(
+        ts('1969-12-31T23:59:59.999', '2262-04-11T00:00:00'),
+        np.array([-18.25, 120.0]),
+        np.array([np.nan, 0.0]),
+    ),
+    RowBatch(
+        ts(*['2025-03-01T01:00:00'] * 9),
+        np.arange(9, dtype=float),
+        np.full(9, 50.0),
+    ),
+], channels=False, total=14)
+
+# Multicanal: utf8 com acentos, texto vazio e canal nulo; total desconhecido
+write('channels.arrows', [
+    RowBatch(
+        ts('2025-03-01T00:00:00', '2025-03-01T00:00:00', '2025-03-01T00:01:00', '2025-03-01T00:01:00'),
+        np.array([1.0, 2.0, 3.0, 4.0]),
+        np.array([np.nan, np.nan, np.nan, np.nan]),
+        np.array(['1', 'câmara 2', '', None], dtype=object),
+    ),
+], channels=True, total=None)
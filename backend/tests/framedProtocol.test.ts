@@ -0,0 +1,116 @@
+import { describe, it, expect } from '@jest/globals';
+import { spawn, spawnSync } from 'child_process';
+import * as fs from 'fs';
+import * as path from 'path';
+import { Readable } from 'stream';
+import { readFrames, Frame } from '../src/utils/framedProtocol';
+
+// Mesmo layout de python/qtparser/framing.py: tipo, seq (uint32 LE), tamanho (uint32 LE), payload
+const frame = (kind: string, seq: number, payload: string | Buffer): Buffer => {
+  const body = Buffer.isBuffer(payload) ? payload : Buffer.from(payload);
+  const header = Buffer.alloc(9);
+  header.write(kind, 0, 'latin1');
+  header.writeUInt32LE(seq, 1);
+  header.writeUInt32LE(body.length, 5);
+  return Buffer.concat([header, body]);
+};
+
+const collect = async (chunks: Buffer[]): Promise<Frame[]> => {
+  const frames: Frame[] = [];
+  for await (const f of readFrames(Readable.from(chunks))) frames.push(f);
+  return frames;
+};
+
+describe('readFrames', () => {
+  const stream = Buffer.concat([
+    frame('S', 1, '{"total": 2}'),
+    frame('R', 2, '{"timestamp": "2025-03-01T00:00:00Z", "temperature": 4.0, "humidity": null}\n'),
+    frame('R', 3, ''),
+    frame('E', 4, '{"rows": 2}'),
+  ]);
+
+  it('decodes every frame of a single chunk', async () => {
+    const frames = await collect([stream]);
+    expect(frames.map(f => [f.kind, f.seq])).toEqual([['S', 1], ['R', 2], ['R', 3], ['E', 4]]);
+    expect(JSON.parse(frames[0].payload.toString())).toEqual({ total: 2 });
+    expect(frames[2].payload.length).toBe(0);
+  });
+
+  it('reassembles headers and payloads split across chunks', async () => {
+    // Um byte por chunk: cabeçalhos e payloads sempre partidos
+    const bytes = Array.from(stream, b => Buffer.from([b]));
+    const frames = await collect(bytes);
+    expect(frames.map(f => f.seq)).toEqual([1, 2, 3, 4]);
+    expect(frames[1].payload.toString()).toContain('"temperature": 4.0');
+  });
+
+  it('handles a chunk boundary inside the 9-byte header', async () => {
+    const frames = await collect([stream.subarray(0, 4), stream.subarray(4, 30), stream.subarray(30)]);
+    expect(frames).toHaveLength(4);
+  });
+
+  it('passes error frames through with their message', async () => {
+    const frames = await collect([frame('X', 1, '{"error": "No sheets found"}')]);
+    expect(frames[0].kind).toBe('X');
+    expect(JSON.parse(frames[0].payload.toString()).error).toBe('No sheets found');
+  });
+
+  it('rejects unknown frame types', async () => {
+    await expect(collect([frame('Z', 1, '{}')])).rejects.toThrow(/unexpected frame type 0x5a/);
+  });
+
+  it('rejects a stream that ends inside a frame', async () => {
+    await expect(collect([stream.subarray(0, stream.length - 3)])).rejects.toThrow(/ended inside a frame/);
+  });
+});
+
+// Janela de ACK contra o parser Python de verdade (pulado sem python3 + qtparser)
+const PYTHON_DIR = path.resolve(__dirname, '../python');
+const UPLOAD = path.resolve(__dirname, '../../uploads/EF7241102164.xls');
+const hasParser = fs.existsSync(UPLOAD)
+  && spawnSync('python3', ['-c', 'import qtparser'], { cwd: PYTHON_DIR }).status === 0;
+
+(hasParser ? describe : describe.skip)('ACK window (python3 -m qtparser --framed)', () => {
+  it('waits for an ACK once --window frames are unacknowledged', async () => {
+    const window = 2;
+    const child = spawn('python3', ['-m', 'qtparser', UPLOAD, '--framed', '--window', String(window), '--batch-size', '1000'], { cwd: PYTHON_DIR });
+    const closed = new Promise(resolve => child.on('close', resolve));
+    child.stderr.resume();
+    const frames = readFrames(child.stdout)[Symbol.asyncIterator]();
+    const kinds: string[] = [];
+    for (let seq = 1; seq <= window; seq++) {
+      const { value } = await frames.next();
+      expect(value!.seq).toBe(seq);
+      kinds.push(value!.kind);
+    }
+    // Sem ACK, o próximo frame não pode chegar
+    const blocked = frames.next();
+    const timeout = new Promise(resolve => setTimeout(() => resolve('timeout'), 500));
+    expect(await Promise.race([blocked, timeout])).toBe('timeout');
+    child.stdin.write(`ACK ${window}\n`);
+    let result = await blocked;
+    while (!result.done) {
+      kinds.push(result.value.kind);
+      child.stdin.write(`ACK ${result.value.seq}\n`);
+      result = await frames.next();
+    }
+    expect(await closed).toBe(0);
+    expect(kinds[0]).toBe('S');
+    expect(kinds[kinds.length - 1]).toBe('E');
+    expect(kinds.filter(k => k === 'R').length).toBeGreaterThan(window);
+  });
+
+  it('reports a parse failure as an error frame', async () => {
+    const child = spawn('python3', ['-m', 'qtparser', path.join(PYTHON_DIR, 'requirements.txt'), '--framed'], { cwd: PYTHON_DIR });
+    const closed = new Promise(resolve => child.on('close', resolve));
+    child.stderr.resume();
+    const frames: Frame[] = [];
+    for await (const f of readFrames(child.stdout)) {
+      frames.push(f);
+      child.stdin.write(`ACK ${f.seq}\n`);
+    }
+    expect(await closed).toBe(3);
+    expect(frames.map(f => f.kind)).toEqual(['X']);
+    expect(JSON.parse(frames[0].payload.toString()).error).toBeTruthy();
+  });
+});
@@ -0,0 +1,135 @@
+import { describe, it, expect, beforeEach, afterEach, jest } from '@jest/globals';
+import { EventEmitter } from 'events';
+import * as fs from 'fs';
+import * as os from 'os';
+import * as path from 'path';
+import { PassThrough } from 'stream';
+
+jest.mock('child_process', () => ({ spawn: jest.fn() }));
+jest.mock('../src/utils/logger', () => ({
+  logger: { info: jest.fn(), warn: jest.fn(), error: jest.fn(), debug: jest.fn() },
+}));
+jest.mock('../src/lib/prisma', () => ({
+  prisma: { sensorData: { createMany: jest.fn() } },
+}));
+jest.mock('../src/services/redisService', () => ({
+  redisService: { set: jest.fn(), setMany: jest.fn() },
+}));
+jest.mock('../src/services/pythonJobScheduler', () => ({
+  pythonJobScheduler: { run: (_ticket: any, job: (slot: any) => Promise<any>) => job({ queueWaitMs: 0 }) },
+}));
+
+import { spawn } from 'child_process';
+import { PythonFallbackService } from '../src/services/pythonFallbackService';
+import { redisService } from '../src/services/redisService';
+
+const IDLE_MS = 1000;
+const FILE = path.join(os.tmpdir(), 'qtm-fallback-test.xls');
+const OPTIONS = { suitcaseId: 's', userId: 'u', validateData: false, chunkSize: 500, jobId: 'job-1', fileName: 'f.xls' };
+
+// Processo falso: stdout/stderr escritos pelo teste; kill() fecha como um SIGKILL
+const fakeChild = () => {
+  const child: any = new EventEmitter();
+  child.stdout = new PassThrough();
+  child.stderr = new PassThrough();
+  child.stdin = new PassThrough();
+  child.kill = jest.fn(() => {
+    setImmediate(() => child.emit('close', null));
+    return true;
+  });
+  return child;
+};
+
+const service = (protocol: string, maxRunMs: number) => {
+  process.env.PYTHON_FALLBACK_PROTOCOL = protocol;
+  process.env.PYTHON_FALLBACK_IDLE_TIMEOUT_MS = String(IDLE_MS);
+  process.env.PYTHON_FALLBACK_MAX_RUN_MS = String(maxRunMs);
+  return new PythonFallbackService();
+};
+
+const start = (protocol = 'lines', maxRunMs = 0) => {
+  const child = fakeChild();
+  (spawn as jest.Mock).mockImplementation(() => child);
+  const result = service(protocol, maxRunMs).processLegacyXls(FILE, 'f.xls', OPTIONS);
+  // Rejeição observada pelo teste, não pelo runtime
+  result.catch(() => {});
+  return { child, result };
+};
+
+const heartbeat = (child: any, stage: string, rows: number) =>
+  child.stderr.write(JSON.stringify({ event: 'heartbeat', t: 0, stage, rows }) + '\n');
+
+const flush = () => new Promise(resolve => setImmediate(resolve));
+
+// Estados gravados em job:progress:<jobId>
+const states = () => (redisService.set as jest.Mock).mock.calls.map(([, value]) => (value as any).state);
+
+describe('PythonFallbackService.processLegacyXls', () => {
+  beforeEach(() => {
+    fs.writeFileSync(FILE, 'x');
+    jest.useFakeTimers({ doNotFake: ['nextTick', 'setImmediate'] });
+    (redisService.set as jest.Mock).mockResolvedValue(true as never);
+  });
+
+  afterEach(() => {
+    jest.useRealTimers();
+  });
+
+  it('kills a parser whose heartbeats show no progress', async () => {
+    const { child, result } = start();
+    for (let i = 0; i < 8; i++) {
+      heartbeat(child, 'read', 0);
+      await flush();
+      await jest.advanceTimersByTimeAsync(IDLE_MS / 4);
+    }
+    expect(child.kill).toHaveBeenCalledWith('SIGKILL');
+    await expect(result).rejects.toThrow('Python fallback timeout');
+    expect(states()).toEqual(['failed']);
+  });
+
+  it('keeps a parser alive while its heartbeats advance', async () => {
+    const { child, result } = start();
+    for (let i = 0; i < 8; i++) {
+      heartbeat(child, 'write', i * 100);
+      await flush();
+      await jest.advanceTimersByTimeAsync(IDLE_MS / 2);
+    }
+    expect(child.kill).not.toHaveBeenCalled();
+    child.emit('close', 0);
+    await expect(result).resolves.toMatchObject({ totalRows: 0 });
+  });
+
+  it('kills the parser when the framed stream breaks', async () => {
+    const { child, result } = start('framed');
+    const header = Buffer.alloc(9);
+    header.write('Z', 0, 'latin1');
+    header.writeUInt32LE(1, 1);
+    header.writeUInt32LE(2, 5);
+    child.stdout.write(Buffer.concat([header, Buffer.from('{}')]));
+    await flush();
+    await flush();
+    expect(child.kill).toHaveBeenCalledWith('SIGKILL');
+    await expect(result).rejects.toThrow(/unexpected frame type/);
+    expect(states()).toEqual(['failed']);
+  });
+
+  it('reports a job that hits the run time limit as failed', async () => {
+    // Heartbeats avançando sempre: só o limite total encerra o processo
+    const { child, result } = start('lines', 4 * IDLE_MS);
+    for (let i = 0; i < 10; i++) {
+      heartbeat(child, 'write', i);
+      await flush();
+      await jest.advanceTimersByTimeAsync(IDLE_MS / 2);
+    }
+    expect(child.kill).toHaveBeenCalledWith('SIGKILL');
+    await expect(result).rejects.toThrow('Python fallback timeout');
+    expect(states()).toEqual(['failed']);
+  });
+
+  it('reports a parser that cannot be started as failed', async () => {
+    const { child, result } = start();
+    child.emit('error', new Error('spawn python3 ENOENT'));
+    await expect(result).rejects.toThrow('ENOENT');
+    expect(states()).toEqual(['failed']);
+  });
+});
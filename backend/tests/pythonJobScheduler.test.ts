@@ -0,0 +1,153 @@
+import { describe, it, expect, beforeEach, afterEach, jest } from '@jest/globals';
+
+jest.mock('../src/utils/logger', () => ({
+  logger: { info: jest.fn(), warn: jest.fn(), error: jest.fn(), debug: jest.fn() },
+}));
+jest.mock('../src/services/redisService', () => ({
+  redisService: { setMany: jest.fn() },
+}));
+
+import { PythonJobScheduler, ParseJobTicket } from '../src/services/pythonJobScheduler';
+import { redisService } from '../src/services/redisService';
+
+const setMany = redisService.setMany as jest.Mock;
+
+const AGING_MS = 1000;
+const REPORT_MS = 500;
+
+const scheduler = (concurrency: number) => {
+  process.env.PYTHON_FALLBACK_CONCURRENCY = String(concurrency);
+  process.env.PYTHON_FALLBACK_AGING_MS = String(AGING_MS);
+  process.env.PYTHON_FALLBACK_QUEUE_REPORT_MS = String(REPORT_MS);
+  return new PythonJobScheduler();
+};
+
+// Job que fica rodando até finish(); `started` guarda a ordem de início
+const started: string[] = [];
+const submit = (s: PythonJobScheduler, ticket: ParseJobTicket) => {
+  let release!: () => void;
+  const hold = new Promise<void>(resolve => { release = resolve; });
+  const done = s.run(ticket, async () => {
+    started.push(ticket.label!);
+    await hold;
+  });
+  return {
+    done,
+    finish: async () => {
+      release();
+      await done;
+      await jest.advanceTimersByTimeAsync(0);
+    },
+  };
+};
+
+describe('PythonJobScheduler', () => {
+  beforeEach(() => {
+    jest.useFakeTimers({ now: 1_700_000_000_000 });
+    started.length = 0;
+    setMany.mockReset();
+    setMany.mockResolvedValue(true as never);
+  });
+
+  afterEach(() => {
+    jest.useRealTimers();
+  });
+
+  it('never runs more than the global limit', async () => {
+    const s = scheduler(2);
+    const jobs = [1, 2, 3, 4, 5].map(i => submit(s, { sizeBytes: 1000, userId: `u${i}`, label: `j${i}` }));
+    await jest.advanceTimersByTimeAsync(0);
+    expect(s.stats()).toEqual({ running: 2, waiting: 3, maxConcurrent: 2 });
+    await jobs[0].finish();
+    expect(s.stats()).toMatchObject({ running: 2, waiting: 2 });
+    for (const job of jobs.slice(1)) await job.finish();
+    expect(started).toHaveLength(5);
+    expect(s.stats()).toMatchObject({ running: 0, waiting: 0 });
+  });
+
+  it('starts queued files in order of log2(size)', async () => {
+    const s = scheduler(1);
+    const blocker = submit(s, { sizeBytes: 1, label: 'blocker' });
+    const jobs = [
+      submit(s, { sizeBytes: 2 ** 20, label: '1MB' }),
+      submit(s, { sizeBytes: 2 ** 30, label: '1GB' }),
+      submit(s, { sizeBytes: 2 ** 10, label: '1KB' }),
+    ];
+    await blocker.finish();
+    expect(started).toEqual(['blocker', '1KB']);
+    await jobs[2].finish();
+    expect(started).toEqual(['blocker', '1KB', '1MB']);
+    await jobs[0].finish();
+    await jobs[1].finish();
+    expect(started).toEqual(['blocker', '1KB', '1MB', '1GB']);
+  });
+
+  it('ages waiting files by one log2 step per AGING_MS', async () => {
+    const s = scheduler(1);
+    const blocker = submit(s, { sizeBytes: 1, label: 'blocker' });
+    // log2 = 30, esperando 20 períodos: tamanho efetivo 10
+    const big = submit(s, { sizeBytes: 2 ** 30, label: 'big' });
+    await jest.advanceTimersByTimeAsync(20 * AGING_MS);
+    // log2 = 12, recém-chegado
+    const small = submit(s, { sizeBytes: 2 ** 12, label: 'small' });
+    await blocker.finish();
+    expect(started).toEqual(['blocker', 'big']);
+    await big.finish();
+    await small.finish();
+
+    // Espera curta: o arquivo pequeno ainda passa na frente
+    started.length = 0;
+    const blocker2 = submit(s, { sizeBytes: 1, label: 'blocker' });
+    const big2 = submit(s, { sizeBytes: 2 ** 30, label: 'big' });
+    await jest.advanceTimersByTimeAsync(AGING_MS);
+    const small2 = submit(s, { sizeBytes: 2 ** 12, label: 'small' });
+    await blocker2.finish();
+    expect(started).toEqual(['blocker', 'small']);
+    await small2.finish();
+    await big2.finish();
+  });
+
+  it('gives a free slot to the user with fewer running jobs', async () => {
+    const s = scheduler(2);
+    const a1 = submit(s, { sizeBytes: 1, userId: 'alice', label: 'a1' });
+    const a2 = submit(s, { sizeBytes: 1, userId: 'alice', label: 'a2' });
+    // Alice tem o arquivo menor, mas já ocupa a outra vaga
+    const a3 = submit(s, { sizeBytes: 2 ** 10, userId: 'alice', label: 'a3' });
+    const b1 = submit(s, { sizeBytes: 2 ** 30, userId: 'bob', label: 'b1' });
+    await a1.finish();
+    expect(started).toEqual(['a1', 'a2', 'b1']);
+    await a2.finish();
+    expect(started).toEqual(['a1', 'a2', 'b1', 'a3']);
+    await a3.finish();
+    await b1.finish();
+  });
+
+  it('writes the queue positions in one batch per report interval', async () => {
+    const s = scheduler(1);
+    const blocker = submit(s, { sizeBytes: 1, label: 'blocker' });
+    const [j3, j1, j2] = [3, 1, 2].map(i => submit(s, { sizeBytes: 2 ** (10 * i), jobId: `job-${i}`, label: `j${i}` }));
+    await jest.advanceTimersByTimeAsync(0);
+    // Três despachos, uma única gravação
+    expect(setMany).toHaveBeenCalledTimes(1);
+    const [entries, ttl] = setMany.mock.calls[0] as [Array<[string, any]>, number];
+    expect(ttl).toBe(3600);
+    expect(entries.map(([key, value]) => [key, value.state, value.position])).toEqual([
+      ['job:progress:job-1', 'queued', 1],
+      ['job:progress:job-2', 'queued', 2],
+      ['job:progress:job-3', 'queued', 3],
+    ]);
+
+    // Nova mudança dentro da janela: adiada até REPORT_MS depois da última gravação
+    await blocker.finish();
+    expect(setMany).toHaveBeenCalledTimes(1);
+    await jest.advanceTimersByTimeAsync(REPORT_MS);
+    expect(setMany).toHaveBeenCalledTimes(2);
+    expect((setMany.mock.calls[1][0] as Array<[string, any]>).map(([key]) => key)).toEqual([
+      'job:progress:job-2',
+      'job:progress:job-3',
+    ]);
+    await j1.finish();
+    await j2.finish();
+    await j3.finish();
+  });
+});